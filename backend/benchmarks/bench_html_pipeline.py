@@ -0,0 +1,111 @@
+"""
+Micro-benchmark: single-pass HTML pipeline vs. the previous multi-pass code.
+
+Run from backend/:  python -m benchmarks.bench_html_pipeline [--repeat N]
+
+For every template it times
+  * PDF preparation   (legacy preprocess_html_for_pdf vs prepare_html_for_pdf)
+  * LLM sanitization  (legacy sanitize_html_merged vs sanitize_llm_html)
+on the template made to look like raw LLM output (fences, CRLF, stray markdown).
+"""
+import argparse
+import re
+import statistics
+import timeit
+from pathlib import Path
+
+from src.services.html_pipeline import prepare_html_for_pdf, sanitize_llm_html
+
+TEMPLATES_DIR = Path(__file__).resolve().parent.parent / "templates"
+
+
+# ------------------------------------------------------------------
+# Previous implementations, kept verbatim for comparison
+# ------------------------------------------------------------------
+def legacy_preprocess_html_for_pdf(html_content: str) -> str:
+    unsupported_properties = [
+        r'backdrop-filter\s*:\s*[^;]+;',
+        r'transform\s*:\s*translate[^;]+;',
+        r'filter\s*:\s*blur[^;]+;',
+        r'clip-path\s*:\s*[^;]+;',
+        r'mix-blend-mode\s*:\s*[^;]+;',
+    ]
+
+    for prop in unsupported_properties:
+        html_content = re.sub(prop, '', html_content, flags=re.IGNORECASE)
+
+    print_css = """
+    <style>
+        @page { size: A4; margin: 0; }
+        body { margin: 0; padding: 0; -webkit-print-color-adjust: exact; print-color-adjust: exact; }
+        * { box-sizing: border-box; }
+    </style>
+    """
+
+    if '</head>' in html_content:
+        html_content = html_content.replace('</head>', f'{print_css}</head>')
+    elif '<body>' in html_content:
+        html_content = html_content.replace('<body>', f'<body>{print_css}')
+    else:
+        html_content = print_css + html_content
+
+    return html_content
+
+
+def legacy_sanitize_html_merged(merged: str) -> str:
+    cleaned = merged.replace("```html", "").replace("```", "")
+    cleaned = re.sub(r"\*\*(.*?)\*\*", r"<strong>\1</strong>", cleaned)
+    cleaned = re.sub(r"\*(.*?)\*", r"<em>\1</em>", cleaned)
+    cleaned = cleaned.replace("\r\n", "\n")
+    "</html>" in cleaned  # structure check (its warning log omitted)
+    return cleaned
+
+
+# ------------------------------------------------------------------
+# Harness
+# ------------------------------------------------------------------
+def as_llm_output(html_content: str) -> str:
+    """Template dressed up like a model reply: fenced, CRLF line endings, markdown bold."""
+    body = html_content.replace("<li>", "<li>**Note:** ", 3)
+    return "```html\r\n" + body.replace("\n", "\r\n") + "\r\n```"
+
+
+def best_of(func, arg, repeat: int) -> float:
+    number = 50
+    timings = timeit.repeat(lambda: func(arg), number=number, repeat=repeat)
+    return min(timings) / number * 1e6  # microseconds per call
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=7)
+    args = parser.parse_args()
+
+    rows = []
+    for path in sorted(TEMPLATES_DIR.glob("*.html")):
+        html_content = path.read_text(encoding="utf-8")
+        llm_output = as_llm_output(html_content)
+        rows.append((
+            path.stem,
+            len(html_content),
+            best_of(legacy_preprocess_html_for_pdf, html_content, args.repeat),
+            best_of(prepare_html_for_pdf, html_content, args.repeat),
+            best_of(legacy_sanitize_html_merged, llm_output, args.repeat),
+            best_of(sanitize_llm_html, llm_output, args.repeat),
+        ))
+
+    header = f"{'template':<12}{'bytes':>8}  {'pdf old':>9}{'pdf new':>9}{'x':>6}  {'llm old':>9}{'llm new':>9}{'x':>6}"
+    print(header)
+    print("-" * len(header))
+    for name, size, pdf_old, pdf_new, llm_old, llm_new in rows:
+        print(
+            f"{name:<12}{size:>8}  {pdf_old:>8.1f}u{pdf_new:>8.1f}u{pdf_old / pdf_new:>6.2f}"
+            f"  {llm_old:>8.1f}u{llm_new:>8.1f}u{llm_old / llm_new:>6.2f}"
+        )
+    pdf_speedup = statistics.geometric_mean(r[2] / r[3] for r in rows)
+    llm_speedup = statistics.geometric_mean(r[4] / r[5] for r in rows)
+    print(f"\ngeometric mean speedup: pdf {pdf_speedup:.2f}x, llm sanitize {llm_speedup:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+"""
+Local OpenAI-compatible stub server for load tests.
+
+Implements the endpoints the backend uses (files, responses, chat.completions, with
+and without streaming) plus a JWKS document so Clerk verification runs against a
+local key. Replies are deterministic; latency and token streaming are configurable:
+
+    python -m benchmarks.fake_openai --port 8100 --latency 0.8 --token-delay 0.01
+
+The JWKS served at /.well-known/jwks.json is read from the FAKE_OPENAI_JWKS
+environment variable (benchmarks.loadtest sets it).
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import re
+import time
+import uuid
+
+import uvicorn
+from fastapi import FastAPI, Request, UploadFile, File, Form
+from fastapi.responses import JSONResponse, StreamingResponse
+
+RESUME_TEXT = """Jane Doe
+Senior Software Engineer | jane@example.com | +1 555 0100 | Berlin
+SUMMARY
+Backend engineer with 8 years of experience building APIs and data pipelines.
+EXPERIENCE
+Acme Corp, Berlin - Senior Software Engineer (2020 - Present)
+- Led the migration of the billing platform to event-driven services.
+- Cut p99 latency of the public API from 900ms to 180ms.
+Globex, Munich - Software Engineer (2016 - 2020)
+- Built the ingestion pipeline processing 2B events per day.
+EDUCATION
+TU Munich - M.Sc. Computer Science (2014 - 2016)
+SKILLS
+Languages: Python, Go, SQL; Tools: Kubernetes, Kafka, PostgreSQL
+"""
+
+STRUCTURED_RESUME = {
+    "contact": {"name": "Jane Doe", "headline": "Senior Software Engineer", "email": "jane@example.com",
+                "phone": "+1 555 0100", "location": "Berlin"},
+    "summary": "Backend engineer with 8 years of experience building APIs and data pipelines.",
+    "experience": [
+        {"organization": "Acme Corp", "title": "Senior Software Engineer", "location": "Berlin", "start": "2020",
+         "end": "Present", "bullets": ["Led the migration of the billing platform to event-driven services.",
+                                       "Cut p99 latency of the public API from 900ms to 180ms."]},
+        {"organization": "Globex", "title": "Software Engineer", "location": "Munich", "start": "2016",
+         "end": "2020", "bullets": ["Built the ingestion pipeline processing 2B events per day."]},
+    ],
+    "education": [{"institution": "TU Munich", "degree": "M.Sc. Computer Science", "start": "2014", "end": "2016"}],
+    "skills": [{"category": "Languages", "items": ["Python", "Go", "SQL"]},
+               {"category": "Tools", "items": ["Kubernetes", "Kafka", "PostgreSQL"]}],
+}
+
+_TEMPLATE_RE = re.compile(r"```html\n(.*)\n```", re.DOTALL)
+_CODE_RE = re.compile(r"===== CODE START =====\n(.*)\n===== CODE END =====", re.DOTALL)
+
+
+class FakeSettings:
+    latency = 0.0
+    token_delay = 0.0
+    chunk_chars = 16
+
+
+def _text_of(content) -> str:
+    """Flattens chat/responses content (string or list of parts) to text."""
+    if isinstance(content, str):
+        return content
+    parts = []
+    for part in content or []:
+        if isinstance(part, dict):
+            parts.append(part.get("text") or "")
+    return "\n".join(parts)
+
+
+def response_text(body: dict) -> str:
+    """Responses API: fill a template (UnifiedResumeProcessor) or extract text (DocumentExtractor)."""
+    prompt = "\n".join(_text_of(item.get("content")) for item in body.get("input", []) if isinstance(item, dict))
+    match = _TEMPLATE_RE.search(prompt)
+    if match:
+        return match.group(1)
+    return RESUME_TEXT
+
+
+def chat_text(body: dict) -> str:
+    messages = body.get("messages", [])
+    system = _text_of(messages[0].get("content")) if messages else ""
+    user = _text_of(messages[-1].get("content")) if messages else ""
+    if '"patches"' in system:
+        patch = {"op": "set_attribute", "target": "body", "name": "data-edited", "value": "1"}
+        return json.dumps({"reply": "Done, I updated your resume.", "patches": [patch]})
+    if "RESUME TEXT" in user and body.get("response_format", {}).get("type") == "json_object":
+        return json.dumps(STRUCTURED_RESUME)
+    match = _CODE_RE.search(user)
+    if match:
+        return json.dumps({"reply": "Done, I updated your resume.", "modified_code": match.group(1)})
+    return "<!DOCTYPE html><html><head></head><body><p>stub</p></body></html>"
+
+
+def _chunks(text: str):
+    size = FakeSettings.chunk_chars
+    return [text[i:i + size] for i in range(0, len(text), size)] or [""]
+
+
+def _sse(data: dict, event: str = None) -> str:
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
+
+app = FastAPI(title="fake-openai")
+
+
+@app.get("/.well-known/jwks.json")
+async def jwks():
+    return json.loads(os.environ.get("FAKE_OPENAI_JWKS", '{"keys": []}'))
+
+
+@app.post("/v1/files")
+async def create_file(file: UploadFile = File(...), purpose: str = Form("assistants")):
+    content = await file.read()
+    await asyncio.sleep(FakeSettings.latency / 4)
+    return {
+        "id": f"file-{hashlib.sha256(content).hexdigest()[:24]}",
+        "object": "file",
+        "bytes": len(content),
+        "created_at": int(time.time()),
+        "filename": file.filename,
+        "purpose": purpose,
+        "status": "processed",
+    }
+
+
+@app.delete("/v1/files/{file_id}")
+async def delete_file(file_id: str):
+    return {"id": file_id, "object": "file", "deleted": True}
+
+
+def _response_object(body: dict, text: str, response_id: str) -> dict:
+    return {
+        "id": response_id,
+        "object": "response",
+        "created_at": int(time.time()),
+        "status": "completed",
+        "model": body.get("model", "gpt-4o-mini"),
+        "output": [{
+            "type": "message",
+            "id": f"msg_{response_id}",
+            "status": "completed",
+            "role": "assistant",
+            "content": [{"type": "output_text", "text": text, "annotations": []}],
+        }],
+        "parallel_tool_calls": True,
+        "tool_choice": "auto",
+        "tools": [],
+        "usage": {"input_tokens": 1000, "output_tokens": len(text) // 4, "total_tokens": 1000 + len(text) // 4},
+    }
+
+
+@app.post("/v1/responses")
+async def create_response(request: Request):
+    body = await request.json()
+    text = response_text(body)
+    response_id = f"resp_{uuid.uuid4().hex[:16]}"
+    await asyncio.sleep(FakeSettings.latency)
+
+    if not body.get("stream"):
+        return JSONResponse(_response_object(body, text, response_id))
+
+    async def events():
+        sequence = 0
+        for chunk in _chunks(text):
+            if FakeSettings.token_delay:
+                await asyncio.sleep(FakeSettings.token_delay)
+            yield _sse({"type": "response.output_text.delta", "delta": chunk, "item_id": f"msg_{response_id}",
+                        "output_index": 0, "content_index": 0, "sequence_number": sequence},
+                       "response.output_text.delta")
+            sequence += 1
+        yield _sse({"type": "response.completed", "response": _response_object(body, text, response_id),
+                    "sequence_number": sequence}, "response.completed")
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+@app.post("/v1/chat/completions")
+async def create_chat_completion(request: Request):
+    body = await request.json()
+    text = chat_text(body)
+    completion_id = f"chatcmpl-{uuid.uuid4().hex[:16]}"
+    created = int(time.time())
+    model = body.get("model", "gpt-4o-mini")
+    await asyncio.sleep(FakeSettings.latency)
+
+    if not body.get("stream"):
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": created,
+            "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": 1000, "completion_tokens": len(text) // 4, "total_tokens": 1000 + len(text) // 4},
+        }
+
+    async def events():
+        for chunk in _chunks(text):
+            if FakeSettings.token_delay:
+                await asyncio.sleep(FakeSettings.token_delay)
+            yield _sse({"id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                        "choices": [{"index": 0, "delta": {"content": chunk}, "finish_reason": None}]})
+        yield _sse({"id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                    "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]})
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds before each reply starts")
+    parser.add_argument("--token-delay", type=float, default=0.0, help="seconds between streamed chunks")
+    parser.add_argument("--chunk-chars", type=int, default=16, help="characters per streamed chunk")
+    args = parser.parse_args()
+
+    FakeSettings.latency = args.latency
+    FakeSettings.token_delay = args.token_delay
+    FakeSettings.chunk_chars = args.chunk_chars
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
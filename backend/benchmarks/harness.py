@@ -0,0 +1,180 @@
+"""
+Tiny benchmark harness: registration, timing, peak memory, baselines and comparison.
+
+Timing runs each benchmark in batches sized to last about `min_time` seconds and keeps
+the per-call min/median over `repeat` batches. Peak memory is measured separately
+(one call under tracemalloc), so it counts Python allocations only: memory used by
+C libraries such as cairo/pango in WeasyPrint is not included.
+"""
+import asyncio
+import inspect
+import json
+import platform
+import statistics
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+REGISTRY: List["Benchmark"] = []
+
+
+class Benchmark:
+    def __init__(self, name: str, func: Callable, group: str):
+        self.name = name
+        self.func = func
+        self.group = group
+        self.is_async = inspect.iscoroutinefunction(func)
+
+
+def benchmark(name: str, group: str = "misc"):
+    """Registers a zero-argument function (sync or async) as a benchmark."""
+
+    def decorator(func: Callable) -> Callable:
+        REGISTRY.append(Benchmark(name, func, group))
+        return func
+
+    return decorator
+
+
+def register(name: str, func: Callable, group: str = "misc"):
+    """Non-decorator form, for benchmarks generated in a loop (one per template...)."""
+    REGISTRY.append(Benchmark(name, func, group))
+
+
+# ------------------------------------------------------------------
+# Measurement
+# ------------------------------------------------------------------
+def _batch_runner(bench: Benchmark, loop: asyncio.AbstractEventLoop) -> Callable[[int], float]:
+    if bench.is_async:
+        async def batch(number: int):
+            for _ in range(number):
+                await bench.func()
+
+        def run(number: int) -> float:
+            start = time.perf_counter()
+            loop.run_until_complete(batch(number))
+            return time.perf_counter() - start
+    else:
+        func = bench.func
+
+        def run(number: int) -> float:
+            start = time.perf_counter()
+            for _ in range(number):
+                func()
+            return time.perf_counter() - start
+
+    return run
+
+
+def measure(bench: Benchmark, min_time: float = 0.2, repeat: int = 5) -> dict:
+    loop = asyncio.new_event_loop()
+    try:
+        run = _batch_runner(bench, loop)
+        # Warm up (imports, caches, compiled regexes) and calibrate the batch size
+        elapsed = run(1)
+        number = 1
+        while elapsed < min_time and number < 1_000_000:
+            number = max(number * 2, int(number * min_time / max(elapsed, 1e-9)))
+            elapsed = run(number)
+        per_call = [run(number) / number for _ in range(repeat)]
+
+        tracemalloc.start()
+        try:
+            tracemalloc.reset_peak()
+            run(1)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+    finally:
+        loop.close()
+
+    return {
+        "group": bench.group,
+        "number": number,
+        "min": min(per_call),
+        "median": statistics.median(per_call),
+        "stdev": statistics.stdev(per_call) if len(per_call) > 1 else 0.0,
+        "peak_bytes": peak,
+    }
+
+
+def run_all(pattern: Optional[str] = None, min_time: float = 0.2, repeat: int = 5, echo: Callable = print) -> Dict[str, dict]:
+    results = {}
+    for bench in REGISTRY:
+        if pattern and pattern not in bench.name:
+            continue
+        result = measure(bench, min_time=min_time, repeat=repeat)
+        results[bench.name] = result
+        echo(format_row(bench.name, result))
+    return results
+
+
+# ------------------------------------------------------------------
+# Reporting, baselines and regression comparison
+# ------------------------------------------------------------------
+def _fmt_time(seconds: float) -> str:
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.2f}{unit}"
+    return f"{seconds / 1e-9:.0f}ns"
+
+
+def format_row(name: str, result: dict) -> str:
+    return (
+        f"{name:<48}{_fmt_time(result['min']):>10}{_fmt_time(result['median']):>10}"
+        f"{result['peak_bytes'] / 1024:>12.1f} KiB"
+    )
+
+
+def header() -> str:
+    return f"{'benchmark':<48}{'min':>10}{'median':>10}{'peak mem':>16}"
+
+
+def save(results: Dict[str, dict], path: Path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    document = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": results,
+    }
+    path.write_text(json.dumps(document, indent=2, sort_keys=True))
+
+
+def load(path: Path) -> Dict[str, dict]:
+    return json.loads(path.read_text())["results"]
+
+
+def compare(current: Dict[str, dict], baseline: Dict[str, dict], threshold: float,
+            min_memory_delta: int = 64 * 1024) -> List[str]:
+    """
+    Returns a line per regression: min time more than `threshold` slower, or peak
+    memory more than `threshold` larger (ignoring changes under `min_memory_delta`).
+    """
+    regressions = []
+    for name, result in current.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        time_ratio = result["min"] / base["min"] if base["min"] else 1.0
+        if time_ratio > 1 + threshold:
+            regressions.append(f"{name}: time {_fmt_time(base['min'])} -> {_fmt_time(result['min'])} ({time_ratio:.2f}x)")
+        memory_delta = result["peak_bytes"] - base["peak_bytes"]
+        if memory_delta > min_memory_delta and result["peak_bytes"] > base["peak_bytes"] * (1 + threshold):
+            regressions.append(
+                f"{name}: peak memory {base['peak_bytes'] / 1024:.0f} KiB -> {result['peak_bytes'] / 1024:.0f} KiB"
+            )
+    return regressions
+
+
+def comparison_table(current: Dict[str, dict], baseline: Dict[str, dict]) -> List[str]:
+    lines = [f"{'benchmark':<48}{'baseline':>10}{'current':>10}{'ratio':>8}"]
+    for name, result in current.items():
+        base = baseline.get(name)
+        if base is None:
+            lines.append(f"{name:<48}{'-':>10}{_fmt_time(result['min']):>10}{'new':>8}")
+            continue
+        ratio = result["min"] / base["min"] if base["min"] else 1.0
+        lines.append(f"{name:<48}{_fmt_time(base['min']):>10}{_fmt_time(result['min']):>10}{ratio:>7.2f}x")
+    return lines
@@ -0,0 +1,83 @@
+"""
+Deterministic stand-in for services.llm_client.LLMClient.
+
+Exposes the same coroutine methods and returns objects shaped like the OpenAI SDK
+responses the agents read (`choices[0].message.content`, `output_text`, `.id`), after
+a configurable latency. Streaming methods yield the reply in fixed-size chunks.
+Swap it in per agent: `html_modifier.llm = StubLLM(...)`.
+"""
+import asyncio
+import hashlib
+import json
+from types import SimpleNamespace
+from typing import AsyncIterator, Callable, Optional
+
+
+def default_chat_reply(kwargs: dict) -> str:
+    """Echoes the document back: patch mode gets no patches, full mode the same code."""
+    messages = kwargs.get("messages", [])
+    system = messages[0]["content"] if messages else ""
+    if '"patches"' in system:
+        return json.dumps({"reply": "No changes needed.", "patches": []})
+    user = messages[-1]["content"] if messages else ""
+    code = user.split("===== CODE START =====", 1)[-1].split("===== CODE END =====", 1)[0].strip()
+    return json.dumps({"reply": "Done.", "modified_code": code})
+
+
+def default_response_text(kwargs: dict) -> str:
+    return "<!DOCTYPE html><html><head><title>stub</title></head><body><p>stub</p></body></html>"
+
+
+class StubLLM:
+    def __init__(
+        self,
+        latency: float = 0.0,
+        token_delay: float = 0.0,
+        chunk_size: int = 64,
+        chat_reply: Callable[[dict], str] = default_chat_reply,
+        response_text: Callable[[dict], str] = default_response_text,
+    ):
+        self.latency = latency
+        self.token_delay = token_delay
+        self.chunk_size = chunk_size
+        self.chat_reply = chat_reply
+        self.response_text = response_text
+        self.calls = 0
+
+    async def _wait(self):
+        self.calls += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    async def _chunks(self, text: str) -> AsyncIterator[str]:
+        for start in range(0, len(text), self.chunk_size):
+            if self.token_delay:
+                await asyncio.sleep(self.token_delay)
+            yield text[start:start + self.chunk_size]
+
+    async def upload_file(self, filename: str, file_bytes: bytes, purpose: str = "assistants", timeout: Optional[float] = None):
+        await self._wait()
+        return SimpleNamespace(id=f"file-{hashlib.sha256(file_bytes).hexdigest()[:24]}", filename=filename)
+
+    async def delete_file(self, file_id: str, timeout: Optional[float] = None):
+        await self._wait()
+        return SimpleNamespace(id=file_id, deleted=True)
+
+    async def create_response(self, timeout: Optional[float] = None, **kwargs):
+        await self._wait()
+        return SimpleNamespace(output_text=self.response_text(kwargs))
+
+    async def create_chat_completion(self, timeout: Optional[float] = None, **kwargs):
+        await self._wait()
+        message = SimpleNamespace(content=self.chat_reply(kwargs), role="assistant")
+        return SimpleNamespace(choices=[SimpleNamespace(message=message, finish_reason="stop")])
+
+    async def stream_response(self, timeout: Optional[float] = None, **kwargs) -> AsyncIterator[str]:
+        await self._wait()
+        async for chunk in self._chunks(self.response_text(kwargs)):
+            yield chunk
+
+    async def stream_chat_completion(self, timeout: Optional[float] = None, **kwargs) -> AsyncIterator[str]:
+        await self._wait()
+        async for chunk in self._chunks(self.chat_reply(kwargs)):
+            yield chunk
@@ -0,0 +1,345 @@
+"""
+End-to-end load test: how many concurrent users one backend process can serve.
+
+Boots two subprocesses, the app (benchmarks.loadtest_server, i.e. src.main:app plus
+an event-loop lag probe) and benchmarks.fake_openai, which stands in for OpenAI and
+serves the JWKS. Tokens are signed with a throwaway RSA key, so Clerk verification
+runs for real without network access. Virtual users then loop over a weighted
+mix of routes for a fixed duration.
+
+Run from backend/:
+    python -m benchmarks.loadtest                                  # 10 users, 30s
+    python -m benchmarks.loadtest --users 5,10,20,40 --duration 20 # capacity ramp
+    python -m benchmarks.loadtest --mix preview=1 --unique-pdf 1.0 # render-bound only
+    python -m benchmarks.loadtest --llm-latency 1.5 --token-delay 0.01 --json out.json
+
+For each stage it prints throughput, per-route p50/p95/p99 latency and error
+counts, plus the app's event-loop lag (p99/max, and the total time the loop was
+blocked): synchronous work on the loop shows up there even when the latency
+percentiles look fine.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Callable, Dict, List
+
+import httpx
+import jwt
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+from .fake_openai import RESUME_TEXT
+from .loadtest_server import percentile
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+TEMPLATES = {path.stem: path.read_text(encoding="utf-8") for path in sorted((BACKEND_DIR / "templates").glob("*.html"))}
+DEFAULT_MIX = "upload=2,process_html=1,modify=3,preview=4"
+MODIFY_PROMPTS = [
+    "Make my name bold",
+    "Change the accent color to dark blue",
+    "Rewrite the summary to sound more senior",
+    "Add Kubernetes to my skills",
+]
+
+
+# ------------------------------------------------------------------
+# Payloads
+# ------------------------------------------------------------------
+def minimal_pdf(lines: List[str]) -> bytes:
+    """One-page PDF with a real text layer (so pdftotext extraction succeeds locally)."""
+    escaped = [line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)") for line in lines]
+    stream = "BT /F1 10 Tf 14 TL 50 800 Td " + " ".join(f"({line}) '" for line in escaped) + " ET"
+    objects = [
+        "<< /Type /Catalog /Pages 2 0 R >>",
+        "<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        "<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+        "/Resources << /Font << /F1 5 0 R >> >> /Contents 4 0 R >>",
+        f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream",
+        "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n{body}\nendobj\n".encode("latin-1")
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    out += "".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode()
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return bytes(out)
+
+
+RESUME_FILES = [
+    ("resume.txt", RESUME_TEXT.encode(), "text/plain"),
+    ("resume.pdf", minimal_pdf(RESUME_TEXT.splitlines()), "application/pdf"),
+]
+
+
+class Scenario:
+    """Builds one request per call; `unique_pdf` is the share of previews that miss the render cache."""
+
+    def __init__(self, unique_pdf: float):
+        self.unique_pdf = unique_pdf
+        self.counter = 0
+
+    async def upload(self, client: httpx.AsyncClient, rng: random.Random) -> httpx.Response:
+        return await client.post("/upload", files={"file": rng.choice(RESUME_FILES)})
+
+    async def process_html(self, client: httpx.AsyncClient, rng: random.Random) -> httpx.Response:
+        return await client.post(
+            "/process_html",
+            files={"file": rng.choice(RESUME_FILES)},
+            data={"template_id": rng.choice(list(TEMPLATES))},
+        )
+
+    async def modify(self, client: httpx.AsyncClient, rng: random.Random) -> httpx.Response:
+        return await client.post("/modify-resume", json={
+            "html_code": rng.choice(list(TEMPLATES.values())),
+            "prompt": rng.choice(MODIFY_PROMPTS),
+            "history": [],
+        })
+
+    async def preview(self, client: httpx.AsyncClient, rng: random.Random) -> httpx.Response:
+        html_content = rng.choice(list(TEMPLATES.values()))
+        if rng.random() < self.unique_pdf:
+            self.counter += 1
+            html_content += f"\n<!-- loadtest {self.counter} -->"
+        return await client.post("/preview-pdf-bytes", data={"html_content": html_content})
+
+    def routes(self) -> Dict[str, Callable]:
+        return {
+            "upload": self.upload,
+            "process_html": self.process_html,
+            "modify": self.modify,
+            "preview": self.preview,
+        }
+
+
+def parse_mix(spec: str, routes: Dict[str, Callable]) -> Dict[str, float]:
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in routes:
+            raise SystemExit(f"Unknown route '{name}' in --mix (choose from {', '.join(routes)})")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+# ------------------------------------------------------------------
+# Load generation
+# ------------------------------------------------------------------
+class Recorder:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+
+    def add(self, route: str, elapsed: float, error: str = None):
+        if error:
+            self.errors[route][error] += 1
+        else:
+            self.latencies[route].append(elapsed)
+
+
+async def virtual_user(client: httpx.AsyncClient, routes: Dict[str, Callable], mix: Dict[str, float],
+                       deadline: float, recorder: Recorder, rng: random.Random, think_time: float):
+    names, weights = list(mix), list(mix.values())
+    while time.perf_counter() < deadline:
+        route = rng.choices(names, weights)[0]
+        start = time.perf_counter()
+        try:
+            response = await routes[route](client, rng)
+            error = None if response.status_code < 400 else str(response.status_code)
+        except httpx.HTTPError as e:
+            error = type(e).__name__
+        recorder.add(route, time.perf_counter() - start, error)
+        if think_time:
+            await asyncio.sleep(rng.expovariate(1 / think_time))
+
+
+async def run_stage(base_url: str, token: str, users: int, duration: float, warmup: float,
+                    mix_spec: str, unique_pdf: float, think_time: float, seed: int) -> dict:
+    scenario = Scenario(unique_pdf)
+    routes = scenario.routes()
+    mix = parse_mix(mix_spec, routes)
+    limits = httpx.Limits(max_connections=users, max_keepalive_connections=users)
+    async with httpx.AsyncClient(base_url=base_url, headers={"Authorization": f"Bearer {token}"},
+                                 timeout=300.0, limits=limits) as client:
+
+        async def drive(seconds: float) -> Recorder:
+            recorder = Recorder()
+            deadline = time.perf_counter() + seconds
+            await asyncio.gather(*(
+                virtual_user(client, routes, mix, deadline, recorder, random.Random(seed + i), think_time)
+                for i in range(users)
+            ))
+            return recorder
+
+        if warmup:
+            await drive(warmup)
+        await client.get("/__loadtest/lag", params={"reset": True})
+        started = time.perf_counter()
+        recorder = await drive(duration)
+        elapsed = time.perf_counter() - started
+        lag = (await client.get("/__loadtest/lag")).json()
+
+    per_route = {}
+    for route in mix:
+        samples = recorder.latencies.get(route, [])
+        per_route[route] = {
+            "ok": len(samples),
+            "errors": dict(recorder.errors.get(route, {})),
+            "rps": len(samples) / elapsed,
+            "p50": percentile(samples, 0.50),
+            "p95": percentile(samples, 0.95),
+            "p99": percentile(samples, 0.99),
+        }
+    completed = sum(route["ok"] for route in per_route.values())
+    return {
+        "users": users,
+        "elapsed": elapsed,
+        "throughput": completed / elapsed,
+        "errors": sum(sum(route["errors"].values()) for route in per_route.values()),
+        "routes": per_route,
+        "loop_lag": lag,
+    }
+
+
+def format_stage(stage: dict) -> str:
+    ms = lambda seconds: f"{seconds * 1000:.0f}ms"
+    lines = [
+        f"\n=== {stage['users']} users, {stage['elapsed']:.1f}s: "
+        f"{stage['throughput']:.2f} req/s, {stage['errors']} errors ===",
+        f"{'route':<14}{'ok':>7}{'req/s':>8}{'p50':>9}{'p95':>9}{'p99':>9}  errors",
+    ]
+    for name, route in stage["routes"].items():
+        errors = ", ".join(f"{kind}x{count}" for kind, count in route["errors"].items()) or "-"
+        lines.append(
+            f"{name:<14}{route['ok']:>7}{route['rps']:>8.2f}{ms(route['p50']):>9}"
+            f"{ms(route['p95']):>9}{ms(route['p99']):>9}  {errors}"
+        )
+    lag = stage["loop_lag"]
+    lines.append(
+        f"event-loop lag: p50 {ms(lag['p50'])}, p99 {ms(lag['p99'])}, max {ms(lag['max'])}, "
+        f"blocked {lag['blocked']:.2f}s of {stage['elapsed']:.1f}s ({lag['samples']} samples)"
+    )
+    return "\n".join(lines)
+
+
+# ------------------------------------------------------------------
+# Process management
+# ------------------------------------------------------------------
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def signing_key():
+    """Throwaway RSA key: returns (private key, JWKS document)."""
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    jwk = json.loads(jwt.algorithms.RSAAlgorithm.to_jwk(private_key.public_key()))
+    jwk.update({"kid": "loadtest", "alg": "RS256", "use": "sig"})
+    return private_key, {"keys": [jwk]}
+
+
+def mint_token(private_key, ttl: float = 24 * 3600) -> str:
+    now = int(time.time())
+    return jwt.encode({"sub": "user_loadtest", "iat": now, "exp": now + int(ttl)}, private_key,
+                      algorithm="RS256", headers={"kid": "loadtest"})
+
+
+def wait_ready(url: str, process: subprocess.Popen, timeout: float = 60.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f"{url} exited with status {process.returncode} during startup (see logs)")
+        try:
+            if httpx.get(url, timeout=1.0).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise SystemExit(f"{url} not ready after {timeout:.0f}s")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", default="10", help="concurrent users; comma-separated values run one stage each")
+    parser.add_argument("--duration", type=float, default=30.0, help="measured seconds per stage")
+    parser.add_argument("--warmup", type=float, default=5.0, help="unmeasured seconds before each stage")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="route weights, e.g. 'modify=3,preview=1'")
+    parser.add_argument("--unique-pdf", type=float, default=0.5, help="share of previews that miss the render cache")
+    parser.add_argument("--think-time", type=float, default=0.0, help="mean pause between a user's requests (s)")
+    parser.add_argument("--llm-latency", type=float, default=0.8, help="fake OpenAI time to first byte (s)")
+    parser.add_argument("--token-delay", type=float, default=0.0, help="fake OpenAI delay per streamed chunk (s)")
+    parser.add_argument("--lag-interval", type=float, default=0.01, help="event-loop lag probe period (s)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", type=Path, help="also write the results to this file")
+    args = parser.parse_args()
+
+    private_key, jwks = signing_key()
+    token = mint_token(private_key)
+    fake_port, app_port = free_port(), free_port()
+    fake_url, app_url = f"http://127.0.0.1:{fake_port}", f"http://127.0.0.1:{app_port}"
+
+    env = dict(os.environ)
+    env.update({
+        "OPENAI_API_KEY": "sk-loadtest",
+        "OPENAI_BASE_URL": f"{fake_url}/v1",
+        "CLERK_JWKS_URL": f"{fake_url}/.well-known/jwks.json",
+        "FAKE_OPENAI_JWKS": json.dumps(jwks),
+    })
+
+    log_dir = Path(tempfile.mkdtemp(prefix="loadtest-"))
+    processes = []
+    try:
+        with open(log_dir / "fake_openai.log", "wb") as fake_log, open(log_dir / "app.log", "wb") as app_log:
+            processes.append(subprocess.Popen(
+                [sys.executable, "-m", "benchmarks.fake_openai", "--port", str(fake_port),
+                 "--latency", str(args.llm_latency), "--token-delay", str(args.token_delay)],
+                cwd=BACKEND_DIR, env=env, stdout=fake_log, stderr=subprocess.STDOUT,
+            ))
+            wait_ready(f"{fake_url}/.well-known/jwks.json", processes[-1])
+            processes.append(subprocess.Popen(
+                [sys.executable, "-m", "benchmarks.loadtest_server", "--port", str(app_port),
+                 "--lag-interval", str(args.lag_interval)],
+                cwd=BACKEND_DIR, env=env, stdout=app_log, stderr=subprocess.STDOUT,
+            ))
+            wait_ready(f"{app_url}/", processes[-1])
+            print(f"app {app_url}, fake OpenAI {fake_url}, logs in {log_dir}")
+            print(f"mix {args.mix}, llm latency {args.llm_latency}s, unique previews {args.unique_pdf:.0%}")
+
+            stages = []
+            for users in (int(value) for value in args.users.split(",")):
+                stage = asyncio.run(run_stage(
+                    app_url, token, users, args.duration, args.warmup,
+                    args.mix, args.unique_pdf, args.think_time, args.seed,
+                ))
+                stages.append(stage)
+                print(format_stage(stage), flush=True)
+    finally:
+        for process in reversed(processes):
+            process.terminate()
+        for process in processes:
+            try:
+                process.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+    if args.json:
+        args.json.write_text(json.dumps({"args": vars(args) | {"json": str(args.json)}, "stages": stages}, indent=2))
+        print(f"\nResults written to {args.json}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,96 @@
+"""
+Runs src.main:app under uvicorn with an event-loop lag probe, for benchmarks.loadtest.
+
+    python -m benchmarks.loadtest_server --port 8200
+
+A background task sleeps `interval` seconds in a loop and records how late it wakes
+up: anything that blocks the event loop (a synchronous render, a big regex, JSON
+parsing of a huge reply) shows up as lag. GET /__loadtest/lag returns the summary;
+?reset=true clears the samples (the load driver resets after warm-up).
+"""
+import argparse
+import asyncio
+import time
+from collections import deque
+from typing import Optional
+
+import uvicorn
+
+
+def percentile(values, fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class LoopLagMonitor:
+    def __init__(self, interval: float = 0.01, max_samples: int = 100_000):
+        self.interval = interval
+        self.samples = deque(maxlen=max_samples)
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def _run(self):
+        while True:
+            expected = time.perf_counter() + self.interval
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, time.perf_counter() - expected))
+
+    def snapshot(self, reset: bool = False) -> dict:
+        samples = list(self.samples)
+        if reset:
+            self.samples.clear()
+        return {
+            "interval": self.interval,
+            "samples": len(samples),
+            "mean": sum(samples) / len(samples) if samples else 0.0,
+            "p50": percentile(samples, 0.50),
+            "p99": percentile(samples, 0.99),
+            "max": max(samples, default=0.0),
+            # Total time the loop was unavailable beyond 5ms per tick
+            "blocked": sum(lag for lag in samples if lag > 0.005),
+        }
+
+
+async def serve(host: str, port: int, interval: float):
+    # Imported here so the environment set by the load driver is read by Settings
+    from src.main import app
+
+    monitor = LoopLagMonitor(interval=interval)
+
+    async def lag(reset: bool = False):
+        return monitor.snapshot(reset)
+
+    app.add_api_route("/__loadtest/lag", lag, methods=["GET"])
+
+    server = uvicorn.Server(uvicorn.Config(app, host=host, port=port, log_level="warning"))
+    monitor.start()
+    try:
+        await server.serve()
+    finally:
+        await monitor.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8200)
+    parser.add_argument("--lag-interval", type=float, default=0.01, help="lag probe period (seconds)")
+    args = parser.parse_args()
+    asyncio.run(serve(args.host, args.port, args.lag_interval))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+"""
+Offline micro-benchmarks for the backend hot paths.
+
+Run from backend/:
+    python -m benchmarks.suite                          # run everything
+    python -m benchmarks.suite -k render                # only names containing "render"
+    python -m benchmarks.suite --save benchmarks/baselines/main.json
+    python -m benchmarks.suite --compare benchmarks/baselines/main.json --threshold 0.15
+
+--compare exits with status 1 when any benchmark is slower (min time) or uses more
+peak memory than the baseline by more than the threshold. No network access is
+needed: LLM calls go through benchmarks.llm_stub.StubLLM (--llm-latency to simulate
+the API), and JWTs are signed and verified against a locally generated key.
+"""
+import argparse
+import json
+import logging
+import sys
+import time
+from pathlib import Path
+
+import jwt
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+from src.agents.html_converter import HtmlResumeConverter
+from src.agents.html_modifier import html_modifier
+from src.services.clerk_auth import ClerkTokenVerifier, VerifiedTokenCache
+from src.services.html_pipeline import prepare_html_for_pdf
+from src.services.prompt_compaction import compact_html
+from src.services.render_engine import _init_worker, _render_pdf
+from src.services.template_registry import TemplateRegistry
+
+from . import harness
+from .bench_html_pipeline import as_llm_output
+from .harness import benchmark, register
+from .llm_stub import StubLLM
+
+TEMPLATES_DIR = Path(__file__).resolve().parent.parent / "templates"
+TEMPLATES = {path.stem: path.read_text(encoding="utf-8") for path in sorted(TEMPLATES_DIR.glob("*.html"))}
+
+
+# ------------------------------------------------------------------
+# HTML post-processing
+# ------------------------------------------------------------------
+converter = HtmlResumeConverter()
+
+for _template_id, _html in TEMPLATES.items():
+    register(f"preprocess_pdf[{_template_id}]", lambda html=_html: prepare_html_for_pdf(html), group="pipeline")
+    _llm_output = as_llm_output(_html)
+    register(f"sanitize_html_merged[{_template_id}]", lambda text=_llm_output: converter.sanitize_html_merged(text), group="pipeline")
+    _compacted = compact_html(_html)
+    register(f"compact_prompt[{_template_id}]", lambda html=_html: compact_html(html), group="pipeline")
+    register(f"restore_prompt[{_template_id}]", lambda c=_compacted: c.restore(c.html), group="pipeline")
+
+
+# ------------------------------------------------------------------
+# WeasyPrint rendering (in-process, exactly what a pool worker runs)
+# ------------------------------------------------------------------
+_render_ready = False
+
+
+def _render(html_content: str) -> bytes:
+    global _render_ready
+    if not _render_ready:
+        _init_worker()
+        _render_ready = True
+    pdf_bytes, _, _ = _render_pdf(html_content)
+    return pdf_bytes
+
+
+for _template_id, _html in TEMPLATES.items():
+    register(f"weasyprint_render[{_template_id}]", lambda html=prepare_html_for_pdf(_html): _render(html), group="render")
+
+
+# ------------------------------------------------------------------
+# HtmlModifier response parsing (large documents)
+# ------------------------------------------------------------------
+# ~25 copies of the largest template: the size of a long resume with inlined assets
+LARGE_HTML = max(TEMPLATES.values(), key=len) * 25
+LARGE_JSON = json.dumps({"reply": "Updated your summary.", "modified_code": LARGE_HTML})
+# Literal newlines inside the string make json.loads fail and force the regex fallback
+LARGE_BROKEN_JSON = (
+    '{"reply": "Updated your summary.", "modified_code": "'
+    + LARGE_HTML.replace("\\", "\\\\").replace('"', '\\"')
+    + '"}'
+)
+
+
+@benchmark("modifier_parse_json[large]", group="modifier")
+async def modifier_parse_json():
+    result = await html_modifier._parse_response(LARGE_JSON, LARGE_HTML)
+    assert result["success"] and result["modified_html"] == LARGE_HTML.strip()
+
+
+@benchmark("modifier_parse_fallback[large]", group="modifier")
+async def modifier_parse_fallback():
+    # Must recover the whole document, not time an early failure
+    result = await html_modifier._parse_response(LARGE_BROKEN_JSON, LARGE_HTML)
+    assert result["success"] and result["modified_html"] == LARGE_HTML.strip()
+
+
+@benchmark("modifier_modify_html[classic]", group="modifier")
+async def modifier_modify_html():
+    await html_modifier.modify_html(TEMPLATES["classic"], "Make my name bold", [])
+
+
+@benchmark("modifier_fast_path[classic]", group="modifier")
+async def modifier_fast_path():
+    await html_modifier.modify_html(TEMPLATES["classic"], "Change my email to jane.doe@example.org", [])
+
+
+# ------------------------------------------------------------------
+# JWT verification
+# ------------------------------------------------------------------
+_private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+_jwk = json.loads(jwt.algorithms.RSAAlgorithm.to_jwk(_private_key.public_key()))
+_jwk.update({"kid": "bench", "alg": "RS256", "use": "sig"})
+TOKEN = jwt.encode(
+    {"sub": "user_bench", "exp": int(time.time()) + 24 * 3600, "iat": int(time.time())},
+    _private_key,
+    algorithm="RS256",
+    headers={"kid": "bench"},
+)
+
+cold_verifier = ClerkTokenVerifier("http://jwks.invalid/.well-known/jwks.json")
+cold_verifier.jwks.load({"keys": [_jwk]})
+cold_verifier.token_cache = VerifiedTokenCache(ttl=0)  # every call checks the signature
+
+cached_verifier = ClerkTokenVerifier("http://jwks.invalid/.well-known/jwks.json")
+cached_verifier.jwks.load({"keys": [_jwk]})
+
+
+@benchmark("jwt_verify[signature]", group="auth")
+async def jwt_verify_signature():
+    await cold_verifier.verify(TOKEN)
+
+
+@benchmark("jwt_verify[cached]", group="auth")
+async def jwt_verify_cached():
+    await cached_verifier.verify(TOKEN)
+
+
+# ------------------------------------------------------------------
+# Template listing
+# ------------------------------------------------------------------
+registry = TemplateRegistry(TEMPLATES_DIR)
+registry.reload()
+
+
+@benchmark("templates_list[glob]", group="templates")
+def templates_list_glob():
+    # What GET /templates did before the registry: a directory scan per request
+    [
+        {"id": path.stem, "name": path.stem.replace("_", " ").title(), "filename": path.name}
+        for path in TEMPLATES_DIR.glob("*.html")
+    ]
+
+
+@benchmark("templates_list[registry]", group="templates")
+def templates_list_registry():
+    registry.listing.select("gzip, deflate, br")
+
+
+@benchmark("templates_rescan[registry]", group="templates")
+def templates_rescan():
+    # One tick of the registry's change watcher (nothing changed)
+    registry.reload()
+
+
+# ------------------------------------------------------------------
+# CLI
+# ------------------------------------------------------------------
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-k", dest="pattern", help="only run benchmarks whose name contains this")
+    parser.add_argument("--min-time", type=float, default=0.2, help="seconds per timed batch")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="seconds the LLM stub waits per call")
+    parser.add_argument("--save", type=Path, help="write results as a baseline JSON file")
+    parser.add_argument("--compare", type=Path, help="baseline JSON file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed slowdown / memory growth (0.10 = 10%%)")
+    args = parser.parse_args()
+
+    html_modifier.llm = StubLLM(latency=args.llm_latency)
+    # The fallback path logs a warning per call; keep the report readable
+    logging.disable(logging.WARNING)
+
+    print(harness.header())
+    results = harness.run_all(args.pattern, min_time=args.min_time, repeat=args.repeat)
+
+    if args.save:
+        harness.save(results, args.save)
+        print(f"\nBaseline written to {args.save}")
+
+    if args.compare:
+        baseline = harness.load(args.compare)
+        print()
+        print("\n".join(harness.comparison_table(results, baseline)))
+        regressions = harness.compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) over {args.threshold:.0%}:")
+            print("\n".join(f"  {line}" for line in regressions))
+            return 1
+        print(f"\nNo regressions over {args.threshold:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
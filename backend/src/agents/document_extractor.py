@@ -1,20 +1,37 @@
 import time
+import asyncio
 import logging
-from openai import AsyncOpenAI
-from ..config import settings  # your config file
+from pathlib import Path
+from ..services.llm_client import llm_client
+from ..services.file_registry import file_registry
+from ..services.extraction_cache import extraction_cache, extraction_key
+from ..services.local_extractor import extract_locally
+from ..services.pdf_text import pdf_text_extractor
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)
 
+# Bump whenever EXTRACTION_PROMPT changes so cached results are not reused
+PROMPT_VERSION = "v1"
+EXTRACTION_PROMPT = (
+    "Extract all textual content from this document. "
+    "Preserve reading order. Output clean plain text only. "
+    "No JSON, no markdown, no commentary."
+)
+
 
 class DocumentExtractor:
     """
-    Ultra-fast document extractor using OpenAI Responses API.
+    Ultra-fast document extractor.
+    DOCX, PPTX, XLSX, CSV and TXT are parsed locally first, born-digital PDFs use
+    their text layer when it scores well; everything else (and low-quality local
+    results) goes through the OpenAI Responses API.
+    Every result carries `details` = {"path", "timings"} describing what ran.
     Supports: PDF, DOCX, PPTX, XLSX, TXT, Images.
     """
 
     def __init__(self):
-        self.client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
+        self.llm = llm_client
         self.model = "gpt-4o"  # must be gpt-4o or gpt-4.1 for direct file ingestion
 
     # ------------------------------------------------------------------
@@ -22,24 +39,74 @@ class DocumentExtractor:
     # ------------------------------------------------------------------
     async def extract_from_bytes(self, file_bytes: bytes, filename: str):
         start_total = time.time()
+        cache_key = extraction_key(file_bytes, self.model, PROMPT_VERSION)
+        details = {"path": "llm", "timings": {}}
 
         try:
+            # ----------------------------------------------------------
+            # STEP 0a — Local, zero-LLM extraction for office/text formats
+            # ----------------------------------------------------------
+            ext = Path(filename).suffix.lower()
+            local_text = await asyncio.to_thread(extract_locally, file_bytes, filename)
+            details["timings"]["local"] = time.time() - start_total
+            if local_text is not None:
+                total_time = time.time() - start_total
+                logger.info(f"📝 Local extraction of {filename} finished in {total_time * 1000:.1f}ms")
+                details["path"] = f"local_{ext.lstrip('.')}"
+                return {
+                    "success": True,
+                    "extracted_data": local_text,
+                    "method": details["path"],
+                    "execution_time": total_time,
+                    "details": details,
+                }
+
+            if ext == ".pdf":
+                pdf_result = await pdf_text_extractor.extract(file_bytes)
+                if pdf_result is not None:
+                    details["timings"]["local_pdf"] = pdf_result["elapsed"]
+                    details["pdf_quality"] = pdf_result["quality"]
+                    if pdf_result["usable"]:
+                        details["path"] = "local_pdf"
+                        return {
+                            "success": True,
+                            "extracted_data": pdf_result["text"],
+                            "method": "local_pdf",
+                            "execution_time": time.time() - start_total,
+                            "details": details,
+                        }
+
+            # ----------------------------------------------------------
+            # STEP 0b — Serve repeat documents from the extraction cache
+            # ----------------------------------------------------------
+            cached_text = await extraction_cache.get(cache_key)
+            if cached_text is not None:
+                total_time = time.time() - start_total
+                logger.info(f"⚡ Extraction cache hit for {filename} ({total_time * 1000:.1f}ms)")
+                details["path"] = "cache"
+                return {
+                    "success": True,
+                    "extracted_data": cached_text,
+                    "method": "cache",
+                    "execution_time": total_time,
+                    "details": details,
+                }
+
             # ----------------------------------------------------------
             # STEP 1 — Upload file to OpenAI (in memory)
             # ----------------------------------------------------------
-            upload = await self.client.files.create(
-                file=(filename, file_bytes),
-                purpose="assistants"
-            )
-            file_id = upload.id
-            logger.info(f"📤 Uploaded file {filename} (file_id={file_id})")
+            upload_start = time.time()
+            file_id = await file_registry.get_or_upload(filename, file_bytes)
+            details["timings"]["upload"] = time.time() - upload_start
+            logger.info(f"📤 File {filename} available (file_id={file_id})")
 
             # ----------------------------------------------------------
             # STEP 2 — Call Responses API (supports file ingestion)
             # ----------------------------------------------------------
             logger.info("🤖 Calling gpt-4o for document extraction...")
+            llm_start = time.time()
 
-            response = await self.client.responses.create(
+            response = await self.llm.create_response(
                 model=self.model,
                 input=[
                     {
@@ -48,11 +115,7 @@ class DocumentExtractor:
                             {"type": "input_file", "file_id": file_id},  # Changed from "file" to "input_file"
                             {
                                 "type": "input_text",  # Changed from "text" to "input_text"
-                                "text": (
-                                    "Extract all textual content from this document. "
-                                    "Preserve reading order. Output clean plain text only. "
-                                    "No JSON, no markdown, no commentary."
-                                ),
+                                "text": EXTRACTION_PROMPT,
                             },
                         ],
                     }
@@ -61,18 +124,26 @@ class DocumentExtractor:
             )
 
             extracted_text = response.output_text
+            details["timings"]["llm"] = time.time() - llm_start
 
             total_time = time.time() - start_total
             logger.info(f"🚀 Extraction finished in {total_time:.2f}s")
             logger.info(f"Extracted Text Sample : {extracted_text[:500]}")
 
+            if extracted_text:
+                await extraction_cache.set(cache_key, extracted_text)
+
             return {
                 "success": True,
                 "extracted_data": extracted_text,
                 "method": "responses_api_direct_file",
                 "execution_time": total_time,
+                "details": details,
             }
 
         except Exception as e:
             logger.exception("❌ Extraction failed")
-            return {"success": False, "error": str(e)}
\ No newline at end of file
+            return {"success": False, "error": str(e)}
+
+# Singleton instance
+document_extractor = DocumentExtractor()
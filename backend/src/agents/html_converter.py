@@ -1,8 +1,9 @@
 import re
 import logging
 import html
-from openai import AsyncOpenAI  # Changed import
-from ..config import settings
+from ..services.llm_client import llm_client
+from ..services.html_pipeline import sanitize_llm_html
+from ..services.prompt_compaction import compact_html
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
@@ -15,12 +16,10 @@ class HtmlResumeConverter:
     """
 
     def __init__(self):
-        logger.info("Initializing HtmlResumeConverter with OpenAI Direct API...")
+        logger.info("Initializing HtmlResumeConverter with shared LLM client...")
         
-        # Initialize the Async Client
-        self.client = AsyncOpenAI(
-            api_key=settings.OPENAI_API_KEY
-        )
+        # Shared, pooled client (created once per process)
+        self.llm = llm_client
         
         # Define the model (You can change this to "gpt-4-turbo" or "gpt-3.5-turbo" if needed)
         self.model_name = "gpt-4.1"
@@ -45,46 +44,13 @@ TASK:
         text = re.sub(r"\n```$", "", text.strip())
         return text
 
-    # ---------------------------
-    # Sanitizer utilities
-    # ---------------------------
-    def _convert_markdown_to_html_tags(self, text: str) -> str:
-        """
-        Sometimes LLMs slip Markdown into HTML (e.g. <li>**Role**</li>).
-        This converts basic bold/italic markdown to HTML tags.
-        """
-        # Convert **text** to <strong>text</strong>
-        text = re.sub(r"\*\*(.*?)\*\*", r"<strong>\1</strong>", text)
-        # Convert *text* to <em>text</em>
-        text = re.sub(r"\*(.*?)\*", r"<em>\1</em>", text)
-        return text
-
-    def _ensure_valid_structure(self, html_content: str) -> str:
-        """
-        Basic check to ensure the LLM didn't truncate the file.
-        """
-        if "</html>" not in html_content:
-            logger.warning("HTML output appears truncated (missing </html>).")
-        return html_content
-
     def sanitize_html_merged(self, merged: str) -> str:
         """
-        Pipeline to clean up the LLM output.
+        Pipeline to clean up the LLM output (fences, stray markdown in text nodes,
+        newlines, truncation check) in a single pass; see services/html_pipeline.
         """
         logger.info("Sanitizer: starting HTML pipeline...")
-
-        # 1. Remove Markdown Fences (Double check)
-        cleaned = merged.replace("```html", "").replace("```", "")
-
-        # 2. Convert accidental Markdown bold/italics to HTML
-        cleaned = self._convert_markdown_to_html_tags(cleaned)
-
-        # 3. Ensure newlines are standardized
-        cleaned = cleaned.replace("\r\n", "\n")
-
-        # 4. Structure check
-        cleaned = self._ensure_valid_structure(cleaned)
-
+        cleaned = sanitize_llm_html(merged)
         logger.info("Sanitizer: completed")
         return cleaned
 
@@ -101,10 +67,13 @@ TASK:
         logger.info("Starting convert_to_html: merging with LLM.")
 
         try:
+            # CSS, data URIs and comments are elided from the prompt and restored afterwards
+            template = compact_html(html_template)
             user_msg = f"""
 Here is the HTML/CSS Template:
 
-{html_template}
+{template.html}
+{template.note}
 Here is the raw extracted resume text:
 -----
 {raw_text}
@@ -122,7 +91,7 @@ IMPORTANT: Return ONLY the raw HTML code. No explanations.
             ]
 
             # Call OpenAI Chat Completion
-            response = await self.client.chat.completions.create(
+            response = await self.llm.create_chat_completion(
                 model=self.model_name,
                 messages=messages,
                 temperature=0,  # Low temperature for more deterministic code generation
@@ -132,7 +101,7 @@ IMPORTANT: Return ONLY the raw HTML code. No explanations.
             llm_output = response.choices[0].message.content
             
             # Initial cleanup
-            merged = await self.strip_fenced_code(llm_output)
+            merged = template.restore(await self.strip_fenced_code(llm_output))
             
             # Run sanitizer
             logger.info("Merge completed. Running sanitizer...")
@@ -1,11 +1,20 @@
+import asyncio
 import logging
 import time
 from pathlib import Path
+from typing import AsyncIterator, Tuple
 
 from fastapi import UploadFile
-from openai import AsyncOpenAI
 
-from ..config import settings
+from ..services.llm_client import llm_client
+from ..services.file_registry import file_registry
+from ..services.local_extractor import extract_locally
+from ..services.pdf_text import pdf_text_extractor
+from ..services.streaming import IncrementalHtmlSanitizer
+from ..services.template_registry import template_registry
+from ..services.html_pipeline import postprocess_html, sanitize_llm_html
+from ..services.prompt_compaction import CompactedHtml, compact_html
+from ..services.telemetry import telemetry
 
 logger = logging.getLogger(__name__)
 
@@ -16,48 +25,48 @@ class UnifiedResumeProcessor:
     Uses OpenAI's direct file processing (Responses API pattern) to read documents
     and generate HTML in a SINGLE API call.
     Replaces Vision/Image logic with File ID logic.
+    When the document has a good local text layer (office/text formats, born-digital
+    PDFs) the text is sent inline instead and the upload is skipped entirely.
     """
     def __init__(self):
-        self.client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
+        self.llm = llm_client
         self.model = "gpt-4o-mini" 
 
-    async def process(self, file: UploadFile, template_id: str, templates_dir: Path) -> dict:
-        try:
-            logger.info(f"🚀 Starting Unified Process (File Upload) for {file.filename}")
+    async def _local_text_input(self, filename: str, file_content: bytes):
+        """Returns an input_text item when the resume text can be read locally, else None."""
+        text = await asyncio.to_thread(extract_locally, file_content, filename)
+        if text is None and Path(filename).suffix.lower() == ".pdf":
+            pdf_result = await pdf_text_extractor.extract(file_content)
+            if pdf_result is not None and pdf_result["usable"]:
+                text = pdf_result["text"]
+        if text is None:
+            return None
+        logger.info(f"📝 Using local text for {filename}, skipping file upload")
+        return {"type": "input_text", "text": f"RESUME TEXT:\n{text}"}
 
-            # --- STEP 1: UPLOAD FILE TO OPENAI ---
+    async def _resume_input(self, filename: str, file_content: bytes) -> dict:
+        """Local text when available, otherwise the (deduplicated) OpenAI file upload."""
+        resume_input = await self._local_text_input(filename, file_content)
+        if resume_input is None:
             # We upload the raw file bytes directly, exactly like DocumentExtractor
-            file_content = await file.read()
-            
-            upload = await self.client.files.create(
-                file=(file.filename, file_content),
-                purpose="assistants"
-            )
-            file_id = upload.id
-            logger.info(f"📤 Uploaded file to OpenAI (file_id={file_id})")
+            file_id = await file_registry.get_or_upload(filename, file_content)
+            logger.info(f"📤 File available on OpenAI (file_id={file_id})")
+            resume_input = {"type": "input_file", "file_id": file_id}
+        return resume_input
 
-            # --- STEP 2: LOAD TEMPLATE ---
-            # Locate Template
-            template_path = templates_dir / f"{template_id}.html"
-            if not template_path.exists():
-                template_path = templates_dir / template_id
-                if not template_path.exists():
-                     template_path = templates_dir / "classic.html"
-            
-            if not template_path.exists():
-                return {"success": False, "error": f"Template {template_id} not found"}
+    def _load_template(self, template_id: str):
+        # Served from the in-memory registry; unknown ids fall back to the classic template
+        entry = template_registry.get(template_id) or template_registry.get("classic")
+        return entry.text if entry is not None else None
 
-            with open(template_path, "r", encoding="utf-8") as f:
-                html_template_str = f.read()
-
-            # --- STEP 3: CALL RESPONSES API ---
-            # We merge the extraction and HTML filling into one prompt
-            
-            system_instruction = """
+    def _build_request(self, resume_input: dict, template: CompactedHtml) -> dict:
+        # We merge the extraction and HTML filling into one prompt
+        
+        system_instruction = """
             You are an Expert Resume Engineer.
             
             TASK:
-            1. Read the attached resume file.
+            1. Read the attached resume (file or extracted text).
             2. Extract all relevant data (Experience, Education, Skills, Contact).
             3. Populate the HTML Template provided below with this data.
             
@@ -67,36 +76,57 @@ class UnifiedResumeProcessor:
             - **Output:** Return ONLY the raw valid HTML code. No markdown fences.
             """
 
-            # Construct the user text prompt containing the template
-            user_text_prompt = (
-                f"{system_instruction}\n\n"
-                "Here is the target HTML Template:\n"
-                "```html\n" + 
-                html_template_str + 
-                "\n```\n\n"
-                "INSTRUCTIONS: Fill this template using the data from the attached file. Return only the final HTML."
-            )
-
-            # Use the responses.create pattern from your DocumentExtractor
-            response = await self.client.responses.create(
-                model=self.model,
-                input=[
-                    {
-                        "role": "user",
-                        "content": [
-                            {"type": "input_file", "file_id": file_id},
-                            {"type": "input_text", "text": user_text_prompt}
-                        ],
-                    }
-                ],
-                max_output_tokens=8000
-            )
+        # Construct the user text prompt containing the template
+        user_text_prompt = (
+            f"{system_instruction}\n\n"
+            "Here is the target HTML Template:\n"
+            "```html\n" + 
+            template.html + 
+            "\n```\n\n" +
+            (template.note + "\n\n" if template.note else "") +
+            "INSTRUCTIONS: Fill this template using the data from the attached file. Return only the final HTML."
+        )
+
+        # Use the responses.create pattern from your DocumentExtractor
+        return dict(
+            model=self.model,
+            input=[
+                {
+                    "role": "user",
+                    "content": [
+                        resume_input,
+                        {"type": "input_text", "text": user_text_prompt}
+                    ],
+                }
+            ],
+            max_output_tokens=8000
+        )
+
+    async def process(self, file: UploadFile, template_id: str) -> dict:
+        try:
+            logger.info(f"🚀 Starting Unified Process (File Upload) for {file.filename}")
+
+            # --- STEP 1: LOCAL TEXT OR UPLOAD FILE TO OPENAI ---
+            with telemetry.span("read_upload"):
+                file_content = await file.read()
+            resume_input = await self._resume_input(file.filename, file_content)
+
+            # --- STEP 2: LOAD TEMPLATE ---
+            html_template_str = self._load_template(template_id)
+            if html_template_str is None:
+                return {"success": False, "error": f"Template {template_id} not found"}
+
+            # CSS, data URIs and comments are elided from the prompt and restored afterwards
+            with telemetry.span("compact"):
+                template = compact_html(html_template_str)
+
+            # --- STEP 3: CALL RESPONSES API ---
+            response = await self.llm.create_response(**self._build_request(resume_input, template))
 
             # --- STEP 4: CLEANUP ---
-            generated_html = response.output_text
-            
-            # Simple cleanup in case the AI added markdown fences
-            generated_html = generated_html.replace("```html", "").replace("```", "").strip()
+            # Fences, stray markdown and CRLF, in one pass over the document
+            with telemetry.span("sanitize"):
+                generated_html = sanitize_llm_html(template.restore(response.output_text))
 
             return {"success": True, "html_code": generated_html}
 
@@ -104,5 +134,51 @@ class UnifiedResumeProcessor:
             logger.error(f"Unified Process Failed: {e}", exc_info=True)
             return {"success": False, "error": str(e)}
 
+    async def process_stream(self, file: UploadFile, template_id: str) -> AsyncIterator[Tuple[str, dict]]:
+        """
+        Streaming variant of process(). Yields (event, data) tuples:
+        stage events (uploaded, extracting, generating, sanitizing, done), `token`
+        events carrying sanitized HTML deltas, and `error` on failure.
+        """
+        try:
+            logger.info(f"🚀 Starting Unified Process (Streaming) for {file.filename}")
+            file_content = await file.read()
+            yield "stage", {"stage": "uploaded"}
+
+            yield "stage", {"stage": "extracting"}
+            resume_input = await self._resume_input(file.filename, file_content)
+
+            html_template_str = self._load_template(template_id)
+            if html_template_str is None:
+                yield "error", {"error": f"Template {template_id} not found"}
+                return
+
+            with telemetry.span("compact"):
+                template = compact_html(html_template_str)
+
+            yield "stage", {"stage": "generating"}
+            sanitizer = IncrementalHtmlSanitizer()
+            restorer = template.stream_restorer()
+            async for delta in self.llm.stream_response(**self._build_request(resume_input, template)):
+                restored = restorer.feed(sanitizer.feed(delta))
+                if restored:
+                    yield "token", {"text": restored}
+            tail = restorer.finish()
+            if tail:
+                yield "token", {"text": tail}
+
+            yield "stage", {"stage": "sanitizing"}
+            # Fences/CRLF were handled incrementally; markdown needs whole text nodes
+            with telemetry.span("sanitize"):
+                generated_html = postprocess_html(
+                    template.restore(sanitizer.finish()), convert_markdown=True, warn_truncated=True
+                )
+
+            yield "done", {"stage": "done", "success": True, "html_code": generated_html}
+
+        except Exception as e:
+            logger.error(f"Unified Stream Failed: {e}", exc_info=True)
+            yield "error", {"error": str(e)}
+
 # Singleton instance
 unified_processor = UnifiedResumeProcessor()
\ No newline at end of file
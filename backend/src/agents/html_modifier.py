@@ -1,20 +1,47 @@
-from openai import AsyncOpenAI
 from ..config import settings
+from ..services.llm_client import llm_client
+from ..services.llm_scheduler import Priority
+from ..services.html_patch import PatchError, annotate_html, apply_patches
+from ..services.prompt_compaction import CompactedHtml, compact_html
+from ..services.quick_edits import quick_editor
+from ..services.telemetry import telemetry
 import re
 import logging
 import json
 import asyncio
-from typing import List, Dict 
+from typing import AsyncIterator, List, Dict, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
+# Requests that may need to see (and edit) the <style> block; for the rest it is elided
+STYLING_PROMPT = re.compile(
+    r"\b(css|style|styling|colou?rs?|fonts?|layout|margins?|padding|spacing|overlap\w*|overflow\w*|"
+    r"align\w*|width|height|size|bigger|smaller|theme|design|background|border|columns?|page|fit)\b",
+    re.IGNORECASE,
+)
+
+# String fields of a patch that may carry placeholders
+PATCH_MARKUP_FIELDS = ("text", "html", "value")
+
+# A JSON string value (escapes included) of the given key, for answers json.loads rejects
+_JSON_STRING_FIELD = {
+    name: re.compile(rf'"{name}"\s*:\s*"([^"\\]*(?:\\.[^"\\]*)*)"', re.DOTALL)
+    for name in ("reply", "modified_code")
+}
+
+
+def _json_unescape(value: str) -> str:
+    try:
+        return json.loads(f'"{value}"', strict=False)
+    except json.JSONDecodeError:
+        return value
+
+
 class HtmlModifier:
     def __init__(self):
-        logger.info("Initializing HtmlModifier with OpenAI Direct API...")
+        logger.info("Initializing HtmlModifier with shared LLM client...")
         
-        self.client = AsyncOpenAI(
-            api_key=settings.OPENAI_API_KEY
-        )
+        self.llm = llm_client
         
         # GPT-4o is recommended for large HTML manipulation tasks
         # self.model_name = "gpt-3.5-turbo"
@@ -49,6 +76,36 @@ Example response format:
   "reply": "I've updated your email address to the new one.",
   "modified_code": "<!DOCTYPE html><html>...</html>"
 }
+"""
+
+        # Patch mode: the model returns targeted edits instead of the whole document
+        self.patch_system_prompt = """
+You are an expert HTML & Inline CSS resume modifier and conversational assistant.
+You edit an HTML resume by returning a list of targeted edit operations (patches).
+Every element in the code you receive carries a `data-nid` attribute: use it to address elements.
+
+RULES:
+1. Always respond with a single JSON object with two keys: "reply" (conversational text) and "patches" (a list).
+2. Each patch is an object with "op" and "target" (a data-nid number, or a CSS selector matching exactly one element):
+   - {"op": "replace_text", "target": 12, "text": "new plain text"}  (replaces ALL content of the element with text)
+   - {"op": "set_attribute", "target": 12, "name": "style", "value": "color: red;"}  (value null removes the attribute)
+   - {"op": "set_inner_html", "target": 12, "html": "<b>new</b> content"}
+   - {"op": "replace_html", "target": 12, "html": "<li>replacement element</li>"}
+   - {"op": "insert_html", "target": 12, "position": "before|after|prepend|append", "html": "<li>new item</li>"}
+   - {"op": "remove", "target": 12}
+3. If no modification is needed (e.g., "What skills should I add?"), return "patches": [] and put your advice in "reply".
+4. Make ONLY the changes requested, using the smallest elements possible. Preserve inline `style` attributes unless asked to redesign.
+5. Never include `data-nid` attributes in the HTML you write.
+6. To change CSS rules, target the <style> element with set_inner_html and return its full new contents.
+
+STRICT OUTPUT RULE:
+Return ONLY the JSON object. No markdown fences, no other text.
+
+Example response format:
+{
+  "reply": "I've updated your email address.",
+  "patches": [{"op": "replace_text", "target": 17, "text": "jane@example.com"}]
+}
 """
 
     async def strip_fenced_code(self, text):
@@ -57,25 +114,35 @@ Example response format:
         text = re.sub(r"\n```$", "", text)
         return text.strip()
 
-    async def modify_html(self, html_code: str, prompt: str, history: List[Dict[str, str]] = None) -> dict:
-        logger.info(f"🔄 Modifying HTML code with prompt: {prompt[:100]}...")
-        
+    def _quick_edit(self, html_code: str, prompt: str) -> Optional[dict]:
+        """Local result for simple edits; only the user's request is classified, not the attached context."""
+        with telemetry.span("fast_path"):
+            return quick_editor.apply(html_code, prompt.rsplit("USER REQUEST:\n", 1)[-1])
+
+    def _compact(self, html_code: str, prompt: str) -> CompactedHtml:
+        with telemetry.span("compact"):
+            return compact_html(html_code, keep_css=bool(STYLING_PROMPT.search(prompt)))
+
+    def _build_messages(self, code: CompactedHtml, prompt: str, history: List[Dict[str, str]] = None,
+                        patch_mode: bool = False, summary: Optional[str] = None) -> list:
         # Build conversation history context
         history_text = ""
+        if summary:
+            history_text = f"Summary of the earlier conversation:\n{summary}\n\n"
         if history:
-            history_text = "Here is the conversation history that provides context for the request:\n"
+            history_text += "Here is the conversation history that provides context for the request:\n"
             for msg in history[-5:]:  # Only last 5 messages to avoid token limits
                 history_text += f"[{msg.role.upper()}]: {msg.content}\n"
             history_text += "\n"
 
-        try:
-            # Construct the full user message
-            user_message_content = f"""
+        # Construct the full user message
+        user_message_content = f"""
 Here is the current HTML code you must modify (or return unchanged):
 
 ===== CODE START =====
-{html_code}
+{code.html}
 ===== CODE END =====
+{code.note}
 
 {history_text}
 
@@ -83,21 +150,142 @@ Here is the user's final and most recent request:
 {prompt}
 
 IMPORTANT:
-Respond ONLY with a JSON object containing "reply" (conversational text) and "modified_code" (valid HTML).
+Respond ONLY with a JSON object containing "reply" (conversational text) and {'"patches" (a list of edit operations)' if patch_mode else '"modified_code" (valid HTML)'}.
 """
+        return [
+            {"role": "system", "content": self.patch_system_prompt if patch_mode else self.system_prompt},
+            {"role": "user", "content": user_message_content}
+        ]
+
+    async def _parse_response(self, response_text: str, html_code: str, code: Optional[CompactedHtml] = None) -> dict:
+        """
+        Turns the raw model output into the modify_html() result dict; `code` is
+        the compacted document the model saw, whose placeholders are restored.
+        Raises json.JSONDecodeError when neither JSON nor the regex fallback parse.
+        """
+        # -------------------------------------------------------
+        # JSON Parsing (Retaining your robust defensive logic)
+        # -------------------------------------------------------
+        
+        # Remove any markdown fences (just in case model ignores json_object enforcement)
+        response_text = re.sub(r'^```json\s*', '', response_text)
+        response_text = re.sub(r'^```\s*', '', response_text)
+        response_text = re.sub(r'\s*```$', '', response_text)
+        response_text = response_text.strip()
+        
+        try:
+            response_json = json.loads(response_text)
+        except json.JSONDecodeError as e:
+            logger.warning(f"Standard JSON load failed: {e}. Attempting fallback parsing.")
             
+            # Fallback: Try to extract reply and code separately using Regex
+            reply_match = _JSON_STRING_FIELD["reply"].search(response_text)
+            code_match = _JSON_STRING_FIELD["modified_code"].search(response_text)
+            
+            if reply_match and code_match:
+                response_json = {
+                    "reply": _json_unescape(reply_match.group(1)),
+                    "modified_code": _json_unescape(code_match.group(1))
+                }
+            else:
+                raise e # Re-raise if fallback fails
+
+        # Extract the keys
+        modified_html = response_json.get("modified_code", html_code)
+        reply_text = response_json.get("reply", "I've processed your request.")
+        
+        # Clean the code content (in case the model wrapped the inner HTML in fences)
+        modified_html = await self.strip_fenced_code(modified_html)
+        if code is not None and "modified_code" in response_json:
+            modified_html = code.restore(modified_html)
+        
+        # Validate that we got actual HTML back
+        if not modified_html or len(modified_html) < 100:
+            logger.error("Modified HTML is too short or empty")
+            return {
+                "success": False,
+                "error": "AI returned invalid or empty HTML"
+            }
+
+        logger.info(f"✅ Modification complete. Reply: {reply_text[:100]}...")
+        return {
+            "success": True, 
+            "modified_html": modified_html,
+            "reply_text": reply_text
+        }
+
+    async def _modify_with_patches(self, html_code: str, prompt: str, history: List[Dict[str, str]] = None,
+                                   summary: Optional[str] = None):
+        """
+        Asks the model for edit operations and applies them locally.
+        Returns the result dict, or None when the patch could not be obtained or applied.
+        """
+        try:
+            code = self._compact(annotate_html(html_code), prompt)
+            response = await asyncio.wait_for(
+                self.llm.create_chat_completion(
+                    model=self.model_name,
+                    messages=self._build_messages(code, prompt, history, patch_mode=True, summary=summary),
+                    temperature=0.2,
+                    response_format={"type": "json_object"},
+                    priority=Priority.INTERACTIVE
+                ),
+                timeout=120.0
+            )
+            response_text = response.choices[0].message.content
+            logger.info(f"AI patch response received. Length: {len(response_text)} chars")
+
+            response_json = json.loads(await self.strip_fenced_code(response_text))
+            if not isinstance(response_json, dict):
+                raise PatchError("Patch response is not a JSON object")
+            patches = response_json.get("patches") or []
+            if code.blobs and isinstance(patches, list):
+                for patch in patches:
+                    for field in PATCH_MARKUP_FIELDS:
+                        if isinstance(patch, dict) and isinstance(patch.get(field), str):
+                            patch[field] = code.restore_fragment(patch[field])
+            with telemetry.span("apply_patches"):
+                modified_html = apply_patches(html_code, patches) if patches else html_code
+            reply_text = response_json.get("reply", "I've processed your request.")
+
+            logger.info(f"✅ Applied {len(patches)} patches. Reply: {reply_text[:100]}...")
+            return {
+                "success": True,
+                "modified_html": modified_html,
+                "reply_text": reply_text
+            }
+
+        except (PatchError, json.JSONDecodeError) as e:
+            logger.warning(f"Patch mode failed ({e}), falling back to full regeneration")
+            return None
+
+    async def modify_html(self, html_code: str, prompt: str, history: List[Dict[str, str]] = None,
+                          summary: Optional[str] = None) -> dict:
+        logger.info(f"🔄 Modifying HTML code with prompt: {prompt[:100]}...")
+        response_text = ""
+
+        result = self._quick_edit(html_code, prompt)
+        if result is not None:
+            return result
+
+        try:
+            if settings.HTML_MODIFY_MODE == "patch":
+                # Only unusable patches fall back; timeouts and API errors would just repeat
+                result = await self._modify_with_patches(html_code, prompt, history, summary)
+                if result is not None:
+                    return result
+
             logger.info("Sending request to OpenAI API...")
 
             # Prepare the API call coroutine
             # We use response_format={"type": "json_object"} to enforce valid JSON output
-            api_coroutine = self.client.chat.completions.create(
+            code = self._compact(html_code, prompt)
+            api_coroutine = self.llm.create_chat_completion(
                 model=self.model_name,
-                messages=[
-                    {"role": "system", "content": self.system_prompt},
-                    {"role": "user", "content": user_message_content}
-                ],
+                messages=self._build_messages(code, prompt, history, summary=summary),
                 temperature=0.2,  # Low temperature for stability
-                response_format={"type": "json_object"} 
+                response_format={"type": "json_object"},
+                priority=Priority.INTERACTIVE
             )
             
             # Execute with timeout
@@ -110,54 +298,8 @@ Respond ONLY with a JSON object containing "reply" (conversational text) and "mo
             response_text = response.choices[0].message.content
             logger.info(f"AI response received. Length: {len(response_text)} chars")
 
-            # -------------------------------------------------------
-            # JSON Parsing (Retaining your robust defensive logic)
-            # -------------------------------------------------------
-            
-            # Remove any markdown fences (just in case model ignores json_object enforcement)
-            response_text = re.sub(r'^```json\s*', '', response_text)
-            response_text = re.sub(r'^```\s*', '', response_text)
-            response_text = re.sub(r'\s*```$', '', response_text)
-            response_text = response_text.strip()
-            
-            try:
-                response_json = json.loads(response_text)
-            except json.JSONDecodeError as e:
-                logger.warning(f"Standard JSON load failed: {e}. Attempting fallback parsing.")
-                
-                # Fallback: Try to extract reply and code separately using Regex
-                reply_match = re.search(r'"reply"\s*:\s*"([^"]*(?:\\.[^"]*)*)"', response_text)
-                code_match = re.search(r'"modified_code"\s*:\s*"([^"]*(?:\\.[^"]*)*)"', response_text, re.DOTALL)
-                
-                if reply_match and code_match:
-                    response_json = {
-                        "reply": reply_match.group(1),
-                        "modified_code": code_match.group(1)
-                    }
-                else:
-                    raise e # Re-raise if fallback fails
-
-            # Extract the keys
-            modified_html = response_json.get("modified_code", html_code)
-            reply_text = response_json.get("reply", "I've processed your request.")
-            
-            # Clean the code content (in case the model wrapped the inner HTML in fences)
-            modified_html = await self.strip_fenced_code(modified_html)
-            
-            # Validate that we got actual HTML back
-            if not modified_html or len(modified_html) < 100:
-                logger.error("Modified HTML is too short or empty")
-                return {
-                    "success": False,
-                    "error": "AI returned invalid or empty HTML"
-                }
-
-            logger.info(f"✅ Modification complete. Reply: {reply_text[:100]}...")
-            return {
-                "success": True, 
-                "modified_html": modified_html,
-                "reply_text": reply_text
-            }
+            with telemetry.span("parse_response"):
+                return await self._parse_response(response_text, html_code, code)
 
         except asyncio.TimeoutError:
             logger.error("⏱️ AI request timed out after 120 seconds")
@@ -178,4 +320,79 @@ Respond ONLY with a JSON object containing "reply" (conversational text) and "mo
             return {
                 "success": False,
                 "error": f"API communication failed: {str(e)}"
-            }
\ No newline at end of file
+            }
+
+    async def modify_html_stream(self, html_code: str, prompt: str, history: List[Dict[str, str]] = None) -> AsyncIterator[Tuple[str, dict]]:
+        """
+        Streaming variant of modify_html(). Yields (event, data) tuples: stage events
+        (generating, sanitizing, done), raw `token` deltas of the JSON answer, and a final
+        `done` event carrying the parsed reply and cleaned HTML (or `error`).
+        """
+        logger.info(f"🔄 Streaming modification with prompt: {prompt[:100]}...")
+        parts = []
+
+        result = self._quick_edit(html_code, prompt)
+        if result is not None:
+            yield "done", {
+                "stage": "done",
+                "success": True,
+                "html_code": result["modified_html"],
+                "reply_text": result["reply_text"]
+            }
+            return
+
+        try:
+            code = self._compact(html_code, prompt)
+            yield "stage", {"stage": "generating"}
+            stream = self.llm.stream_chat_completion(
+                model=self.model_name,
+                messages=self._build_messages(code, prompt, history),
+                temperature=0.2,
+                response_format={"type": "json_object"},
+                priority=Priority.INTERACTIVE
+            )
+            # The 120s budget counts time spent waiting on the model, not on the consumer
+            # between tokens, so it is applied to each __anext__() rather than around the yield
+            loop = asyncio.get_running_loop()
+            remaining = 120.0
+            try:
+                while True:
+                    started = loop.time()
+                    try:
+                        delta = await asyncio.wait_for(stream.__anext__(), timeout=max(remaining, 0.0))
+                    except StopAsyncIteration:
+                        break
+                    remaining -= loop.time() - started
+                    parts.append(delta)
+                    yield "token", {"text": delta}
+            finally:
+                await stream.aclose()
+
+            yield "stage", {"stage": "sanitizing"}
+            with telemetry.span("parse_response"):
+                result = await self._parse_response("".join(parts), html_code, code)
+            if not result["success"]:
+                yield "error", {"error": result["error"]}
+                return
+
+            yield "done", {
+                "stage": "done",
+                "success": True,
+                "html_code": result["modified_html"],
+                "reply_text": result["reply_text"]
+            }
+
+        except TimeoutError:
+            logger.error("⏱️ AI stream timed out after 120 seconds")
+            yield "error", {"error": "Request timed out. The resume might be too large or the request too complex."}
+
+        except json.JSONDecodeError as e:
+            logger.error(f"❌ Failed to parse streamed JSON: {e}")
+            yield "error", {"error": "AI returned invalid JSON format. Please try again."}
+
+        except Exception as e:
+            logger.error(f"❌ Streaming modification failed: {str(e)}", exc_info=True)
+            yield "error", {"error": f"API communication failed: {str(e)}"}
+
+# Singleton instance
+html_modifier = HtmlModifier()
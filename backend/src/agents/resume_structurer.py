@@ -0,0 +1,93 @@
+import json
+import time
+import logging
+from pydantic import ValidationError
+from ..services.llm_client import llm_client
+from ..services.extraction_cache import extraction_cache, extraction_key
+from ..services.resume_schema import Resume, SCHEMA_VERSION
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever STRUCTURE_PROMPT changes so cached documents are not reused
+PROMPT_VERSION = "v1"
+STRUCTURE_PROMPT = """
+You convert resume text into JSON. Return ONE JSON object with exactly these keys:
+{
+  "contact": {"name": "", "headline": null, "email": null, "phone": null, "location": null,
+              "website": null, "linkedin": null, "github": null, "address_lines": []},
+  "summary": null,
+  "experience": [{"organization": "", "title": "", "location": null, "start": null, "end": null, "bullets": []}],
+  "education": [{"institution": "", "degree": "", "location": null, "start": null, "end": null, "score": null, "details": []}],
+  "projects": [{"name": "", "subtitle": null, "date": null, "link": null, "bullets": []}],
+  "skills": [{"category": "", "items": []}],
+  "positions": [{"title": "", "subtitle": null, "date": null, "description": null}],
+  "achievements": [{"title": "", "subtitle": null, "date": null, "description": null}],
+  "certifications": [{"title": "", "subtitle": null, "date": null, "description": null}],
+  "publications": [],
+  "languages": [],
+  "interests": [],
+  "extra_sections": [{"title": "", "items": []}]
+}
+RULES:
+- Copy wording from the resume; do not invent facts. Use null / [] for anything missing.
+- Keep the original order of entries. Dates stay as written (e.g. "Jan 2020", "Present").
+- Plain text only: no HTML, no markdown.
+- Content that fits no other key goes into "extra_sections".
+"""
+
+
+class ResumeStructurer:
+    """
+    Turns extracted resume text into the versioned `Resume` document that the local
+    Jinja templates render from. Runs once per resume; switching templates afterwards
+    needs no LLM call. Results are cached by text hash in the extraction cache.
+    """
+
+    def __init__(self):
+        self.llm = llm_client
+        self.model = "gpt-4o-mini"
+
+    def _cache_key(self, text: str) -> str:
+        return extraction_key(text.encode("utf-8"), self.model, f"structure-{PROMPT_VERSION}-s{SCHEMA_VERSION}")
+
+    async def structure(self, text: str) -> dict:
+        start = time.time()
+        cache_key = self._cache_key(text)
+        try:
+            cached = await extraction_cache.get(cache_key)
+            if cached is not None:
+                try:
+                    resume = Resume.model_validate_json(cached)
+                    logger.info(f"⚡ Structured resume cache hit ({(time.time() - start) * 1000:.1f}ms)")
+                    return {"success": True, "resume": resume, "method": "cache", "execution_time": time.time() - start}
+                except ValidationError:
+                    logger.warning("⚠️ Cached structured resume no longer validates, regenerating")
+
+            logger.info("🤖 Calling gpt-4o-mini for resume structuring...")
+            response = await self.llm.create_chat_completion(
+                model=self.model,
+                messages=[
+                    {"role": "system", "content": STRUCTURE_PROMPT},
+                    {"role": "user", "content": f"RESUME TEXT:\n{text}"},
+                ],
+                response_format={"type": "json_object"},
+                temperature=0,
+                max_tokens=6000,
+            )
+            payload = json.loads(response.choices[0].message.content or "{}")
+            payload["schema_version"] = SCHEMA_VERSION
+            resume = Resume.model_validate(payload)
+
+            await extraction_cache.set(cache_key, resume.model_dump_json())
+            logger.info(f"🧱 Resume structured in {time.time() - start:.2f}s")
+            return {"success": True, "resume": resume, "method": "llm", "execution_time": time.time() - start}
+
+        except (json.JSONDecodeError, ValidationError) as e:
+            logger.error(f"❌ Structured resume was not valid: {e}")
+            return {"success": False, "error": f"Invalid structured resume: {e}"}
+        except Exception as e:
+            logger.exception("❌ Resume structuring failed")
+            return {"success": False, "error": str(e)}
+
+# Singleton instance
+resume_structurer = ResumeStructurer()
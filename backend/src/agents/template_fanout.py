@@ -0,0 +1,109 @@
+import asyncio
+import base64
+import logging
+import time
+from io import BytesIO
+from pathlib import Path
+from typing import AsyncIterator, Awaitable, Callable, List, Optional, Tuple
+
+from fastapi import UploadFile
+
+from ..config import settings
+from ..services.template_renderer import template_renderer
+from .document_extractor import document_extractor
+from .resume_structurer import resume_structurer
+from .html_extract_and_convert import unified_processor
+
+logger = logging.getLogger(__name__)
+
+
+class TemplateFanout:
+    """
+    Renders one uploaded resume into many templates.
+    The document is extracted and structured once; templates with a Jinja body are
+    then rendered locally, any others are filled by the LLM from the already
+    extracted text (no re-upload). Templates run concurrently, bounded by
+    FANOUT_CONCURRENCY, and each result is yielded as soon as it is ready.
+    """
+
+    def __init__(self, concurrency: Optional[int] = None):
+        self.concurrency = concurrency or settings.FANOUT_CONCURRENCY
+
+    async def _render_one(self, template_id: str, resume, text: str, filename: str,
+                          thumbnail: Optional[Callable[[str], Awaitable[bytes]]]) -> dict:
+        start = time.time()
+        if resume is not None and template_renderer.supports(template_id):
+            html_code = template_renderer.render(template_id, resume)
+            method = "local"
+        else:
+            upload = UploadFile(file=BytesIO(text.encode("utf-8")), filename=f"{Path(filename).stem}.txt")
+            result = await unified_processor.process(upload, template_id)
+            if not result["success"]:
+                raise RuntimeError(result["error"])
+            html_code = result["html_code"]
+            method = "llm"
+
+        data = {"template_id": template_id, "html_code": html_code, "method": method}
+        if thumbnail is not None:
+            png = await thumbnail(html_code)
+            data["thumbnail"] = f"data:image/png;base64,{base64.b64encode(png).decode('ascii')}"
+        data["elapsed"] = time.time() - start
+        return data
+
+    async def run(self, file_bytes: bytes, filename: str, template_ids: List[str],
+                  thumbnail: Optional[Callable[[str], Awaitable[bytes]]] = None) -> AsyncIterator[Tuple[str, dict]]:
+        """
+        Yields (event, data): `extracted` once, then `template` (or `template_error`)
+        per template in completion order, then `done`.
+        """
+        start = time.time()
+        yield "stage", {"stage": "extracting"}
+        extraction = await document_extractor.extract_from_bytes(file_bytes, filename)
+        if not extraction.get("success"):
+            yield "error", {"error": extraction.get("error")}
+            return
+        text = extraction["extracted_data"]
+
+        structured = await resume_structurer.structure(text)
+        resume = structured["resume"] if structured["success"] else None
+        if resume is None:
+            logger.warning(f"⚠️ Structuring failed, fan-out falls back to the LLM: {structured['error']}")
+
+        yield "extracted", {
+            "extracted_data": text,
+            "resume": resume.model_dump() if resume is not None else None,
+            "method": extraction["method"],
+        }
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def guarded(template_id: str) -> Tuple[str, dict]:
+            async with semaphore:
+                try:
+                    return "template", await self._render_one(template_id, resume, text, filename, thumbnail)
+                except Exception as e:
+                    logger.error(f"❌ Fan-out render of {template_id} failed: {e}")
+                    return "template_error", {"template_id": template_id, "error": str(e)}
+
+        tasks = [asyncio.create_task(guarded(template_id)) for template_id in template_ids]
+        failed = 0
+        try:
+            for next_result in asyncio.as_completed(tasks):
+                event, data = await next_result
+                failed += event == "template_error"
+                yield event, data
+        finally:
+            # Client went away: stop the remaining renders
+            for task in tasks:
+                task.cancel()
+
+        logger.info(f"🗂️ Fan-out of {len(template_ids)} templates finished in {time.time() - start:.2f}s")
+        yield "done", {
+            "success": True,
+            "rendered": len(template_ids) - failed,
+            "failed": failed,
+            "elapsed": time.time() - start,
+        }
+
+# Singleton instance
+template_fanout = TemplateFanout()
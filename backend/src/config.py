@@ -9,12 +9,124 @@ class Settings(BaseSettings):
 
     # OPENAI SETTINGS
     OPENAI_API_KEY: str
+    OPENAI_BASE_URL: Optional[str] = None  # point at an OpenAI-compatible stub for testing
+
+    # LLM CLIENT POOL
+    LLM_MAX_CONCURRENCY: int = 32  # in-flight LLM calls across all agents
+    LLM_MAX_CONNECTIONS: int = 64
+    LLM_MAX_KEEPALIVE_CONNECTIONS: int = 16
+    LLM_KEEPALIVE_EXPIRY: float = 60.0
+    LLM_TIMEOUT: float = 180.0  # per-call timeout (seconds)
+    LLM_CONNECT_TIMEOUT: float = 10.0
+
+    # LLM SCHEDULER
+    LLM_REQUESTS_PER_MINUTE: int = 500  # provider RPM limit (0 disables the bucket)
+    LLM_TOKENS_PER_MINUTE: int = 200000  # provider TPM limit (0 disables the bucket)
+    LLM_DEFAULT_COMPLETION_TOKENS: int = 1000  # output budget assumed when a call sets none
+    LLM_MAX_RETRIES: int = 3  # on 429, 5xx, timeouts and connection errors
+    LLM_RETRY_BASE_DELAY: float = 1.0
+    LLM_RETRY_MAX_DELAY: float = 30.0
+
+    # OPENAI FILE UPLOADS
+    OPENAI_FILE_TTL: float = 3600.0  # reuse an upload for identical bytes for this long
+    OPENAI_FILE_GC_INTERVAL: float = 300.0  # seconds between remote deletion sweeps
+    OPENAI_FILE_GC_BATCH_SIZE: int = 10
+
+    # EXTRACTION CACHE
+    EXTRACTION_CACHE_BACKEND: str = "memory"  # memory | sqlite | redis (through the shared state)
+    EXTRACTION_CACHE_TTL: float = 7 * 24 * 3600
+    EXTRACTION_CACHE_MAX_ENTRIES: int = 2000
+    EXTRACTION_CACHE_SQLITE_PATH: str = "cache/extraction.sqlite3"
+    REDIS_URL: str = "redis://localhost:6379/0"
+
+    # SHARED STATE (jobs, caches and rate limits across workers / containers)
+    SHARED_STATE_BACKEND: str = "auto"  # auto (Redis if it answers at startup) | redis | memory
+    SHARED_STATE_PREFIX: str = "resumegpt:"
+    SHARED_STATE_MEMORY_MAX_ENTRIES: int = 10000  # in-process fallback bounds for cache entries
+    SHARED_STATE_MEMORY_MAX_BYTES: int = 256 * 1024 * 1024
+    SHARED_STATE_MEMORY_DURABLE_MAX_ENTRIES: int = 50000  # jobs, edit sessions, locks, counters
+    SHARED_STATE_MEMORY_DURABLE_MAX_BYTES: int = 1024 * 1024 * 1024
+    REDIS_MAX_CONNECTIONS: int = 50
+    REDIS_SOCKET_TIMEOUT: float = 5.0
+
+    # LOCAL EXTRACTION
+    LOCAL_EXTRACTION_MIN_CHARS: int = 50  # shorter local results fall back to the LLM
+    PDF_TEXT_WORKERS: int = 2  # concurrent pdftotext jobs
+    PDF_TEXT_TIMEOUT: float = 20.0
+    PDF_TEXT_MIN_QUALITY: float = 0.6  # text-layer score needed to skip LLM extraction
     
     # Token limits
     MAX_TOKENS_FOR_MODIFY: int = 16000  
 
+    # HTML MODIFICATION
+    HTML_MODIFY_MODE: str = "patch"  # patch | full (whole-document regeneration)
+    MODIFY_FAST_PATH_ENABLED: bool = True  # apply simple edits (email, phone, titles, font, margins) without the LLM
+
+    # EDIT SESSIONS (/sessions/{document_id})
+    EDIT_SESSION_TTL: float = 4 * 3600  # seconds after the last edit
+    EDIT_SESSION_MAX_VERSIONS: int = 10  # versions kept per document (for diffs and GET ?version=)
+    EDIT_SESSION_HISTORY_TURNS: int = 3  # turns sent verbatim; older ones are summarized
+    EDIT_SESSION_SUMMARY_CHARS: int = 2000
+    EDIT_SESSION_CONTEXT_CHARS: int = 4000  # extracted text not shown in the document, per prompt
+    EDIT_SESSION_MAX_HTML_CHARS: int = 1_000_000
+
+    # PROMPT COMPACTION
+    PROMPT_COMPACTION_ENABLED: bool = True  # elide CSS/data URIs from LLM prompts, restore them afterwards
+    PROMPT_COMPACTION_MIN_BLOB_CHARS: int = 64  # shorter blobs are left inline
+
     # AUTH
     CLERK_JWKS_URL: str
+    CLERK_JWKS_REFRESH_INTERVAL: float = 3600.0  # background key set refresh (seconds)
+    CLERK_JWKS_MIN_REFETCH_INTERVAL: float = 30.0  # rate limit for unknown-kid refetches
+    AUTH_TOKEN_CACHE_TTL: float = 60.0  # 0 disables the verified-token cache
+    AUTH_TOKEN_CACHE_SIZE: int = 10000
+
+    # PDF RENDERING
+    PDF_RENDER_WORKERS: Optional[int] = 2  # None -> one worker per CPU
+    PDF_RENDER_MAX_QUEUE: int = 16  # pending renders beyond the busy workers
+    PDF_RENDER_TIMEOUT: float = 30.0  # seconds before a worker is killed
+
+    # PDF RENDER CACHE
+    PDF_CACHE_MAX_BYTES: int = 64 * 1024 * 1024  # in-memory LRU budget
+    PDF_CACHE_DIR: Optional[str] = None  # e.g. "cache/pdf" to enable the disk tier
+    PDF_CACHE_TTL: int = 24 * 3600  # seconds a disk entry stays valid since its last use
+    PDF_CACHE_DISK_MAX_BYTES: int = 512 * 1024 * 1024  # least recently used disk entries go beyond this
+    PDF_CACHE_SWEEP_INTERVAL: float = 600.0
+
+    # PDF ARTIFACTS (/generate-pdf downloads)
+    ARTIFACT_STORE_DIR: Optional[str] = "uploads/pdf"  # None streams PDFs from memory, nothing kept
+    ARTIFACT_STORE_MAX_BYTES: int = 1024 * 1024 * 1024  # least recently used artifacts go beyond this
+    ARTIFACT_TTL: float = 7 * 24 * 3600  # seconds since last download before an artifact is deleted
+    ARTIFACT_SWEEP_INTERVAL: float = 600.0
+    ARTIFACT_ACCEL_REDIRECT_PREFIX: Optional[str] = None  # e.g. "/_artifacts": nginx sends the file (X-Accel-Redirect)
+
+    # PAGE PREVIEWS (/preview-page, template thumbnails)
+    PREVIEW_CACHE_MAX_BYTES: int = 32 * 1024 * 1024  # in-memory LRU of page rasters
+    PREVIEW_PAGE_COUNT_ENTRIES: int = 1000
+    PREVIEW_RASTER_WORKERS: int = 2  # pdftoppm processes at once
+    PREVIEW_DEFAULT_DPI: int = 72
+    PREVIEW_MAX_DPI: int = 150
+    TEMPLATE_THUMBNAIL_DPI: int = 40
+
+    # TEMPLATE REGISTRY
+    TEMPLATE_WATCH_INTERVAL: float = 2.0  # seconds between template directory scans
+    TEMPLATE_CACHE_MAX_AGE: int = 300  # Cache-Control max-age for template responses
+
+    # TEMPLATE FAN-OUT
+    FANOUT_CONCURRENCY: int = 4  # templates rendered (and thumbnailed) at once per request
+    FANOUT_THUMBNAIL_DPI: int = 40
+
+    # BACKGROUND JOBS
+    JOB_WORKERS: int = 4  # /jobs generations running at once
+    JOB_MAX_QUEUE: int = 100  # queued jobs beyond which submissions get 503
+    JOB_RESULT_TTL: float = 3600.0  # seconds a finished job (and its idempotency key) is kept
+    JOB_PENDING_TTL: float = 24 * 3600  # queued/running records outlive a lost worker by at most this
+    JOB_LEASE_TTL: float = 60.0  # a running job whose worker stops renewing this long is requeued
+    JOB_MAX_ATTEMPTS: int = 2  # runs before a job whose workers keep dying is marked failed
+
+    # TELEMETRY
+    METRICS_ENABLED: bool = True  # per-stage Prometheus histograms at /metrics
+    SERVER_TIMING_ENABLED: bool = True  # per-stage Server-Timing response headers
    
     class Config:
         env_file = ".env"
@@ -1,34 +1,83 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException, Form, Response, Depends
+from fastapi import FastAPI, UploadFile, File, HTTPException, Form, Response, Depends, Header
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, JSONResponse, HTMLResponse
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from typing import List, Optional, Tuple
+from contextlib import asynccontextmanager
 import logging
-import aiofiles
-import uuid
-import re
+import asyncio
+import time
+import hashlib
 import os
 import jwt 
-from jwt import PyJWKClient
 from pathlib import Path
 from io import BytesIO # <--- ADDED for in-memory file conversion
-from weasyprint import HTML
-from weasyprint.text.fonts import FontConfiguration
 
 # --- Internal Imports ---
 from .config import settings
-from .agents.document_extractor import DocumentExtractor
+from .agents.document_extractor import document_extractor
 from .agents.html_extract_and_convert import unified_processor
-from .agents.html_modifier import HtmlModifier
+from .agents.html_modifier import html_modifier
+from .agents.resume_structurer import resume_structurer
+from .agents.template_fanout import template_fanout
+from .services.render_engine import render_engine, RenderQueueFull, RenderTimeout
+from .services.render_cache import render_cache, render_key
+from .services.clerk_auth import ClerkTokenVerifier
+from .services.llm_client import llm_client
+from .services.llm_scheduler import llm_scheduler, bind_user
+from .services.file_registry import file_registry
+from .services.extraction_cache import extraction_cache
+from .services.pdf_text import pdf_text_extractor
+from .services.streaming import sse_response
+from .services.resume_schema import Resume
+from .services.template_renderer import template_renderer
+from .services.page_images import page_image_cache, IMAGE_MEDIA_TYPES
+from .services.template_registry import template_registry, CachedBody
+from .services.html_pipeline import prepare_html_for_pdf
+from .services.telemetry import telemetry, TelemetryMiddleware
+from .services.job_queue import job_manager, JobQueueFull, IdempotencyConflict, snapshot as job_snapshot
+from .services.shared_state import shared_state
+from .services.artifact_store import artifact_store, parse_range
+from .services.edit_sessions import edit_sessions, SessionBusy, html_diff, missing_context
+from .services.quick_edits import quick_editor
 
 logging.basicConfig(level=logging.DEBUG if settings.DEBUG else logging.INFO)
 logger = logging.getLogger(__name__)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await shared_state.start()
+    llm_client.start()
+    file_registry.start()
+    await template_registry.start()
+    render_engine.start()
+    artifact_store.start()
+    thumbnails_task = asyncio.create_task(warm_template_thumbnails())
+    job_manager.start()
+    render_cache.start()
+    if token_verifier:
+        await token_verifier.start()
+    yield
+    if token_verifier:
+        await token_verifier.stop()
+    await job_manager.stop()
+    thumbnails_task.cancel()
+    await render_cache.stop()
+    await artifact_store.stop()
+    render_engine.shutdown()
+    await template_registry.stop()
+    await file_registry.stop()
+    await extraction_cache.close()
+    pdf_text_extractor.shutdown()
+    await llm_client.close()
+    await shared_state.close()
+
 app = FastAPI(
     title=settings.APP_NAME,
     version=settings.VERSION,
-    debug=settings.DEBUG
+    debug=settings.DEBUG,
+    lifespan=lifespan
 )
 
 app.add_middleware(
@@ -37,12 +86,13 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing", "Content-Location", "X-Page-Count"],
 )
+# Outermost, so Server-Timing and the route histograms include CORS and auth
+app.add_middleware(TelemetryMiddleware, telemetry=telemetry)
 
 # --- Directories ---
-UPLOAD_DIR = Path("uploads")
 TEMPLATES_UPLOAD_DIR = Path("templates")
-UPLOAD_DIR.mkdir(exist_ok=True)
 TEMPLATES_UPLOAD_DIR.mkdir(exist_ok=True)
 
 # --- Security Configuration ---
@@ -50,14 +100,16 @@ security = HTTPBearer()
 
 # IMPORTANT: You must add this to your .env or config.py
 CLERK_JWKS_URL = os.environ.get("CLERK_JWKS_URL", getattr(settings, "CLERK_JWKS_URL", ""))
+token_verifier = ClerkTokenVerifier(CLERK_JWKS_URL) if CLERK_JWKS_URL else None
 
-def verify_clerk_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
+async def verify_clerk_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
     """
     Middleware: Verifies the Clerk JWT sent in the Authorization header.
     """
     if not CLERK_JWKS_URL:
         if settings.DEBUG:
              logger.warning("⚠️ CLERK_JWKS_URL not set. Skipping verification (DEBUG ONLY).")
+             bind_user("debug_user")
              return {"sub": "debug_user"}
         logger.error("CLERK_JWKS_URL is missing. Cannot verify tokens.")
         raise HTTPException(status_code=500, detail="Server authentication misconfigured")
@@ -65,16 +117,11 @@ def verify_clerk_token(credentials: HTTPAuthorizationCredentials = Depends(secur
     token = credentials.credentials
     
     try:
-        jwks_client = PyJWKClient(CLERK_JWKS_URL)
-        signing_key = jwks_client.get_signing_key_from_jwt(token)
-        
-        payload = jwt.decode(
-            token,
-            signing_key.key,
-            algorithms=["RS256"],
-            options={"verify_exp": True}
-        )
-        return payload
+        with telemetry.span("auth"):
+            claims = await token_verifier.verify(token)
+        # LLM calls made while serving this request queue fairly per user
+        bind_user(claims.get("sub"))
+        return claims
 
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token has expired")
@@ -96,35 +143,126 @@ class ModifyRequest(BaseModel):
     history: List[ChatMessage] = Field(default_factory=list)
     extracted_data: Optional[str] = None # <--- ADDED: Allow frontend to send context
 
+class OpenSessionRequest(BaseModel):
+    html_code: str
+    extracted_data: Optional[str] = None
+
+class SessionModifyRequest(BaseModel):
+    prompt: str
+    base_version: Optional[str] = None  # rejected with 409 if the document moved on since
+    diff: bool = False  # return a unified diff against base_version instead of the full HTML
+
+class RenderRequest(BaseModel):
+    template_id: str
+    resume: Resume
+
 # --- Helper Functions ---
-def preprocess_html_for_pdf(html_content: str) -> str:
-    unsupported_properties = [
-        r'backdrop-filter\s*:\s*[^;]+;',
-        r'transform\s*:\s*translate[^;]+;',
-        r'filter\s*:\s*blur[^;]+;',
-        r'clip-path\s*:\s*[^;]+;',
-        r'mix-blend-mode\s*:\s*[^;]+;',
-    ]
-    
-    for prop in unsupported_properties:
-        html_content = re.sub(prop, '', html_content, flags=re.IGNORECASE)
-    
-    print_css = """
-    <style>
-        @page { size: A4; margin: 0; }
-        body { margin: 0; padding: 0; -webkit-print-color-adjust: exact; print-color-adjust: exact; }
-        * { box-sizing: border-box; }
-    </style>
+async def convert_word_upload(file: UploadFile):
     """
-    
-    if '</head>' in html_content:
-        html_content = html_content.replace('</head>', f'{print_css}</head>')
-    elif '<body>' in html_content:
-        html_content = html_content.replace('<body>', f'<body>{print_css}')
-    else:
-        html_content = print_css + html_content
-    
-    return html_content
+    OpenAI's API does not accept .docx. We intercept them, extract text,
+    and pass it as a .txt file instead. Returns (upload, error).
+    """
+    filename = file.filename.lower()
+    if not filename.endswith((".docx", ".doc")):
+        return file, None
+
+    logger.info(f"📄 Intercepted .docx: Converting {filename} to .txt for AI...")
+    try:
+        # 1. Read the file
+        file_bytes = await file.read()
+        
+        # 2. Extract text using DocumentExtractor (.docx is parsed locally, no LLM call)
+        result = await document_extractor.extract_from_bytes(file_bytes, file.filename)
+        
+        if not result.get("success"):
+            return file, f"Extraction failed: {result.get('error')}"
+        
+        text_content = result["extracted_data"]
+        
+        # 3. Create a mock .txt file in memory
+        # We wrap the text in a BytesIO object so it acts like a file
+        new_file_obj = BytesIO(text_content.encode("utf-8"))
+        
+        # 4. Create a new UploadFile object with .txt extension
+        # This tricks the unified_processor into thinking it received a text file
+        new_filename = Path(file.filename).stem + ".txt"
+        return UploadFile(file=new_file_obj, filename=new_filename), None
+        
+    except Exception as e:
+        logger.error(f"Error pre-processing docx: {e}")
+        return file, f"Failed to convert docx: {str(e)}"
+
+async def render_pdf(html_content: str) -> bytes:
+    """Renders on the worker pool, mapping engine errors to HTTP responses."""
+    try:
+        return await render_engine.render(html_content)
+    except RenderQueueFull as e:
+        raise HTTPException(
+            status_code=503,
+            detail="PDF renderer is busy, please retry",
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    except RenderTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
+
+async def render_page_image(processed_html: str, cache_key: str, page: int, dpi: int, fmt: str) -> bytes:
+    """One page as an image, through the page raster cache and the PDF render cache."""
+    async def load_pdf() -> bytes:
+        return await render_cache.get_or_render(cache_key, lambda: render_pdf(processed_html))
+
+    with telemetry.span("png"):
+        return await page_image_cache.get_or_render(cache_key, page, dpi, fmt, load_pdf)
+
+async def render_thumbnail(html_content: str) -> bytes:
+    """PNG of the first page, reusing the PDF render cache."""
+    with telemetry.span("pdf_prepare"):
+        processed_html = prepare_html_for_pdf(html_content)
+    return await render_page_image(processed_html, render_key(processed_html), 1, settings.FANOUT_THUMBNAIL_DPI, "png")
+
+async def template_thumbnail(template_id: str, fmt: str = "png") -> Tuple[str, bytes]:
+    """(etag, image) of a template's first page."""
+    entry = template_registry.get(template_id)
+    if entry is None:
+        raise KeyError(template_id)
+    processed_html = prepare_html_for_pdf(entry.text)
+    cache_key = render_key(processed_html)
+    dpi = settings.TEMPLATE_THUMBNAIL_DPI
+    image = await render_page_image(processed_html, cache_key, 1, dpi, fmt)
+    return f'"{cache_key}-p1-{dpi}.{fmt}"', image
+
+async def warm_template_thumbnails():
+    """Renders every template's thumbnail once at startup, so the template library opens instantly."""
+    started = time.perf_counter()
+    warmed = 0
+    for template_id in template_registry.ids():
+        try:
+            await template_thumbnail(template_id)
+            warmed += 1
+        except Exception as e:
+            logger.warning(f"Thumbnail for template {template_id} failed: {e}")
+    logger.info(f"🖼️ Warmed {warmed} template thumbnails in {time.perf_counter() - started:.1f}s")
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return etag in candidates
+
+def cached_body_response(body: CachedBody, media_type: str, if_none_match: Optional[str], accept_encoding: Optional[str]) -> Response:
+    """Serves a precompressed in-memory body with ETag / Cache-Control, or 304."""
+    encoding, content, etag = body.select(accept_encoding)
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"private, max-age={settings.TEMPLATE_CACHE_MAX_AGE}",
+        "Vary": "Accept-Encoding, Authorization",
+    }
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    return Response(content=content, media_type=media_type, headers=headers)
 
 # --- Routes ---
 
@@ -148,9 +286,9 @@ async def upload_file(
         raise HTTPException(status_code=400, detail="Unsupported file format")
 
     try:
-        file_bytes = await file.read()
-        extractor = DocumentExtractor()
-        result = await extractor.extract_from_bytes(file_bytes, file.filename)
+        with telemetry.span("read_upload"):
+            file_bytes = await file.read()
+        result = await document_extractor.extract_from_bytes(file_bytes, file.filename)
 
         if not result.get("success"):
             raise HTTPException(status_code=500, detail=result.get("error"))
@@ -161,6 +299,7 @@ async def upload_file(
             "extracted_text": result["extracted_data"],
             "processing_time": result["execution_time"],
             "method": result["method"],
+            "extraction": result.get("details", {}),
         }
     except Exception as e:
         logger.exception("❌ Error during upload processing")
@@ -176,40 +315,11 @@ async def process_html(
     """UNIFIED ENDPOINT: Takes Resume + Template ID -> Returns Filled HTML."""
     logger.info(f"⚙️ Processing HTML for user {user.get('sub')}")
 
-    # --- FIX START: Handle .docx files for OpenAI ---
-    # OpenAI's API does not accept .docx. We intercept them, extract text, 
-    # and pass it as a .txt file instead.
-    filename = file.filename.lower()
-    if filename.endswith((".docx", ".doc")):
-        logger.info(f"📄 Intercepted .docx: Converting {filename} to .txt for AI...")
-        try:
-            # 1. Read the file
-            file_bytes = await file.read()
-            
-            # 2. Extract text using DocumentExtractor
-            extractor = DocumentExtractor()
-            result = await extractor.extract_from_bytes(file_bytes, file.filename)
-            
-            if not result.get("success"):
-                return {"success": False, "error": f"Extraction failed: {result.get('error')}"}
-            
-            text_content = result["extracted_data"]
-            
-            # 3. Create a mock .txt file in memory
-            # We wrap the text in a BytesIO object so it acts like a file
-            new_file_obj = BytesIO(text_content.encode("utf-8"))
-            
-            # 4. Create a new UploadFile object with .txt extension
-            # This tricks the unified_processor into thinking it received a text file
-            new_filename = Path(file.filename).stem + ".txt"
-            file = UploadFile(file=new_file_obj, filename=new_filename)
-            
-        except Exception as e:
-            logger.error(f"Error pre-processing docx: {e}")
-            return {"success": False, "error": f"Failed to convert docx: {str(e)}"}
-    # --- FIX END ---
+    file, error = await convert_word_upload(file)
+    if error:
+        return {"success": False, "error": error}
 
-    result = await unified_processor.process(file, template_id, TEMPLATES_UPLOAD_DIR)
+    result = await unified_processor.process(file, template_id)
     
     if not result["success"]:
         return {"success": False, "error": result["error"]}
@@ -221,31 +331,272 @@ async def process_html(
     }
 
 
+@app.post("/process_html/stream")
+async def process_html_stream(
+    file: UploadFile = File(...),
+    template_id: str = Form(...),
+    user: dict = Depends(verify_clerk_token)
+):
+    """Streaming /process_html: stage and token events as Server-Sent Events."""
+    logger.info(f"⚙️ Streaming HTML processing for user {user.get('sub')}")
+
+    file, error = await convert_word_upload(file)
+    # The request's UploadFile is closed once the handler returns, so buffer it first
+    upload = UploadFile(file=BytesIO(await file.read()), filename=file.filename)
+
+    async def events():
+        if error:
+            yield "error", {"error": error}
+            return
+        async for event in unified_processor.process_stream(upload, template_id):
+            yield event
+
+    return sse_response(events())
+
+
+async def run_process_html_job(payload: dict, file_bytes: bytes) -> dict:
+    """Job handler for /jobs/process_html (may run in any worker process)."""
+    upload = UploadFile(file=BytesIO(file_bytes), filename=payload["filename"])
+    upload, error = await convert_word_upload(upload)
+    if error:
+        return {"success": False, "error": error}
+    return await unified_processor.process(upload, payload["template_id"])
+
+job_manager.register("process_html", run_process_html_job)
+
+
+def job_response(record: dict, created: bool) -> JSONResponse:
+    return JSONResponse(
+        status_code=202 if created else 200,
+        content={
+            **job_snapshot(record),
+            "status_url": f"/jobs/{record['id']}",
+            "events_url": f"/jobs/{record['id']}/events",
+        },
+    )
+
+
+@app.post("/jobs/process_html", status_code=202)
+async def submit_process_html_job(
+    file: UploadFile = File(...),
+    template_id: str = Form(...),
+    idempotency_key: Optional[str] = Header(None),
+    user: dict = Depends(verify_clerk_token)
+):
+    """
+    Background /process_html: returns a job id at once; poll GET /jobs/{id} or
+    subscribe to GET /jobs/{id}/events. Resending with the same Idempotency-Key
+    returns the original job instead of starting another generation.
+    """
+    file_bytes = await file.read()
+    fingerprint = hashlib.sha256(file_bytes + b"\0" + template_id.encode("utf-8")).hexdigest()
+
+    try:
+        record, created = await job_manager.submit(
+            "process_html",
+            user.get("sub"),
+            {"filename": file.filename, "template_id": template_id},
+            blob=file_bytes,
+            idempotency_key=idempotency_key,
+            fingerprint=fingerprint,
+        )
+    except IdempotencyConflict as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except JobQueueFull:
+        raise HTTPException(status_code=503, detail="Too many queued jobs, please retry", headers={"Retry-After": "30"})
+
+    if created:
+        logger.info(f"🧾 Queued job {record['id']} ({file.filename}, template {template_id}) for user {user.get('sub')}")
+    return job_response(record, created)
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(
+    job_id: str,
+    user: dict = Depends(verify_clerk_token)
+):
+    """Job status, with the result (or error) once finished."""
+    record = await job_manager.get(job_id, user.get("sub"))
+    if record is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    return job_snapshot(record)
+
+
+@app.get("/jobs/{job_id}/events")
+async def job_events(
+    job_id: str,
+    user: dict = Depends(verify_clerk_token)
+):
+    """Job status changes as Server-Sent Events, ending with a `done` event."""
+    if await job_manager.get(job_id, user.get("sub")) is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    return sse_response(job_manager.watch(job_id))
+
+
+@app.post("/process_html/fanout")
+async def process_html_fanout(
+    file: UploadFile = File(...),
+    template_ids: Optional[str] = Form(None),
+    thumbnails: bool = Form(False),
+    user: dict = Depends(verify_clerk_token)
+):
+    """
+    One upload -> every template (or the comma-separated `template_ids`), streamed
+    as Server-Sent Events as each one finishes.
+    """
+    logger.info(f"🗂️ Fan-out request: {file.filename} by user {user.get('sub')}")
+
+    available = template_registry.ids()
+    if template_ids:
+        requested = [t.strip() for t in template_ids.split(",") if t.strip()]
+        unknown = [t for t in requested if t not in available]
+        if unknown:
+            raise HTTPException(status_code=404, detail=f"Unknown templates: {', '.join(unknown)}")
+        selected = list(dict.fromkeys(requested))
+    else:
+        selected = available
+
+    file_bytes = await file.read()
+    return sse_response(template_fanout.run(
+        file_bytes,
+        file.filename,
+        selected,
+        thumbnail=render_thumbnail if thumbnails else None,
+    ))
+
+
+@app.post("/resume/structure")
+async def structure_resume(
+    file: UploadFile = File(...),
+    user: dict = Depends(verify_clerk_token)
+):
+    """Extracts the upload once and returns the structured resume JSON used by /resume/render."""
+    logger.info(f"🧱 Structure request: {file.filename} by user {user.get('sub')}")
+
+    extraction = await document_extractor.extract_from_bytes(await file.read(), file.filename)
+    if not extraction.get("success"):
+        raise HTTPException(status_code=500, detail=extraction.get("error"))
+
+    result = await resume_structurer.structure(extraction["extracted_data"])
+    if not result["success"]:
+        raise HTTPException(status_code=502, detail=result["error"])
+
+    return {
+        "success": True,
+        "resume": result["resume"].model_dump(),
+        "extracted_data": extraction["extracted_data"],
+        "method": result["method"],
+    }
+
+
+@app.post("/resume/render")
+async def render_resume(
+    req: RenderRequest,
+    user: dict = Depends(verify_clerk_token)
+):
+    """Renders structured resume JSON into a template locally (no LLM call)."""
+    try:
+        html_code = template_renderer.render(req.template_id, req.resume)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=e.args[0])
+    return {"success": True, "html_code": html_code}
+
+
+def pdf_download_response(
+    key: str,
+    path: Optional[Path],
+    pdf_bytes: Optional[bytes],
+    range_header: Optional[str],
+    if_range: Optional[str],
+) -> Response:
+    """
+    Serves a PDF download with Range support: a stored artifact through nginx
+    (X-Accel-Redirect) or FileResponse (which uses the server's pathsend when
+    available), otherwise the bytes straight from memory.
+    """
+    etag = f'"{key}"'
+    headers = {
+        "ETag": etag,
+        "Accept-Ranges": "bytes",
+        "Content-Disposition": 'attachment; filename="resume.pdf"',
+    }
+    if path is not None:
+        headers["Content-Location"] = f"/pdf/{key}"
+        if settings.ARTIFACT_ACCEL_REDIRECT_PREFIX:
+            relative = path.relative_to(artifact_store.root).as_posix()
+            headers["X-Accel-Redirect"] = f"{settings.ARTIFACT_ACCEL_REDIRECT_PREFIX.rstrip('/')}/{relative}"
+            return Response(media_type="application/pdf", headers=headers)
+        return FileResponse(path=path, media_type="application/pdf", headers=headers)
+
+    size = len(pdf_bytes)
+    try:
+        # If-Range: only send a part when the client's copy is still current
+        byte_range = parse_range(range_header, size) if not if_range or if_range == etag else None
+    except ValueError:
+        return Response(status_code=416, headers={"Content-Range": f"bytes */{size}"})
+    if byte_range is None:
+        return Response(content=pdf_bytes, media_type="application/pdf", headers=headers)
+    start, end = byte_range
+    headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    return Response(content=pdf_bytes[start:end + 1], status_code=206, media_type="application/pdf", headers=headers)
+
+
 @app.post("/generate-pdf")
 async def generate_pdf(
     html_content: str = Form(...),
+    if_none_match: Optional[str] = Header(None),
+    range_header: Optional[str] = Header(None, alias="Range"),
+    if_range: Optional[str] = Header(None),
     user: dict = Depends(verify_clerk_token)
 ):
-    """Converts HTML string to PDF using WeasyPrint."""
+    """
+    Converts HTML string to PDF using WeasyPrint. The PDF is kept in the artifact
+    store under the render key, so downloading the same resume again (here or via
+    GET /pdf/{key}, see Content-Location) does not render it again.
+    """
     try:
-        output_filename = f"resume-{uuid.uuid4().hex[:8]}.pdf"
-        output_path = UPLOAD_DIR / output_filename
-
-        processed_html = preprocess_html_for_pdf(html_content)
-        font_config = FontConfiguration()
-        
-        HTML(string=processed_html).write_pdf(output_path, font_config=font_config)
-        
-        return FileResponse(
-            path=output_path,
-            filename="resume.pdf",
-            media_type="application/pdf"
-        )
+        with telemetry.span("pdf_prepare"):
+            processed_html = prepare_html_for_pdf(html_content)
+        cache_key = render_key(processed_html)
+        etag = f'"{cache_key}"'
+        if etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers={"ETag": etag})
+
+        path = await artifact_store.get(cache_key)
+        pdf_bytes = None
+        if path is None:
+            pdf_bytes = await render_cache.get_or_render(cache_key, lambda: render_pdf(processed_html))
+            if artifact_store.enabled:
+                with telemetry.span("pdf_save"):
+                    path = await artifact_store.put(cache_key, pdf_bytes)
+
+        return pdf_download_response(cache_key, path, pdf_bytes, range_header, if_range)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"PDF Generation Error: {e}", exc_info=True)
         raise HTTPException(500, detail=f"PDF Generation failed: {str(e)}")
 
 
+@app.get("/pdf/{key}")
+async def download_pdf(
+    key: str,
+    if_none_match: Optional[str] = Header(None),
+    range_header: Optional[str] = Header(None, alias="Range"),
+    if_range: Optional[str] = Header(None),
+    user: dict = Depends(verify_clerk_token)
+):
+    """Re-downloads (or resumes, with Range) a PDF produced by /generate-pdf while it is stored."""
+    if len(key) != 64 or any(c not in "0123456789abcdef" for c in key):
+        raise HTTPException(status_code=404, detail="PDF not found")
+    if etag_matches(if_none_match, f'"{key}"'):
+        return Response(status_code=304, headers={"ETag": f'"{key}"'})
+    path = await artifact_store.get(key)
+    if path is None:
+        raise HTTPException(status_code=404, detail="PDF not found or expired")
+    return pdf_download_response(key, path, None, range_header, if_range)
+
+
 @app.post("/modify-resume")
 async def modify_resume(
     req: ModifyRequest,
@@ -261,8 +612,7 @@ async def modify_resume(
         if req.extracted_data:
             enhanced_prompt = f"CONTEXT FROM ORIGINAL RESUME:\n{req.extracted_data}\n\nUSER REQUEST:\n{req.prompt}"
 
-        modifier = HtmlModifier()
-        result = await modifier.modify_html(
+        result = await html_modifier.modify_html(
             html_code=req.html_code,
             prompt=enhanced_prompt, # <--- CHANGED: Send context-aware prompt
             history=req.history
@@ -282,55 +632,289 @@ async def modify_resume(
         raise HTTPException(500, detail=f"Modification failed: {str(e)}")
 
 
+@app.post("/modify-resume/stream")
+async def modify_resume_stream(
+    req: ModifyRequest,
+    user: dict = Depends(verify_clerk_token)
+):
+    """Streaming /modify-resume: stage and token events as Server-Sent Events."""
+    logger.info(f"🔄 Streaming modify request from user {user.get('sub')}")
+
+    enhanced_prompt = req.prompt
+    if req.extracted_data:
+        enhanced_prompt = f"CONTEXT FROM ORIGINAL RESUME:\n{req.extracted_data}\n\nUSER REQUEST:\n{req.prompt}"
+
+    return sse_response(html_modifier.modify_html_stream(
+        html_code=req.html_code,
+        prompt=enhanced_prompt,
+        history=req.history
+    ))
+
+
+@app.put("/sessions/{document_id}")
+async def open_edit_session(
+    document_id: str,
+    req: OpenSessionRequest,
+    user: dict = Depends(verify_clerk_token)
+):
+    """Starts a server-side editing session: the document and context are uploaded once."""
+    try:
+        record = await edit_sessions.open(user.get("sub"), document_id, req.html_code, req.extracted_data)
+    except ValueError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    return {"success": True, "document_id": document_id, "version_id": record["version"]}
+
+
+@app.get("/sessions/{document_id}")
+async def get_edit_session(
+    document_id: str,
+    version: Optional[str] = None,
+    user: dict = Depends(verify_clerk_token)
+):
+    """The current (or a recent) version of a session's document."""
+    record = await edit_sessions.get(user.get("sub"), document_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail="Session not found or expired")
+    html_code = await edit_sessions.load(record, version)
+    if html_code is None:
+        raise HTTPException(status_code=404, detail="Version not found or expired")
+    return {
+        "document_id": document_id,
+        "version_id": version or record["version"],
+        "current_version": record["version"],
+        "versions": record["versions"],
+        "html_code": html_code,
+    }
+
+
+@app.post("/sessions/{document_id}/modify")
+async def modify_edit_session(
+    document_id: str,
+    req: SessionModifyRequest,
+    user: dict = Depends(verify_clerk_token)
+):
+    """
+    /modify-resume against the session's current version: only the prompt is sent,
+    history and context live on the server.
+    """
+    record = await edit_sessions.get(user.get("sub"), document_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail="Session not found or expired")
+
+    try:
+        async with edit_sessions.lock(record):
+            # Re-read under the lock: another worker may have committed in between
+            record = await edit_sessions.get(user.get("sub"), document_id)
+            if record is None:
+                raise HTTPException(status_code=404, detail="Session not found or expired")
+            base_version = record["version"]
+            if req.base_version and req.base_version != base_version:
+                raise HTTPException(status_code=409, detail={
+                    "error": "Document changed since base_version", "current_version": base_version,
+                })
+            html_code = await edit_sessions.load(record)
+            if html_code is None:
+                raise HTTPException(status_code=410, detail="Session document expired, open the session again")
+
+            # Only the parts of the original resume the page doesn't already show
+            context = missing_context(record["context"], html_code)
+            enhanced_prompt = req.prompt
+            if context:
+                enhanced_prompt = f"CONTEXT FROM ORIGINAL RESUME (not yet in the document):\n{context}\n\nUSER REQUEST:\n{req.prompt}"
+
+            logger.info(f"🔄 Session modify request from user {user.get('sub')} ({len(record['history']) // 2} turns)")
+            result = await html_modifier.modify_html(
+                html_code=html_code,
+                prompt=enhanced_prompt,
+                history=[ChatMessage(**message) for message in record["history"]],
+                summary=record["summary"] or None,
+            )
+            if not result["success"]:
+                raise HTTPException(500, detail=result.get("error"))
+            record = await edit_sessions.commit(record, result["modified_html"], req.prompt, result["reply_text"])
+    except SessionBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+    response = {
+        "success": True,
+        "version_id": record["version"],
+        "base_version": base_version,
+        "reply_text": result["reply_text"],
+    }
+    if req.diff:
+        response["diff"] = html_diff(html_code, result["modified_html"])
+    else:
+        response["html_code"] = result["modified_html"]
+    return response
+
+
+@app.delete("/sessions/{document_id}")
+async def delete_edit_session(
+    document_id: str,
+    user: dict = Depends(verify_clerk_token)
+):
+    await edit_sessions.delete(user.get("sub"), document_id)
+    return {"success": True}
+
+
 @app.get("/templates")
 async def list_templates(
+    if_none_match: Optional[str] = Header(None),
+    accept_encoding: Optional[str] = Header(None),
     user: dict = Depends(verify_clerk_token)
 ):
     """Lists available HTML templates."""
-    templates = []
-    for file_path in TEMPLATES_UPLOAD_DIR.glob("*.html"):
-        templates.append({
-            "id": file_path.stem, 
-            "name": file_path.stem.replace("_", " ").title(),
-            "filename": file_path.name
-        })
-    return {"templates": templates}
+    return cached_body_response(template_registry.listing, "application/json", if_none_match, accept_encoding)
 
 
 @app.post("/preview-pdf-bytes")
 async def preview_pdf_bytes(
     html_content: str = Form(...),
+    if_none_match: Optional[str] = Header(None),
     user: dict = Depends(verify_clerk_token)
 ):
     """Generates PDF but returns raw bytes for preview."""
     try:
-        processed_html = preprocess_html_for_pdf(html_content)
-        font_config = FontConfiguration()
-        
-        pdf_bytes = HTML(string=processed_html).write_pdf(font_config=font_config)
+        with telemetry.span("pdf_prepare"):
+            processed_html = prepare_html_for_pdf(html_content)
+        cache_key = render_key(processed_html)
+        etag = f'"{cache_key}"'
+        if etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers={"ETag": etag})
+
+        pdf_bytes = await render_cache.get_or_render(cache_key, lambda: render_pdf(processed_html))
         
         return Response(
             content=pdf_bytes,
             media_type="application/pdf",
-            headers={"Content-Disposition": "inline; filename=preview.pdf"}
+            headers={"Content-Disposition": "inline; filename=preview.pdf", "ETag": etag}
         )
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"PDF Preview Error: {e}", exc_info=True)
         raise HTTPException(500, detail=f"PDF Preview generation failed: {str(e)}")
     
 
+@app.post("/preview-page")
+async def preview_page(
+    html_content: str = Form(...),
+    page: int = Form(1),
+    dpi: int = Form(settings.PREVIEW_DEFAULT_DPI),
+    format: str = Form("png"),
+    if_none_match: Optional[str] = Header(None),
+    user: dict = Depends(verify_clerk_token)
+):
+    """
+    One page of the document as a PNG or WebP image, a fraction of the size of
+    the whole PDF. X-Page-Count tells the editor how many pages to request.
+    """
+    fmt = format.lower()
+    if fmt not in IMAGE_MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail=f"Unsupported format, use one of: {', '.join(IMAGE_MEDIA_TYPES)}")
+    if page < 1:
+        raise HTTPException(status_code=400, detail="Pages are numbered from 1")
+    dpi = max(10, min(dpi, settings.PREVIEW_MAX_DPI))
+
+    try:
+        with telemetry.span("pdf_prepare"):
+            processed_html = prepare_html_for_pdf(html_content)
+        cache_key = render_key(processed_html)
+        etag = f'"{cache_key}-p{page}-{dpi}.{fmt}"'
+        if etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers={"ETag": etag})
+
+        async def load_pdf() -> bytes:
+            return await render_cache.get_or_render(cache_key, lambda: render_pdf(processed_html))
+
+        page_count = await page_image_cache.page_count(cache_key, load_pdf)
+        if page > page_count:
+            raise HTTPException(status_code=404, detail=f"Page {page} not found, the document has {page_count}")
+        image = await render_page_image(processed_html, cache_key, page, dpi, fmt)
+
+        return Response(
+            content=image,
+            media_type=IMAGE_MEDIA_TYPES[fmt],
+            headers={"ETag": etag, "X-Page-Count": str(page_count)}
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Page Preview Error: {e}", exc_info=True)
+        raise HTTPException(500, detail=f"Page preview failed: {str(e)}")
+
+
+@app.get("/templates/{template_id}/thumbnail")
+async def get_template_thumbnail(
+    template_id: str,
+    format: str = "png",
+    if_none_match: Optional[str] = Header(None),
+    user: dict = Depends(verify_clerk_token)
+):
+    """First page of a template as a small image (pre-rendered at startup)."""
+    fmt = format.lower()
+    if fmt not in IMAGE_MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail=f"Unsupported format, use one of: {', '.join(IMAGE_MEDIA_TYPES)}")
+    try:
+        etag, image = await template_thumbnail(template_id, fmt)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Template not found")
+    headers = {"ETag": etag, "Cache-Control": f"private, max-age={settings.TEMPLATE_CACHE_MAX_AGE}"}
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=image, media_type=IMAGE_MEDIA_TYPES[fmt], headers=headers)
+
+
 @app.get("/templates/get-raw-code")
 async def get_raw_template_code(
     filename: str,
+    if_none_match: Optional[str] = Header(None),
+    accept_encoding: Optional[str] = Header(None),
     user: dict = Depends(verify_clerk_token)
 ):
     """Returns the rendered HTML of a template for preview."""
-    file_path = TEMPLATES_UPLOAD_DIR / filename
-    
-    if not file_path.exists():
+    entry = template_registry.get(filename)
+    if entry is None:
         raise HTTPException(status_code=404, detail="Template not found")
-        
-    async with aiofiles.open(file_path, "r", encoding="utf-8") as f:
-        content = await f.read()
-    
-    return HTMLResponse(content=content)
\ No newline at end of file
+
+    return cached_body_response(entry.body, "text/html; charset=utf-8", if_none_match, accept_encoding)
+
+
+@app.get("/render-cache/stats")
+async def render_cache_stats(
+    user: dict = Depends(verify_clerk_token)
+):
+    """Hit/miss/eviction counters of the PDF render cache, the artifact store and the page raster cache."""
+    return {**render_cache.stats(), "artifacts": artifact_store.stats(), "page_images": page_image_cache.stats()}
+
+
+@app.get("/llm-scheduler/stats")
+async def llm_scheduler_stats(
+    user: dict = Depends(verify_clerk_token)
+):
+    """Queue depth per priority class, in-flight calls and remaining rate-limit budget."""
+    return llm_scheduler.stats()
+
+
+@app.get("/openai-files/stats")
+async def openai_files_stats(
+    user: dict = Depends(verify_clerk_token)
+):
+    """Upload reuse, remote deletions and files waiting for deletion (the queue is cluster-wide)."""
+    return await file_registry.stats()
+
+
+@app.get("/modify-resume/fast-path/stats")
+async def modify_fast_path_stats(
+    user: dict = Depends(verify_clerk_token)
+):
+    """Share of /modify-resume requests applied locally without an LLM call (this process)."""
+    return quick_editor.stats()
+
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus exposition of the per-stage and per-route latency histograms and LLM token counters."""
+    if not telemetry.metrics_enabled:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    return PlainTextResponse(telemetry.render(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,220 @@
+import asyncio
+import logging
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def parse_range(range_header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    Single `bytes=` range as an inclusive (start, end), or None for "send it all"
+    (no header, other units, several ranges). Raises ValueError when unsatisfiable.
+    """
+    if not range_header:
+        return None
+    unit, _, spec = range_header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, _, last = spec.strip().partition("-")
+    try:
+        if not first:  # suffix range: the last N bytes
+            length = int(last)
+            if length <= 0:
+                raise ValueError("empty suffix range")
+            return max(0, size - length), size - 1
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    except ValueError:
+        raise ValueError(f"Malformed range {range_header!r}")
+    if start >= size or start > end:
+        raise ValueError(f"Range {range_header!r} not satisfiable for {size} bytes")
+    return start, end
+
+
+class ArtifactStore:
+    """
+    Content-addressed store for generated PDFs, replacing one-file-per-download.
+    - Artifacts are keyed by the render key (hash of the prepared HTML), so a
+      repeated download of the same resume is served from disk without rendering.
+    - Files are sharded as `<dir>/<key[:2]>/<key>.pdf`; writes are atomic.
+    - The file mtime is the last access. A background sweeper deletes artifacts
+      idle for longer than `ttl`, then least recently used ones until the store
+      is under `max_bytes`. The directory is the source of truth, so several
+      workers can share it.
+    - Without a directory (ARTIFACT_STORE_DIR unset) nothing is persisted and
+      PDFs are served straight from memory.
+    """
+
+    def __init__(
+        self,
+        root: Optional[str] = None,
+        max_bytes: Optional[int] = None,
+        ttl: Optional[float] = None,
+        sweep_interval: Optional[float] = None,
+    ):
+        root = root if root is not None else settings.ARTIFACT_STORE_DIR
+        self.root = Path(root) if root else None
+        self.max_bytes = max_bytes or settings.ARTIFACT_STORE_MAX_BYTES
+        self.ttl = ttl or settings.ARTIFACT_TTL
+        self.sweep_interval = sweep_interval or settings.ARTIFACT_SWEEP_INTERVAL
+        # mtimes are refreshed at most this often, so hot artifacts don't cost a write per hit
+        self.touch_interval = min(300.0, self.ttl / 10)
+
+        self._bytes = 0  # estimate between sweeps
+        self._sweep_task: Optional[asyncio.Task] = None
+        self._sweeping: Optional[asyncio.Task] = None
+
+        self.hits = 0
+        self.stored = 0
+        self.expired = 0
+        self.evicted = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.root is not None
+
+    def path_for(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}.pdf"
+
+    # ---------------------------
+    # Blocking helpers (run via asyncio.to_thread)
+    # ---------------------------
+    def _lookup(self, key: str) -> Optional[Path]:
+        path = self.path_for(key)
+        try:
+            mtime = path.stat().st_mtime
+        except FileNotFoundError:
+            return None
+        now = time.time()
+        if now - mtime > self.ttl:
+            return None  # the sweeper removes it
+        if now - mtime > self.touch_interval:
+            try:
+                os.utime(path)
+            except FileNotFoundError:
+                return None
+        return path
+
+    def _write(self, key: str, data: bytes) -> Path:
+        path = self.path_for(key)
+        try:
+            os.utime(path)  # content-addressed: an existing file already holds these bytes
+            return path
+        except FileNotFoundError:
+            pass
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Unique temp name: concurrent puts of one key (in any process) never share a file
+        with tempfile.NamedTemporaryFile(dir=path.parent, suffix=".tmp", delete=False) as tmp:
+            tmp.write(data)
+        try:
+            os.replace(tmp.name, path)
+        except OSError:
+            os.unlink(tmp.name)
+            raise
+        return path
+
+    def _scan(self) -> List[Tuple[float, int, Path]]:
+        files = []
+        for path in self.root.glob("*/*.pdf"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+        return files
+
+    def sweep(self) -> int:
+        """Deletes idle artifacts, then LRU ones over the quota. Returns the number removed."""
+        if not self.enabled:
+            return 0
+        cutoff = time.time() - self.ttl
+        for tmp_path in self.root.glob("*/*.tmp"):
+            # Left behind by a worker that died mid-write
+            try:
+                if tmp_path.stat().st_mtime < time.time() - 3600:
+                    tmp_path.unlink()
+            except FileNotFoundError:
+                pass
+        files = sorted(self._scan())
+        total = sum(size for _, size, _ in files)
+        removed = 0
+        for mtime, size, path in files:
+            if mtime >= cutoff and total <= self.max_bytes:
+                break
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            total -= size
+            removed += 1
+            if mtime < cutoff:
+                self.expired += 1
+            else:
+                self.evicted += 1
+        self._bytes = total
+        if removed:
+            logger.info(f"🧹 Removed {removed} PDF artifacts ({total / 1024 / 1024:.1f} MiB kept)")
+        return removed
+
+    # ---------------------------
+    # Public API
+    # ---------------------------
+    async def get(self, key: str) -> Optional[Path]:
+        """Path of a stored artifact, or None."""
+        if not self.enabled:
+            return None
+        path = await asyncio.to_thread(self._lookup, key)
+        if path is not None:
+            self.hits += 1
+        return path
+
+    async def put(self, key: str, data: bytes) -> Path:
+        path = await asyncio.to_thread(self._write, key, data)
+        self.stored += 1
+        self._bytes += len(data)
+        if self._bytes > self.max_bytes and (self._sweeping is None or self._sweeping.done()):
+            # Over quota: sweep now instead of waiting for the next interval
+            self._sweeping = asyncio.create_task(asyncio.to_thread(self.sweep))
+        return path
+
+    async def _sweep_loop(self):
+        while True:
+            try:
+                await asyncio.to_thread(self.sweep)
+            except Exception as e:
+                logger.warning(f"PDF artifact sweep failed: {e}")
+            await asyncio.sleep(self.sweep_interval)
+
+    def start(self):
+        if not self.enabled or self._sweep_task is not None:
+            return
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._sweep_task = asyncio.create_task(self._sweep_loop())
+
+    async def stop(self):
+        for task in (self._sweep_task, self._sweeping):
+            if task is not None:
+                task.cancel()
+        self._sweep_task = None
+        self._sweeping = None
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "hits": self.hits,
+            "stored": self.stored,
+            "expired": self.expired,
+            "evicted": self.evicted,
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+        }
+
+
+# Singleton instance
+artifact_store = ArtifactStore()
@@ -0,0 +1,163 @@
+import asyncio
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+import httpx
+import jwt
+
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class JwksCache:
+    """
+    Process-wide Clerk JWKS cache.
+    - Keys are fetched once and refreshed in the background.
+    - An unknown `kid` triggers a refetch, at most one attempt (successful or not)
+      per `min_refetch_interval`.
+    """
+
+    def __init__(
+        self,
+        jwks_url: str,
+        refresh_interval: Optional[float] = None,
+        min_refetch_interval: Optional[float] = None,
+    ):
+        self.jwks_url = jwks_url
+        self.refresh_interval = refresh_interval or settings.CLERK_JWKS_REFRESH_INTERVAL
+        self.min_refetch_interval = min_refetch_interval or settings.CLERK_JWKS_MIN_REFETCH_INTERVAL
+        self._keys: Dict[str, jwt.PyJWK] = {}
+        self._last_fetch = 0.0
+        self._last_attempt = float("-inf")
+        self._lock = asyncio.Lock()
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    async def _fetch(self):
+        async with httpx.AsyncClient(timeout=10.0) as client:
+            response = await client.get(self.jwks_url)
+            response.raise_for_status()
+        self.load(response.json())
+
+    def load(self, jwks: dict):
+        """Installs a JWKS document as served by the endpoint (also used offline by benchmarks)."""
+        jwk_set = jwt.PyJWKSet.from_dict(jwks)
+        self._keys = {key.key_id: key for key in jwk_set.keys}
+        self._last_fetch = self._last_attempt = time.monotonic()
+        logger.info(f"🔑 Loaded {len(self._keys)} signing keys from JWKS")
+
+    async def refresh(self, force: bool = False) -> bool:
+        """Refetches the key set unless it was fetched too recently. Returns True if fetched."""
+        # Attempts (failed ones included) are rate limited: while the endpoint is down or
+        # slow, unknown-kid requests answer at once instead of queueing for the lock
+        if not force and time.monotonic() - self._last_attempt < self.min_refetch_interval:
+            return False
+        async with self._lock:
+            if not force and time.monotonic() - self._last_attempt < self.min_refetch_interval:
+                return False
+            self._last_attempt = time.monotonic()
+            await self._fetch()
+            return True
+
+    async def _refresh_loop(self):
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                await self.refresh(force=True)
+            except Exception as e:
+                logger.warning(f"JWKS background refresh failed: {e}")
+
+    async def start(self):
+        try:
+            await self.refresh(force=True)
+        except Exception as e:
+            logger.warning(f"Initial JWKS fetch failed, will retry on demand: {e}")
+        if self._refresh_task is None:
+            self._refresh_task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self):
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            self._refresh_task = None
+
+    async def get_signing_key(self, token: str) -> jwt.PyJWK:
+        kid = jwt.get_unverified_header(token).get("kid")
+        key = self._keys.get(kid)
+        if key is None:
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.error(f"JWKS refetch failed: {e}")
+            key = self._keys.get(kid)
+        if key is None:
+            raise jwt.InvalidTokenError(f"Unknown signing key id: {kid}")
+        return key
+
+
+class VerifiedTokenCache:
+    """Bounded TTL cache of token hash -> verified payload, never outliving the token's `exp`."""
+
+    def __init__(self, ttl: Optional[float] = None, max_entries: Optional[int] = None):
+        self.ttl = ttl if ttl is not None else settings.AUTH_TOKEN_CACHE_TTL
+        self.max_entries = max_entries or settings.AUTH_TOKEN_CACHE_SIZE
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+
+    @staticmethod
+    def _hash(token: str) -> str:
+        return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+    def get(self, token: str) -> Optional[dict]:
+        token_hash = self._hash(token)
+        entry = self._entries.get(token_hash)
+        if entry is None:
+            return None
+        expires_at, payload = entry
+        if time.time() >= expires_at:
+            del self._entries[token_hash]
+            return None
+        self._entries.move_to_end(token_hash)
+        return payload
+
+    def put(self, token: str, payload: dict):
+        if self.ttl <= 0:
+            return
+        expires_at = time.time() + self.ttl
+        if "exp" in payload:
+            expires_at = min(expires_at, float(payload["exp"]))
+        token_hash = self._hash(token)
+        self._entries[token_hash] = (expires_at, payload)
+        self._entries.move_to_end(token_hash)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+class ClerkTokenVerifier:
+    """Verifies Clerk RS256 JWTs against the cached JWKS, memoizing successful verifications."""
+
+    def __init__(self, jwks_url: str):
+        self.jwks = JwksCache(jwks_url)
+        self.token_cache = VerifiedTokenCache()
+
+    async def start(self):
+        await self.jwks.start()
+
+    async def stop(self):
+        await self.jwks.stop()
+
+    async def verify(self, token: str) -> dict:
+        payload = self.token_cache.get(token)
+        if payload is not None:
+            return payload
+
+        signing_key = await self.jwks.get_signing_key(token)
+        payload = jwt.decode(
+            token,
+            signing_key.key,
+            algorithms=["RS256"],
+            options={"verify_exp": True}
+        )
+        self.token_cache.put(token, payload)
+        return payload
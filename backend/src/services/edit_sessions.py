@@ -0,0 +1,202 @@
+import asyncio
+import difflib
+import hashlib
+import html
+import json
+import logging
+import re
+import time
+import uuid
+from contextlib import asynccontextmanager
+from typing import List, Optional
+
+from ..config import settings
+from .shared_state import shared_state
+
+logger = logging.getLogger(__name__)
+
+_TAG = re.compile(r"<(style|script)\b.*?</\1\s*>|<[^>]+>", re.IGNORECASE | re.DOTALL)
+_SPACE = re.compile(r"\s+")
+
+
+class SessionBusy(Exception):
+    """Raised when another edit of the same document is still running."""
+
+
+def version_id(html_code: str) -> str:
+    """Content hash of a version: an unchanged document keeps its id."""
+    return hashlib.sha256(html_code.encode("utf-8")).hexdigest()[:16]
+
+
+def html_diff(base: str, new: str) -> str:
+    """Unified diff (one line of context) turning `base` into `new`."""
+    return "".join(difflib.unified_diff(
+        base.splitlines(keepends=True),
+        new.splitlines(keepends=True),
+        fromfile="base",
+        tofile="new",
+        n=1,
+    ))
+
+
+def _normalize(text: str) -> str:
+    return _SPACE.sub(" ", html.unescape(text)).strip().lower()
+
+
+def missing_context(extracted: str, html_code: str, limit: Optional[int] = None) -> str:
+    """
+    The lines of the extracted resume text that the document does not already
+    show. Most of the original resume is on the page, so only this remainder
+    needs to go into the prompt.
+    """
+    if not extracted:
+        return ""
+    limit = limit or settings.EDIT_SESSION_CONTEXT_CHARS
+    page_text = _normalize(_TAG.sub(" ", html_code))
+    lines, size = [], 0
+    for line in extracted.splitlines():
+        normalized = _normalize(line)
+        if len(normalized) < 4 or normalized in page_text:
+            continue
+        if size + len(line) > limit:
+            break
+        lines.append(line.strip())
+        size += len(line) + 1
+    return "\n".join(lines)
+
+
+class EditSessionStore:
+    """
+    Server-side state of a /modify-resume conversation, per user and document,
+    kept in the shared state so any worker can serve the next turn.
+    - The record holds the current version id, the last few version ids, the
+      extracted resume text and the conversation: the last `history_turns`
+      turns verbatim, older ones folded into a bounded one-line-per-turn summary.
+    - Each version's HTML is stored once under its content hash.
+    - Everything expires `ttl` seconds after the last edit; oversized documents
+      are refused, and older versions are dropped past `max_versions`.
+    """
+
+    def __init__(
+        self,
+        ttl: Optional[float] = None,
+        max_versions: Optional[int] = None,
+        history_turns: Optional[int] = None,
+    ):
+        self.state = shared_state
+        self.ttl = ttl or settings.EDIT_SESSION_TTL
+        self.max_versions = max_versions or settings.EDIT_SESSION_MAX_VERSIONS
+        self.history_turns = history_turns or settings.EDIT_SESSION_HISTORY_TURNS
+
+    @staticmethod
+    def _session_key(user: str, document_id: str) -> str:
+        return hashlib.sha256(f"{user}\0{document_id}".encode("utf-8")).hexdigest()
+
+    async def _save(self, record: dict, extra: Optional[dict] = None):
+        record["updated_at"] = time.time()
+        mapping = {f"edit:{record['key']}": json.dumps(record), **(extra or {})}
+        await self.state.set_many(mapping, ttl=self.ttl)
+
+    async def open(self, user: str, document_id: str, html_code: str, extracted_data: Optional[str] = None) -> dict:
+        """Starts (or restarts) the session of a document with `html_code` as its first version."""
+        if len(html_code) > settings.EDIT_SESSION_MAX_HTML_CHARS:
+            raise ValueError(f"Document is larger than {settings.EDIT_SESSION_MAX_HTML_CHARS} characters")
+        previous = await self.get(user, document_id)
+        if previous is not None:
+            await self.state.delete(*(f"edit-html:{previous['key']}:{v}" for v in previous["versions"]))
+
+        key = self._session_key(user, document_id)
+        version = version_id(html_code)
+        record = {
+            "key": key,
+            "document_id": document_id,
+            "version": version,
+            "versions": [version],
+            "context": extracted_data or "",
+            "summary": "",
+            "history": [],
+        }
+        await self._save(record, {f"edit-html:{key}:{version}": html_code})
+        return record
+
+    async def get(self, user: str, document_id: str) -> Optional[dict]:
+        raw = await self.state.get(f"edit:{self._session_key(user, document_id)}")
+        return json.loads(raw) if raw else None
+
+    async def load(self, record: dict, version: Optional[str] = None) -> Optional[str]:
+        """HTML of `version` (default: the current one), or None once evicted."""
+        raw = await self.state.get(f"edit-html:{record['key']}:{version or record['version']}")
+        return raw.decode("utf-8") if raw else None
+
+    async def delete(self, user: str, document_id: str):
+        record = await self.get(user, document_id)
+        if record is not None:
+            await self.state.delete(
+                f"edit:{record['key']}", *(f"edit-html:{record['key']}:{v}" for v in record["versions"])
+            )
+
+    @asynccontextmanager
+    async def lock(self, record: dict, lease: float = 60.0):
+        """
+        One edit at a time per document, across workers. The lock holds a random
+        token and is renewed every `lease / 3` seconds while the edit runs (a
+        patch attempt plus a full regeneration can take minutes), so it only
+        expires when the holder dies; release deletes it only if still ours.
+        """
+        name = f"edit-lock:{record['key']}"
+        token = uuid.uuid4().hex
+        if not await self.state.set_nx(name, token, ttl=lease):
+            raise SessionBusy("Another edit of this document is still in progress")
+
+        async def renew():
+            while True:
+                await asyncio.sleep(lease / 3)
+                if not await self.state.expire_if(name, token, lease):
+                    logger.warning(f"Edit lock of session {record['key'][:8]} was lost")
+                    return
+
+        renewer = asyncio.create_task(renew())
+        try:
+            yield
+        finally:
+            renewer.cancel()
+            await self.state.delete_if(name, token)
+
+    def _fold_history(self, record: dict):
+        history: List[dict] = record["history"]
+        lines = [line for line in record["summary"].splitlines() if line]
+        while len(history) > 2 * self.history_turns:
+            asked, answered = history.pop(0), history.pop(0)
+            lines.append(f"- User: {asked['content'][:160]} | Assistant: {answered['content'][:160]}")
+        summary = "\n".join(lines)
+        # Keep the most recent turns when the summary outgrows its budget
+        while len(summary) > settings.EDIT_SESSION_SUMMARY_CHARS and "\n" in summary:
+            summary = summary.split("\n", 1)[1]
+        record["summary"] = summary[-settings.EDIT_SESSION_SUMMARY_CHARS:]
+
+    async def commit(self, record: dict, html_code: str, prompt: str, reply: str) -> dict:
+        """Records a turn and, when the document changed, its new version. Returns the updated record."""
+        record["history"] += [{"role": "user", "content": prompt}, {"role": "ai", "content": reply}]
+        self._fold_history(record)
+
+        version = version_id(html_code)
+        extra = {}
+        if version != record["version"]:
+            record["version"] = version
+            if version in record["versions"]:
+                record["versions"].remove(version)  # e.g. an edit that undid the previous one
+            record["versions"].append(version)
+            extra[f"edit-html:{record['key']}:{version}"] = html_code
+            dropped = record["versions"][:-self.max_versions]
+            record["versions"] = record["versions"][-self.max_versions:]
+            if dropped:
+                await self.state.delete(*(f"edit-html:{record['key']}:{v}" for v in dropped))
+        else:
+            # Refresh the current version's TTL together with the record
+            extra[f"edit-html:{record['key']}:{version}"] = html_code
+        await self._save(record, extra)
+        return record
+
+
+# Singleton instance
+edit_sessions = EditSessionStore()
@@ -0,0 +1,196 @@
+import asyncio
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+
+from ..config import settings
+from .shared_state import shared_state
+
+logger = logging.getLogger(__name__)
+
+
+def extraction_key(file_bytes: bytes, model: str, prompt_version: str) -> str:
+    """Cache key: SHA-256 of the file bytes, scoped by model and prompt version."""
+    return f"extract:{model}:{prompt_version}:{hashlib.sha256(file_bytes).hexdigest()}"
+
+
+class CacheBackend(ABC):
+    """Minimal async key/value interface implemented by every extraction cache backend."""
+
+    name = "base"
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[str]:
+        ...
+
+    @abstractmethod
+    async def set(self, key: str, value: str):
+        ...
+
+    async def close(self):
+        pass
+
+
+class MemoryBackend(CacheBackend):
+    """In-process LRU with TTL."""
+
+    name = "memory"
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+
+    async def get(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        created, value = entry
+        if time.time() - created > self.ttl:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: str):
+        self._entries[key] = (time.time(), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+class SQLiteBackend(CacheBackend):
+    """Single-file SQLite store, survives restarts. Least recently used rows are trimmed past `max_entries`."""
+
+    name = "sqlite"
+
+    def __init__(self, path: str, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS extraction_cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_extraction_accessed ON extraction_cache(accessed)")
+
+    def _get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created FROM extraction_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if now - row[1] > self.ttl:
+                self._conn.execute("DELETE FROM extraction_cache WHERE key = ?", (key,))
+                return None
+            self._conn.execute("UPDATE extraction_cache SET accessed = ? WHERE key = ?", (now, key))
+            return row[0]
+
+    def _set(self, key: str, value: str):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO extraction_cache (key, value, created, accessed) VALUES (?, ?, ?, ?)",
+                (key, value, now, now),
+            )
+            self._conn.execute("DELETE FROM extraction_cache WHERE created < ?", (now - self.ttl,))
+            self._conn.execute(
+                "DELETE FROM extraction_cache WHERE key IN ("
+                "SELECT key FROM extraction_cache ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    async def get(self, key: str) -> Optional[str]:
+        return await asyncio.to_thread(self._get, key)
+
+    async def set(self, key: str, value: str):
+        await asyncio.to_thread(self._set, key, value)
+
+    async def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class SharedStateBackend(CacheBackend):
+    """
+    Stored in the shared state (Redis when configured), so every worker and node
+    reuses each other's extractions. TTL is enforced per key; size is bounded by
+    Redis' maxmemory policy, or by the shared state's LRU when it runs in-process.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+
+    @property
+    def name(self) -> str:
+        return f"shared:{shared_state.backend_name}"
+
+    async def get(self, key: str) -> Optional[str]:
+        value = await shared_state.get(key)
+        return None if value is None else value.decode("utf-8")
+
+    async def set(self, key: str, value: str):
+        await shared_state.set(key, value, ttl=self.ttl)
+
+    async def close(self):
+        pass  # the pool belongs to the shared state
+
+
+class ExtractionCache:
+    """Front for the configured backend; never lets a cache failure break an extraction."""
+
+    def __init__(self, backend: CacheBackend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, key: str) -> Optional[str]:
+        try:
+            value = await self.backend.get(key)
+        except Exception as e:
+            logger.warning(f"Extraction cache read failed ({self.backend.name}): {e}")
+            value = None
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    async def set(self, key: str, value: str):
+        try:
+            await self.backend.set(key, value)
+        except Exception as e:
+            logger.warning(f"Extraction cache write failed ({self.backend.name}): {e}")
+
+    async def close(self):
+        await self.backend.close()
+
+    def stats(self) -> dict:
+        return {"backend": self.backend.name, "hits": self.hits, "misses": self.misses}
+
+
+def build_backend() -> CacheBackend:
+    kind = settings.EXTRACTION_CACHE_BACKEND.lower()
+    ttl = settings.EXTRACTION_CACHE_TTL
+    if kind == "sqlite":
+        return SQLiteBackend(settings.EXTRACTION_CACHE_SQLITE_PATH, settings.EXTRACTION_CACHE_MAX_ENTRIES, ttl)
+    if kind == "redis":
+        return SharedStateBackend(ttl)
+    if kind != "memory":
+        logger.warning(f"Unknown EXTRACTION_CACHE_BACKEND '{kind}', falling back to memory")
+    return MemoryBackend(settings.EXTRACTION_CACHE_MAX_ENTRIES, ttl)
+
+
+# Singleton instance
+extraction_cache = ExtractionCache(build_backend())
@@ -0,0 +1,218 @@
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import openai
+
+from ..config import settings
+from .llm_client import llm_client
+from .shared_state import shared_state
+
+logger = logging.getLogger(__name__)
+
+RETIRED_QUEUE = "openai-files:retired"
+
+
+class OpenAIFileRegistry:
+    """
+    Content-hash -> OpenAI file_id registry, kept in the shared state so every worker reuses the same upload.
+    - Identical bytes (with the same extension) reuse the existing upload while it is younger than `ttl`.
+    - Every upload is scheduled for deletion as it is made (`ttl` + grace later) on a shared
+      retirement queue, which a background garbage collector drains in batches. Failed
+      deletions are retried with exponential backoff and given up after `max_delete_attempts`.
+    - At startup (once per `ttl` across the cluster) remote files older than `ttl` + grace are
+      deleted, covering uploads whose retirement was lost with a crashed or in-process state.
+    - With an in-process state, stop() deletes every upload it still tracks (within `stop_timeout`).
+    """
+
+    max_delete_attempts = 8
+    stop_timeout = 10.0
+
+    def __init__(
+        self,
+        ttl: Optional[float] = None,
+        gc_interval: Optional[float] = None,
+        gc_batch_size: Optional[int] = None,
+    ):
+        self.llm = llm_client
+        self.state = shared_state
+        self.ttl = ttl or settings.OPENAI_FILE_TTL
+        self.gc_interval = gc_interval or settings.OPENAI_FILE_GC_INTERVAL
+        self.gc_batch_size = gc_batch_size or settings.OPENAI_FILE_GC_BATCH_SIZE
+        # Grace period so a file handed out just before expiry is not deleted mid-request
+        self.grace = min(300.0, self.ttl / 2)
+
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._gc_task: Optional[asyncio.Task] = None
+        self._sweep_task: Optional[asyncio.Task] = None
+
+        self.reused = 0
+        self.uploaded = 0
+        self.deleted = 0
+        self.swept = 0
+        self.delete_failures = 0
+        self.abandoned = 0
+
+    @staticmethod
+    def content_key(filename: str, file_bytes: bytes) -> str:
+        # The extension is part of the key: OpenAI infers the file type from it
+        return f"{hashlib.sha256(file_bytes).hexdigest()}{Path(filename).suffix.lower()}"
+
+    async def _retire(self, file_id: str, delete_after: float, failed_attempts: int = 0):
+        await self.state.push(RETIRED_QUEUE, json.dumps({"id": file_id, "due": delete_after, "attempts": failed_attempts}))
+
+    async def get_or_upload(self, filename: str, file_bytes: bytes) -> str:
+        key = self.content_key(filename, file_bytes)
+        name = f"openai-file:{key}"
+        raw = await self.state.get(name)
+        if raw is not None:
+            file_id = raw.decode()
+            self.reused += 1
+            logger.info(f"♻️ Reusing uploaded file {file_id} for {filename}")
+            return file_id
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.reused += 1
+            return await asyncio.shield(inflight)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            upload = await self.llm.upload_file(filename, file_bytes)
+            self.uploaded += 1
+            await self._retire(upload.id, time.time() + self.ttl + self.grace)
+            file_id = upload.id
+            if not await self.state.set_nx(name, upload.id, ttl=self.ttl):
+                # Another worker uploaded the same bytes meanwhile: use its copy, drop ours
+                raw = await self.state.get(name)
+                if raw is not None:
+                    file_id = raw.decode()
+                    await self._retire(upload.id, time.time())
+            future.set_result(file_id)
+            return file_id
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    # ---------------------------
+    # Garbage collection
+    # ---------------------------
+    async def _delete(self, items: List[dict]) -> int:
+        """Deletes the remote files of retirement `items` in batches, requeueing failures. Returns the number deleted."""
+        deleted = 0
+        for start in range(0, len(items), self.gc_batch_size):
+            batch = items[start:start + self.gc_batch_size]
+            results = await asyncio.gather(
+                *(self.llm.delete_file(item["id"]) for item in batch),
+                return_exceptions=True,
+            )
+            for item, result in zip(batch, results):
+                if isinstance(result, openai.NotFoundError):
+                    deleted += 1  # already gone
+                elif isinstance(result, Exception):
+                    self.delete_failures += 1
+                    failed_attempts = item["attempts"] + 1
+                    if failed_attempts >= self.max_delete_attempts:
+                        self.abandoned += 1
+                        logger.error(f"Giving up deleting remote file {item['id']} after {failed_attempts} attempts: {result}")
+                        continue
+                    retry_in = min(self.gc_interval * 2 ** (failed_attempts - 1), self.ttl)
+                    logger.warning(f"Failed to delete remote file {item['id']} (attempt {failed_attempts}), retrying in {retry_in:.0f}s: {result}")
+                    await self._retire(item["id"], time.time() + retry_in, failed_attempts)
+                else:
+                    deleted += 1
+        self.deleted += deleted
+        return deleted
+
+    async def collect(self, everything: bool = False) -> int:
+        """
+        Deletes every retired remote file that is past its grace period (every retired
+        file with `everything`). Returns the number deleted.
+        """
+        now = time.time()
+        due, waiting = [], []
+        for _ in range(await self.state.queue_length(RETIRED_QUEUE)):
+            raw = await self.state.pop(RETIRED_QUEUE, timeout=0)
+            if raw is None:
+                break  # another worker drained the rest
+            item = json.loads(raw)
+            (due if everything or item["due"] <= now else waiting).append(item)
+        for item in waiting:
+            await self.state.push(RETIRED_QUEUE, json.dumps(item))
+
+        deleted = await self._delete(due)
+        if deleted:
+            logger.info(f"🧹 Deleted {deleted} expired OpenAI files")
+        return deleted
+
+    async def sweep_remote(self) -> int:
+        """Deletes remote assistants files older than `ttl` + grace, tracked or not. Returns the number deleted."""
+        cutoff = time.time() - self.ttl - self.grace
+        files = await self.llm.list_files(purpose="assistants")
+        stale = [{"id": f.id, "due": 0.0, "attempts": 0} for f in files if f.created_at < cutoff]
+        deleted = await self._delete(stale)
+        self.swept += deleted
+        if deleted:
+            logger.info(f"🧹 Deleted {deleted} stale OpenAI files left by earlier runs")
+        return deleted
+
+    async def _startup_sweep(self):
+        try:
+            # Once per TTL across the cluster is enough
+            if await self.state.set_nx("openai-files:swept", "1", ttl=self.ttl):
+                await self.sweep_remote()
+        except Exception as e:
+            logger.warning(f"OpenAI file startup sweep failed: {e}")
+
+    async def _gc_loop(self):
+        while True:
+            await asyncio.sleep(self.gc_interval)
+            try:
+                await self.collect()
+            except Exception as e:
+                logger.warning(f"OpenAI file GC failed: {e}")
+
+    def start(self):
+        if self._gc_task is None:
+            self._gc_task = asyncio.create_task(self._gc_loop())
+            self._sweep_task = asyncio.create_task(self._startup_sweep())
+
+    async def stop(self):
+        for task in (self._gc_task, self._sweep_task):
+            if task is not None:
+                task.cancel()
+        self._gc_task = None
+        self._sweep_task = None
+        if self.state.distributed:
+            return  # the registry outlives this process; other workers keep collecting
+        # The in-process registry dies with us: delete what it tracks instead of leaking it
+        try:
+            await asyncio.wait_for(self.collect(everything=True), timeout=self.stop_timeout)
+        except Exception as e:
+            logger.warning(f"OpenAI file cleanup at shutdown incomplete: {e!r}")
+
+    async def stats(self) -> dict:
+        return {
+            "pending_deletion": await self.state.queue_length(RETIRED_QUEUE),
+            "reused": self.reused,
+            "uploaded": self.uploaded,
+            "deleted": self.deleted,
+            "swept": self.swept,
+            "delete_failures": self.delete_failures,
+            "abandoned": self.abandoned,
+        }
+
+
+# Singleton instance
+file_registry = OpenAIFileRegistry()
@@ -0,0 +1,306 @@
+import html
+import re
+from abc import ABC, abstractmethod
+from html.parser import HTMLParser
+from typing import Iterator, List, Optional
+
+VOID_ELEMENTS = {
+    "area", "base", "br", "col", "embed", "hr", "img", "input",
+    "link", "meta", "param", "source", "track", "wbr",
+}
+
+
+# ------------------------------------------------------------------
+# Nodes
+# ------------------------------------------------------------------
+class Node(ABC):
+    parent: Optional["Element"] = None
+
+    @abstractmethod
+    def serialize(self, annotate: bool = False) -> str:
+        ...
+
+
+class Text(Node):
+    """Character data kept exactly as it appeared in the source (entities unexpanded)."""
+
+    def __init__(self, data: str):
+        self.data = data
+
+    def serialize(self, annotate: bool = False) -> str:
+        return self.data
+
+
+class Raw(Node):
+    """Markup reproduced verbatim: comments, doctype, processing instructions, stray end tags."""
+
+    def __init__(self, markup: str):
+        self.markup = markup
+
+    def serialize(self, annotate: bool = False) -> str:
+        return self.markup
+
+
+class Element(Node):
+    def __init__(self, tag: str, attrs: List[List[str]], start_text: Optional[str] = None, self_closing: bool = False):
+        self.tag = tag
+        self.attrs = attrs
+        self.children: List[Node] = []
+        # Original start tag markup; dropped once attributes change so it is rebuilt
+        self.start_text = start_text
+        self.self_closing = self_closing
+        self.has_end_tag = False
+        self.nid: Optional[int] = None
+
+    # ---------------------------
+    # Attributes
+    # ---------------------------
+    def get(self, name: str, default: Optional[str] = None) -> Optional[str]:
+        for key, value in self.attrs:
+            if key == name:
+                return value if value is not None else ""
+        return default
+
+    def set(self, name: str, value: Optional[str]):
+        """Sets (or with value=None removes) an attribute."""
+        self.start_text = None
+        for index, (key, _) in enumerate(self.attrs):
+            if key == name:
+                if value is None:
+                    del self.attrs[index]
+                else:
+                    self.attrs[index] = [name, value]
+                return
+        if value is not None:
+            self.attrs.append([name, value])
+
+    @property
+    def classes(self) -> List[str]:
+        return (self.get("class") or "").split()
+
+    # ---------------------------
+    # Tree
+    # ---------------------------
+    def append(self, node: Node):
+        node.parent = self
+        self.children.append(node)
+
+    def insert(self, index: int, node: Node):
+        node.parent = self
+        self.children.insert(index, node)
+
+    def replace_children(self, nodes: List[Node]):
+        self.children = []
+        for node in nodes:
+            self.append(node)
+
+    def iter(self) -> Iterator["Element"]:
+        """Descendant elements (self excluded) in document order."""
+        for child in self.children:
+            if isinstance(child, Element):
+                yield child
+                yield from child.iter()
+
+    def text_content(self) -> str:
+        parts = []
+        for child in self.children:
+            if isinstance(child, Text):
+                parts.append(html.unescape(child.data))
+            elif isinstance(child, Element):
+                parts.append(child.text_content())
+        return "".join(parts)
+
+    def set_text(self, text: str):
+        """Replaces all children with a single (escaped) text node."""
+        self.replace_children([Text(html.escape(text, quote=False))])
+
+    # ---------------------------
+    # Serialization
+    # ---------------------------
+    def _start_tag(self, annotate: bool) -> str:
+        if self.start_text is not None and not (annotate and self.nid is not None):
+            return self.start_text
+        parts = [self.tag]
+        for key, value in self.attrs:
+            parts.append(key if value is None else f'{key}="{html.escape(value, quote=True)}"')
+        if annotate and self.nid is not None:
+            parts.append(f'data-nid="{self.nid}"')
+        return f"<{' '.join(parts)}{' /' if self.self_closing else ''}>"
+
+    def inner_html(self, annotate: bool = False) -> str:
+        return "".join(child.serialize(annotate) for child in self.children)
+
+    def serialize(self, annotate: bool = False) -> str:
+        end = f"</{self.tag}>" if self.has_end_tag else ""
+        return f"{self._start_tag(annotate)}{self.inner_html(annotate)}{end}"
+
+
+class Document(Element):
+    def __init__(self):
+        super().__init__("#document", [])
+
+    def serialize(self, annotate: bool = False) -> str:
+        return self.inner_html(annotate)
+
+    def find(self, tag: str) -> Optional[Element]:
+        return next((el for el in self.iter() if el.tag == tag), None)
+
+    def number_elements(self):
+        """Assigns the stable, document-order `nid` used to address elements in patches."""
+        for index, element in enumerate(self.iter()):
+            element.nid = index
+
+    def by_nid(self, nid: int) -> Optional[Element]:
+        return next((el for el in self.iter() if el.nid == nid), None)
+
+
+# ------------------------------------------------------------------
+# Parser
+# ------------------------------------------------------------------
+class _TreeBuilder(HTMLParser):
+    """
+    Builds a loose tree that serializes back to the exact input: implicit end tags are
+    never invented, and stray end tags are kept as Raw nodes.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=False)
+        self.document = Document()
+        self.stack: List[Element] = [self.document]
+        self._raw_pos = 0
+
+    @property
+    def current(self) -> Element:
+        return self.stack[-1]
+
+    def handle_starttag(self, tag, attrs):
+        element = Element(tag, [list(attr) for attr in attrs], self.get_starttag_text())
+        self.current.append(element)
+        if tag not in VOID_ELEMENTS:
+            self.stack.append(element)
+
+    def handle_startendtag(self, tag, attrs):
+        self.current.append(Element(tag, [list(attr) for attr in attrs], self.get_starttag_text(), self_closing=True))
+
+    def handle_endtag(self, tag):
+        for depth in range(len(self.stack) - 1, 0, -1):
+            if self.stack[depth].tag == tag:
+                self.stack[depth].has_end_tag = True
+                del self.stack[depth:]
+                return
+        self.current.append(Raw(f"</{tag}>"))
+
+    def handle_data(self, data):
+        self.current.append(Text(data))
+
+    def updatepos(self, i, j):
+        # Remember where the construct being dispatched starts in rawdata
+        self._raw_pos = j
+        return super().updatepos(i, j)
+
+    def _reference_text(self, prefix: str, name: str) -> str:
+        # "M&A" is reported as entityref "A"; only echo the ";" if the source had one
+        end = self._raw_pos + len(prefix) + len(name)
+        return f"{prefix}{name};" if self.rawdata[end:end + 1] == ";" else f"{prefix}{name}"
+
+    def handle_entityref(self, name):
+        self.current.append(Text(self._reference_text("&", name)))
+
+    def handle_charref(self, name):
+        self.current.append(Text(self._reference_text("&#", name)))
+
+    def handle_comment(self, data):
+        self.current.append(Raw(f"<!--{data}-->"))
+
+    def handle_decl(self, decl):
+        self.current.append(Raw(f"<!{decl}>"))
+
+    def handle_pi(self, data):
+        self.current.append(Raw(f"<?{data}>"))
+
+    def unknown_decl(self, data):
+        self.current.append(Raw(f"<![{data}]>"))
+
+
+def parse_html(markup: str) -> Document:
+    builder = _TreeBuilder()
+    builder.feed(markup)
+    builder.close()
+    return builder.document
+
+
+def parse_fragment(markup: str) -> List[Node]:
+    document = parse_html(markup)
+    nodes = list(document.children)
+    for node in nodes:
+        node.parent = None
+    return nodes
+
+
+# ------------------------------------------------------------------
+# Selectors (subset: tag, #id, .class, [attr], [attr=value], :nth-of-type(n), descendant)
+# ------------------------------------------------------------------
+_COMPOUND = re.compile(
+    r"(?P<tag>[a-zA-Z][\w-]*|\*)?"
+    r"(?P<rest>(?:#[\w-]+|\.[\w-]+|\[[^\]]+\]|:nth-of-type\(\d+\))*)$"
+)
+_PART = re.compile(r"#([\w-]+)|\.([\w-]+)|\[([^\]=\s]+)\s*(?:=\s*[\"']?([^\]\"']*)[\"']?)?\]|:nth-of-type\((\d+)\)")
+
+
+class SelectorError(ValueError):
+    pass
+
+
+def _compile_compound(text: str):
+    match = _COMPOUND.match(text)
+    if not match:
+        raise SelectorError(f"Unsupported selector: {text}")
+    tag = match.group("tag")
+    checks = []
+    nth = None
+    for part in _PART.finditer(match.group("rest")):
+        element_id, class_name, attr, value, nth_value = part.groups()
+        if element_id:
+            checks.append(lambda el, v=element_id: el.get("id") == v)
+        elif class_name:
+            checks.append(lambda el, v=class_name: v in el.classes)
+        elif attr:
+            if value is None:
+                checks.append(lambda el, a=attr: el.get(a) is not None)
+            else:
+                checks.append(lambda el, a=attr, v=value: el.get(a) == v)
+        elif nth_value:
+            nth = int(nth_value)
+
+    def matches(element: Element) -> bool:
+        if tag and tag != "*" and element.tag != tag.lower():
+            return False
+        if not all(check(element) for check in checks):
+            return False
+        if nth is not None:
+            siblings = [s for s in element.parent.children if isinstance(s, Element) and s.tag == element.tag]
+            return siblings.index(element) + 1 == nth
+        return True
+
+    return matches
+
+
+def select(root: Element, selector: str) -> List[Element]:
+    compounds = [_compile_compound(part) for part in selector.split()]
+    if not compounds:
+        raise SelectorError("Empty selector")
+
+    def ancestors_match(element: Element, index: int) -> bool:
+        if index < 0:
+            return True
+        node = element.parent
+        while isinstance(node, Element) and not isinstance(node, Document):
+            if compounds[index](node) and ancestors_match(node, index - 1):
+                return True
+            node = node.parent
+        return False
+
+    return [
+        el for el in root.iter()
+        if compounds[-1](el) and ancestors_match(el, len(compounds) - 2)
+    ]
@@ -0,0 +1,108 @@
+import logging
+from typing import List, Union
+
+from .html_dom import Document, Element, SelectorError, parse_fragment, parse_html, select
+
+logger = logging.getLogger(__name__)
+
+INSERT_POSITIONS = {"before", "after", "prepend", "append"}
+
+
+class PatchError(Exception):
+    """Raised when a patch cannot be applied; callers fall back to full regeneration."""
+
+
+def annotate_html(html_code: str) -> str:
+    """Returns the document with a `data-nid` on every element, as shown to the model."""
+    document = parse_html(html_code)
+    document.number_elements()
+    return document.serialize(annotate=True)
+
+
+def _resolve(document: Document, target: Union[int, str]) -> Element:
+    if isinstance(target, int) or (isinstance(target, str) and target.strip().isdigit()):
+        element = document.by_nid(int(target))
+        if element is None:
+            raise PatchError(f"No element with nid {target}")
+        return element
+    if not isinstance(target, str) or not target.strip():
+        raise PatchError(f"Invalid target: {target!r}")
+    try:
+        matches = select(document, target)
+    except SelectorError as e:
+        raise PatchError(str(e))
+    if len(matches) != 1:
+        raise PatchError(f"Selector {target!r} matched {len(matches)} elements, expected exactly 1")
+    return matches[0]
+
+
+def _apply_one(document: Document, patch: dict):
+    op = patch.get("op")
+    element = _resolve(document, patch.get("target"))
+
+    if op == "replace_text":
+        element.set_text(str(patch.get("text", "")))
+    elif op == "set_attribute":
+        name = patch.get("name")
+        if not name:
+            raise PatchError("set_attribute requires 'name'")
+        value = patch.get("value")
+        element.set(name, None if value is None else str(value))
+    elif op == "replace_html":
+        parent = element.parent
+        index = parent.children.index(element)
+        parent.children.pop(index)
+        for offset, node in enumerate(parse_fragment(str(patch.get("html", "")))):
+            parent.insert(index + offset, node)
+    elif op == "set_inner_html":
+        element.replace_children(parse_fragment(str(patch.get("html", ""))))
+    elif op == "remove":
+        element.parent.children.remove(element)
+    elif op == "insert_html":
+        position = patch.get("position", "after")
+        if position not in INSERT_POSITIONS:
+            raise PatchError(f"Unknown insert position {position!r}")
+        nodes = parse_fragment(str(patch.get("html", "")))
+        if position in ("before", "after"):
+            parent = element.parent
+            index = parent.children.index(element) + (1 if position == "after" else 0)
+            for offset, node in enumerate(nodes):
+                parent.insert(index + offset, node)
+        elif position == "prepend":
+            for offset, node in enumerate(nodes):
+                element.insert(offset, node)
+        else:
+            for node in nodes:
+                element.append(node)
+    else:
+        raise PatchError(f"Unknown op {op!r}")
+
+
+def apply_patches(html_code: str, patches: List[dict]) -> str:
+    """
+    Applies edit operations to the document and returns the new HTML.
+    Targets are `nid`s (document-order element index, see annotate_html) or CSS
+    selectors matching exactly one element. All targets are resolved against the
+    original numbering, so earlier edits do not shift later ones.
+    """
+    if not isinstance(patches, list):
+        raise PatchError("'patches' must be a list")
+    document = parse_html(html_code)
+    document.number_elements()
+    for patch in patches:
+        if not isinstance(patch, dict):
+            raise PatchError(f"Invalid patch: {patch!r}")
+        _apply_one(document, patch)
+
+    result = document.serialize()
+    _validate(html_code, result)
+    return result
+
+
+def _validate(original: str, result: str):
+    lowered = result.lower()
+    for closing in ("</html>", "</body>", "</head>"):
+        if closing in original.lower() and closing not in lowered:
+            raise PatchError(f"Patched document lost {closing}")
+    if len(result) < 100:
+        raise PatchError("Patched document is too short")
@@ -0,0 +1,167 @@
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+# Injected before </head> so WeasyPrint renders edge-to-edge A4 pages
+PRINT_CSS = """
+    <style>
+        @page { size: A4; margin: 0; }
+        body { margin: 0; padding: 0; -webkit-print-color-adjust: exact; print-color-adjust: exact; }
+        * { box-sizing: border-box; }
+    </style>
+    """
+
+FENCES = ("```html", "```")
+
+# Where something may need to happen: comments, raw-text blocks, </head>, <body>, </html>.
+# The gaps between matches (ordinary tags and text) are "chunks" handled with
+# C-level str operations; this keeps the Python loop to a handful of iterations.
+_LANDMARK = re.compile(r"<(?:(!--)|(style|script)\b|(/head\s*>)|(body\b[^>]*>)|(/html\s*>))", re.IGNORECASE)
+_RAW_CLOSE = {
+    "style": re.compile(r"</style\s*>", re.IGNORECASE),
+    "script": re.compile(r"</script\s*>", re.IGNORECASE),
+}
+
+# CSS WeasyPrint does not support (or renders badly), removed as whole declarations.
+# Each pattern only runs when its keyword occurs, which a substring test finds far
+# faster than a case-insensitive regex scan.
+_UNSUPPORTED_CSS = (
+    ("backdrop-filter", re.compile(r"backdrop-filter\s*:\s*[^;]+;", re.IGNORECASE)),
+    ("transform", re.compile(r"transform\s*:\s*translate[^;]+;", re.IGNORECASE)),
+    ("filter", re.compile(r"filter\s*:\s*blur[^;]+;", re.IGNORECASE)),
+    ("clip-path", re.compile(r"clip-path\s*:\s*[^;]+;", re.IGNORECASE)),
+    ("mix-blend-mode", re.compile(r"mix-blend-mode\s*:\s*[^;]+;", re.IGNORECASE)),
+)
+
+_STYLE_ATTR = re.compile(r"""((?<![\w-])style\s*=\s*)(?:"([^"]*)"|'([^']*)')""", re.IGNORECASE)
+
+# Markdown in text only: the lookahead requires the next angle bracket to open a
+# tag, i.e. the match is not inside one. Matches never span tags or lines.
+_TEXT_CONTEXT = r"(?=[^<>]*(?:<|\Z))"
+_BOLD = re.compile(r"\*\*([^<>\n]*?)\*\*" + _TEXT_CONTEXT)
+_ITALIC = re.compile(r"\*([^<>\n]*?)\*" + _TEXT_CONTEXT)
+
+
+def strip_unsupported_css(css: str) -> str:
+    for keyword, pattern in _UNSUPPORTED_CSS:
+        if keyword in css or keyword.upper() in css:
+            css = pattern.sub("", css)
+    return css
+
+
+def _strip_style_attr(match: re.Match) -> str:
+    if match.group(2) is not None:
+        return f'{match.group(1)}"{strip_unsupported_css(match.group(2))}"'
+    return f"{match.group(1)}'{strip_unsupported_css(match.group(3))}'"
+
+
+def _strip_style_attrs(markup: str) -> str:
+    if "style" not in markup and "STYLE" not in markup:
+        return markup
+    if not any(k in markup or k.upper() in markup for k, _ in _UNSUPPORTED_CSS):
+        return markup
+    return _STYLE_ATTR.sub(_strip_style_attr, markup)
+
+
+def postprocess_html(
+    html_content: str,
+    *,
+    strip_fences: bool = False,
+    normalize_newlines: bool = False,
+    convert_markdown: bool = False,
+    strip_css: bool = False,
+    inject_print_css: bool = False,
+    warn_truncated: bool = False,
+) -> str:
+    """
+    Walks the document once, applying only the enabled steps: fences and markdown
+    are handled outside tags, <style>, <script> and comments; CSS stripping only
+    inside <style> blocks and style="" attributes, so selectors like `*` are never
+    touched. Print CSS goes before </head> (else after <body>, else first).
+    """
+    out = []
+    print_css_done = not inject_print_css
+    saw_html_end = False
+
+    def emit(text: str):
+        if normalize_newlines and "\r" in text:
+            text = text.replace("\r\n", "\n")
+        out.append(text)
+
+    def chunk(text: str):
+        if strip_fences and "```" in text:
+            for fence in FENCES:
+                text = text.replace(fence, "")
+        if convert_markdown and "*" in text:
+            text = _ITALIC.sub(r"<em>\1</em>", _BOLD.sub(r"<strong>\1</strong>", text))
+        if strip_css:
+            text = _strip_style_attrs(text)
+        emit(text)
+
+    position = 0
+    length = len(html_content)
+    while True:
+        match = _LANDMARK.search(html_content, position)
+        if match is None:
+            break
+        if match.start() > position:
+            chunk(html_content[position:match.start()])
+        comment, raw_tag, head_end, body_start, html_end = match.groups()
+
+        if comment:
+            end = html_content.find("-->", match.end())
+            end = length if end < 0 else end + 3
+            emit(html_content[match.start():end])
+        elif raw_tag:
+            open_end = html_content.find(">", match.end())
+            open_end = length if open_end < 0 else open_end + 1
+            close = _RAW_CLOSE[raw_tag.lower()].search(html_content, open_end)
+            body_end, end = (close.start(), close.end()) if close else (length, length)
+            opening, body = html_content[match.start():open_end], html_content[open_end:body_end]
+            if strip_css:
+                opening = _strip_style_attrs(opening)
+                if raw_tag.lower() == "style":
+                    body = strip_unsupported_css(body)
+            emit(opening)
+            emit(body)
+            emit(html_content[body_end:end])
+        else:
+            end = match.end()
+            tag = match.group(0)
+            if head_end and not print_css_done:
+                out.append(PRINT_CSS)
+                print_css_done = True
+            if html_end:
+                saw_html_end = True
+            emit(_strip_style_attrs(tag) if strip_css else tag)
+            if body_start and not print_css_done:
+                out.append(PRINT_CSS)
+                print_css_done = True
+        position = end
+
+    if position < length:
+        chunk(html_content[position:])
+
+    if not print_css_done:
+        out.insert(0, PRINT_CSS)
+    if warn_truncated and not saw_html_end:
+        logger.warning("HTML output appears truncated (missing </html>).")
+
+    return "".join(out)
+
+
+def sanitize_llm_html(html_content: str) -> str:
+    """Cleanup applied to HTML generated by the LLM: fences, stray markdown, CRLF."""
+    return postprocess_html(
+        html_content,
+        strip_fences=True,
+        normalize_newlines=True,
+        convert_markdown=True,
+        warn_truncated=True,
+    ).strip()
+
+
+def prepare_html_for_pdf(html_content: str) -> str:
+    """Strips CSS WeasyPrint cannot render and injects the A4 print stylesheet."""
+    return postprocess_html(html_content, strip_css=True, inject_print_css=True)
@@ -0,0 +1,352 @@
+import asyncio
+import hashlib
+import json
+import logging
+import time
+import uuid
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from ..config import settings
+from .llm_scheduler import bind_user
+from .shared_state import shared_state
+from .telemetry import telemetry
+
+logger = logging.getLogger(__name__)
+
+QUEUED, RUNNING, SUCCEEDED, FAILED = "queued", "running", "succeeded", "failed"
+QUEUE = "jobs:queue"
+RUNNING_LIST = "jobs:running"  # ids of running jobs, checked by the lease sweeper
+
+JobHandler = Callable[[dict, Optional[bytes]], Awaitable[dict]]
+
+
+class JobQueueFull(Exception):
+    """Raised when JOB_MAX_QUEUE jobs are already waiting for a worker."""
+
+
+class IdempotencyConflict(Exception):
+    """Raised when an idempotency key is reused with a different request payload."""
+
+
+def snapshot(record: dict) -> dict:
+    """Public view of a job record (no owner, fingerprint or payload)."""
+    data = {
+        "job_id": record["id"],
+        "kind": record["kind"],
+        "status": record["status"],
+        "created_at": record["created_at"],
+        "started_at": record["started_at"],
+        "finished_at": record["finished_at"],
+    }
+    if record["status"] == SUCCEEDED:
+        data["result"] = record["result"]
+    elif record["status"] == FAILED:
+        data["error"] = record["error"]
+    return data
+
+
+class JobManager:
+    """
+    Background jobs for long LLM generations, stored in the shared state so any
+    worker process can run a job and any can answer for it.
+    - submit() stores the record and payload and queues the id; `workers` tasks
+      per process pop ids and run the handler registered for the job's kind.
+    - Idempotency keys are scoped per user: a retried submit with the same key
+      returns the existing job instead of starting another LLM call (unless that
+      job failed). Reusing a key for a different payload raises IdempotencyConflict.
+    - A running job holds a lease its worker renews every `lease_ttl / 3` seconds.
+      A sweeper requeues jobs whose lease lapsed (the worker died), up to
+      `max_attempts` runs, then marks them failed.
+    - Finished records and their keys expire after `result_ttl` seconds.
+    """
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        max_queue: Optional[int] = None,
+        result_ttl: Optional[float] = None,
+        pending_ttl: Optional[float] = None,
+        lease_ttl: Optional[float] = None,
+        max_attempts: Optional[int] = None,
+    ):
+        self.state = shared_state
+        self.workers = workers or settings.JOB_WORKERS
+        self.max_queue = max_queue or settings.JOB_MAX_QUEUE
+        self.result_ttl = result_ttl or settings.JOB_RESULT_TTL
+        self.pending_ttl = pending_ttl or settings.JOB_PENDING_TTL
+        self.lease_ttl = lease_ttl or settings.JOB_LEASE_TTL
+        self.max_attempts = max_attempts or settings.JOB_MAX_ATTEMPTS
+
+        self._handlers: Dict[str, JobHandler] = {}
+        self._tasks: List[asyncio.Task] = []
+        self._running = 0
+
+        self.submitted = 0
+        self.deduplicated = 0
+        self.completed = 0
+        self.failed = 0
+        self.requeued = 0
+        telemetry.add_collector(self._metric_lines)
+
+    def register(self, kind: str, handler: JobHandler):
+        """`handler(payload, blob)` must return a dict with "success" (and "error" on failure)."""
+        self._handlers[kind] = handler
+
+    def start(self):
+        if self._tasks:
+            return
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._sweep_loop()))
+        logger.info(f"🧵 Job workers started ({self.workers} workers, {self.state.backend_name} store)")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    # ---------------------------
+    # Records
+    # ---------------------------
+    @staticmethod
+    def _key_name(user: str, idempotency_key: str) -> str:
+        digest = hashlib.sha256(f"{user}\0{idempotency_key}".encode("utf-8")).hexdigest()
+        return f"job-key:{digest}"
+
+    async def _load(self, job_id: str) -> Optional[dict]:
+        raw = await self.state.get(f"job:{job_id}")
+        return json.loads(raw) if raw else None
+
+    async def _save(self, record: dict, ttl: float, extra: Optional[dict] = None):
+        record["version"] += 1
+        await self.state.set_many({f"job:{record['id']}": json.dumps(record), **(extra or {})}, ttl=ttl)
+        await self.state.notify(f"job:{record['id']}")
+
+    # ---------------------------
+    # Submission & lookup
+    # ---------------------------
+    async def submit(self, kind: str, user: str, payload: dict, blob: Optional[bytes] = None,
+                     idempotency_key: Optional[str] = None, fingerprint: Optional[str] = None) -> Tuple[dict, bool]:
+        """Returns (record, created)."""
+        if kind not in self._handlers:
+            raise KeyError(f"No handler registered for job kind '{kind}'")
+        if await self.state.queue_length(QUEUE) >= self.max_queue:
+            raise JobQueueFull(f"{self.max_queue} jobs are already queued")
+
+        job_id = uuid.uuid4().hex
+        key_name = self._key_name(user, idempotency_key) if idempotency_key else None
+        record = {
+            "id": job_id,
+            "kind": kind,
+            "user": user,
+            "status": QUEUED,
+            "version": 0,
+            "attempts": 0,
+            "created_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
+            "result": None,
+            "error": None,
+            "fingerprint": fingerprint,
+            "key_name": key_name,
+            "payload": payload,
+        }
+        # The record is stored before the key is claimed, so a key always points at a readable job
+        await self._save(record, self.pending_ttl, {f"job-blob:{job_id}": blob} if blob is not None else None)
+
+        if key_name and not await self.state.set_nx(key_name, job_id, ttl=self.pending_ttl):
+            existing = await self._claimed_job(key_name)
+            if existing is not None and existing["status"] != FAILED:
+                await self.state.delete(f"job:{job_id}", f"job-blob:{job_id}")
+                if fingerprint and existing["fingerprint"] and fingerprint != existing["fingerprint"]:
+                    raise IdempotencyConflict("Idempotency-Key was already used for a different request")
+                self.deduplicated += 1
+                return existing, False
+            # The earlier job failed or expired: this submission takes the key over
+            await self.state.set(key_name, job_id, ttl=self.pending_ttl)
+
+        await self.state.push(QUEUE, job_id)
+        self.submitted += 1
+        return record, True
+
+    async def _claimed_job(self, key_name: str, attempts: int = 5) -> Optional[dict]:
+        """
+        The job an idempotency key points at. A key whose record is not readable
+        yet belongs to a submission still in flight, so it is polled briefly rather
+        than taken over (None only once the record is really gone).
+        """
+        for attempt in range(attempts):
+            existing_id = await self.state.get(key_name)
+            if existing_id is None:
+                return None
+            existing = await self._load(existing_id.decode())
+            if existing is not None:
+                return existing
+            await asyncio.sleep(0.05 * (attempt + 1))
+        return None
+
+    async def get(self, job_id: str, user: str) -> Optional[dict]:
+        """The job record, if it exists and belongs to `user`."""
+        record = await self._load(job_id)
+        if record is None or record["user"] != user:
+            return None
+        return record
+
+    async def watch(self, job_id: str, heartbeat: float = 15.0) -> AsyncIterator[Tuple[str, dict]]:
+        """
+        Yields ("status", snapshot) on every change and at least every `heartbeat`
+        seconds (keeps idle proxies from closing the stream), then ("done", snapshot).
+        """
+        last_version, last_sent = None, 0.0
+        while True:
+            record = await self._load(job_id)
+            if record is None:
+                yield "error", {"error": "Job expired"}
+                return
+            if record["status"] in (SUCCEEDED, FAILED):
+                yield "done", snapshot(record)
+                return
+            if record["version"] != last_version or time.monotonic() - last_sent >= heartbeat:
+                last_version, last_sent = record["version"], time.monotonic()
+                yield "status", snapshot(record)
+            await self.state.wait(f"job:{job_id}", timeout=heartbeat)
+
+    # ---------------------------
+    # Execution
+    # ---------------------------
+    async def _worker(self):
+        while True:
+            try:
+                job_id = await self.state.pop(QUEUE, timeout=1.0)
+                if job_id is not None:
+                    await self._execute(job_id.decode())
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Job worker error: {e}", exc_info=True)
+                await asyncio.sleep(1.0)
+
+    async def _run(self, record: dict, blob: Optional[bytes]) -> dict:
+        # Runs in its own task: LLM calls are attributed to the job's owner
+        bind_user(record["user"])
+        return await self._handlers[record["kind"]](record["payload"], blob)
+
+    async def _hold_lease(self, job_id: str, token: str):
+        while True:
+            await asyncio.sleep(self.lease_ttl / 3)
+            if not await self.state.expire_if(f"job-lease:{job_id}", token, self.lease_ttl):
+                logger.warning(f"Lease of job {job_id} lapsed while it was running")
+                return
+
+    async def _execute(self, job_id: str):
+        record = await self._load(job_id)
+        if record is None or record["status"] != QUEUED:
+            return  # expired while queued, or already picked up after a requeue
+        blob = await self.state.get(f"job-blob:{job_id}")
+
+        token = uuid.uuid4().hex
+        await self.state.set(f"job-lease:{job_id}", token, ttl=self.lease_ttl)
+        record["status"] = RUNNING
+        record["started_at"] = time.time()
+        record["attempts"] = record.get("attempts", 0) + 1
+        await self._save(record, self.pending_ttl)
+        await self.state.push(RUNNING_LIST, job_id)
+
+        self._running += 1
+        lease = asyncio.create_task(self._hold_lease(job_id, token))
+        try:
+            result = await asyncio.create_task(self._run(record, blob))
+        except Exception as e:
+            logger.error(f"❌ Job {job_id} ({record['kind']}) crashed: {e}", exc_info=True)
+            result = {"success": False, "error": str(e)}
+        finally:
+            self._running -= 1
+            lease.cancel()
+
+        if result.get("success"):
+            await self._finish(record, SUCCEEDED, result=result)
+        else:
+            await self._finish(record, FAILED, error=result.get("error") or "Job failed")
+        await self.state.delete_if(f"job-lease:{job_id}", token)
+        logger.info(f"✅ Job {job_id} ({record['kind']}) {record['status']} in {record['finished_at'] - record['started_at']:.2f}s")
+
+    async def _finish(self, record: dict, status: str, result: Optional[dict] = None, error: Optional[str] = None):
+        record["finished_at"] = time.time()
+        record["payload"] = None
+        record["status"], record["result"], record["error"] = status, result, error
+        if status == SUCCEEDED:
+            self.completed += 1
+        else:
+            self.failed += 1
+        # The idempotency key lives exactly as long as the result
+        extra = {record["key_name"]: record["id"]} if record["key_name"] else {}
+        await self._save(record, self.result_ttl, extra)
+        await self.state.delete(f"job-blob:{record['id']}")
+
+    # ---------------------------
+    # Lease sweeper
+    # ---------------------------
+    async def sweep(self) -> int:
+        """Requeues (or fails) running jobs whose lease lapsed. Returns how many were recovered."""
+        recovered = 0
+        for _ in range(await self.state.queue_length(RUNNING_LIST)):
+            raw = await self.state.pop(RUNNING_LIST, timeout=0.1)
+            if raw is None:
+                break
+            job_id = raw.decode()
+            record = await self._load(job_id)
+            if record is None or record["status"] != RUNNING:
+                continue  # finished (or expired): stop tracking it
+            if await self.state.get(f"job-lease:{job_id}") is not None:
+                await self.state.push(RUNNING_LIST, job_id)
+                continue
+
+            recovered += 1
+            if record.get("attempts", 1) >= self.max_attempts:
+                logger.error(f"❌ Job {job_id} ({record['kind']}) lost its worker {record['attempts']} times, failing it")
+                await self._finish(record, FAILED, error="The worker running this job stopped; please retry")
+                continue
+            logger.warning(f"♻️ Job {job_id} ({record['kind']}) lost its worker, requeueing")
+            record["status"], record["started_at"] = QUEUED, None
+            await self._save(record, self.pending_ttl)
+            await self.state.push(QUEUE, job_id)
+            self.requeued += 1
+        return recovered
+
+    async def _sweep_loop(self):
+        while True:
+            await asyncio.sleep(self.lease_ttl / 2)
+            try:
+                await self.sweep()
+            except Exception as e:
+                logger.warning(f"Job lease sweep failed: {e}")
+
+    def stats(self) -> dict:
+        """Counters of this process (other workers keep their own)."""
+        return {
+            "workers": self.workers,
+            "running": self._running,
+            "submitted": self.submitted,
+            "deduplicated": self.deduplicated,
+            "completed": self.completed,
+            "failed": self.failed,
+            "requeued": self.requeued,
+            "store": self.state.backend_name,
+        }
+
+    def _metric_lines(self) -> List[str]:
+        stats = self.stats()
+        lines = [
+            "# HELP resumegpt_jobs_running Background jobs running in this process.",
+            "# TYPE resumegpt_jobs_running gauge",
+            f"resumegpt_jobs_running {stats['running']}",
+            "# HELP resumegpt_jobs_total Background job submissions and outcomes in this process.",
+            "# TYPE resumegpt_jobs_total counter",
+        ]
+        lines += [f'resumegpt_jobs_total{{event="{event}"}} {stats[event]}'
+                  for event in ("submitted", "deduplicated", "completed", "failed", "requeued")]
+        return lines
+
+
+# Singleton instance
+job_manager = JobManager()
@@ -0,0 +1,218 @@
+import asyncio
+import importlib.util
+import logging
+import time
+from typing import AsyncIterator, Awaitable, Callable, Optional
+
+import httpx
+import openai
+from openai import AsyncOpenAI
+
+from ..config import settings
+from .llm_scheduler import Priority, backoff_delay, estimate_tokens, llm_scheduler
+from .telemetry import telemetry
+
+logger = logging.getLogger(__name__)
+
+# Worth another attempt; everything else (400s, auth, exhausted quota) is raised immediately
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.InternalServerError,
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+)
+
+
+def _is_retryable(error: Exception) -> bool:
+    if isinstance(error, openai.RateLimitError) and getattr(error, "code", None) == "insufficient_quota":
+        return False
+    return isinstance(error, RETRYABLE_ERRORS)
+
+
+class LLMClient:
+    """
+    Application-scoped OpenAI client shared by every agent.
+    - One httpx pool with keep-alive limits (HTTP/2 when `h2` is installed).
+    - Every call is admitted by the LLMScheduler (priority classes, per-user
+      round-robin, concurrency cap, RPM/TPM buckets).
+    - Retryable failures are retried here, not by the SDK: the slot is released
+      during the jittered backoff, and a 429's Retry-After pauses the scheduler.
+    - Per-call timeouts default to LLM_TIMEOUT.
+    """
+
+    def __init__(self):
+        self._client: Optional[AsyncOpenAI] = None
+        self._http_client: Optional[httpx.AsyncClient] = None
+        self.scheduler = llm_scheduler
+        self.max_retries = settings.LLM_MAX_RETRIES
+
+    def start(self):
+        if self._client is not None:
+            return
+        http2 = importlib.util.find_spec("h2") is not None
+        self._http_client = httpx.AsyncClient(
+            http2=http2,
+            limits=httpx.Limits(
+                max_connections=settings.LLM_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.LLM_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=settings.LLM_KEEPALIVE_EXPIRY,
+            ),
+            timeout=httpx.Timeout(settings.LLM_TIMEOUT, connect=settings.LLM_CONNECT_TIMEOUT),
+        )
+        self._client = AsyncOpenAI(
+            api_key=settings.OPENAI_API_KEY,
+            base_url=settings.OPENAI_BASE_URL,
+            http_client=self._http_client,
+            timeout=settings.LLM_TIMEOUT,
+            max_retries=0,  # retries go back through the scheduler
+        )
+        logger.info(f"🔌 LLM client ready (http2={http2}, max_concurrency={settings.LLM_MAX_CONCURRENCY})")
+
+    async def close(self):
+        if self._client is None:
+            return
+        await self._client.close()
+        self._client = None
+        self._http_client = None
+
+    @property
+    def client(self) -> AsyncOpenAI:
+        # Lazily started so agents also work outside the FastAPI lifespan (scripts, benchmarks)
+        if self._client is None:
+            self.start()
+        return self._client
+
+    async def _backoff(self, attempt: int, error: Exception):
+        """Raises `error` when out of attempts, else sleeps the backoff (pausing everyone on a 429)."""
+        if attempt > self.max_retries or not _is_retryable(error):
+            raise error
+        delay = backoff_delay(attempt, error)
+        if isinstance(error, openai.RateLimitError):
+            self.scheduler.pause(delay)
+        self.scheduler.note_retry()
+        logger.warning(f"🔁 LLM call failed ({type(error).__name__}), retry {attempt}/{self.max_retries} in {delay:.1f}s")
+        await asyncio.sleep(delay)
+
+    async def _call(self, priority: Priority, cost: int, make_call: Callable[[], Awaitable], model: Optional[str] = None, span: str = "llm"):
+        attempt = 0
+        while True:
+            async with self.scheduler.slot(priority, cost) as grant:
+                try:
+                    with telemetry.span(span):
+                        response = await make_call()
+                except Exception as e:
+                    error = e
+                else:
+                    usage = getattr(response, "usage", None)
+                    self.scheduler.reconcile(grant, usage)
+                    telemetry.record_usage(model, usage)
+                    return response
+            attempt += 1
+            await self._backoff(attempt, error)
+
+    async def _stream(self, priority: Priority, cost: int, open_stream: Callable[[], Awaitable], extract: Callable) -> AsyncIterator[str]:
+        """
+        Runs a streaming call under the scheduler. `extract(item)` returns (text, usage)
+        for each stream item. Retried only while nothing has been yielded yet.
+        """
+        attempt = 0
+        while True:
+            yielded = False
+            async with self.scheduler.slot(priority, cost) as grant:
+                start = time.perf_counter()
+                try:
+                    stream = await open_stream()
+                    async for item in stream:
+                        text, usage = extract(item)
+                        if usage is not None:
+                            self.scheduler.reconcile(grant, usage)
+                        if text:
+                            if not yielded:
+                                telemetry.record("llm_ttft", time.perf_counter() - start)
+                                yielded = True
+                            yield text
+                    return
+                except Exception as e:
+                    if yielded:
+                        raise
+                    error = e
+                finally:
+                    telemetry.record("llm", time.perf_counter() - start)
+            attempt += 1
+            await self._backoff(attempt, error)
+
+    async def upload_file(self, filename: str, file_bytes: bytes, purpose: str = "assistants",
+                          timeout: Optional[float] = None, priority: Priority = Priority.PROCESS):
+        return await self._call(priority, 0, lambda: self.client.files.create(
+            file=(filename, file_bytes),
+            purpose=purpose,
+            timeout=timeout or settings.LLM_TIMEOUT,
+        ), span="llm_upload")
+
+    async def delete_file(self, file_id: str, timeout: Optional[float] = None, priority: Priority = Priority.BACKGROUND):
+        return await self._call(priority, 0, lambda: self.client.files.delete(
+            file_id, timeout=timeout or settings.LLM_TIMEOUT
+        ), span="llm_delete")
+
+    async def list_files(self, purpose: Optional[str] = None, timeout: Optional[float] = None,
+                         priority: Priority = Priority.BACKGROUND) -> list:
+        """Every file of the account (all pages), optionally only those with `purpose`."""
+        async def list_all():
+            kwargs = {"purpose": purpose} if purpose else {}
+            return [f async for f in self.client.files.list(timeout=timeout or settings.LLM_TIMEOUT, **kwargs)]
+
+        return await self._call(priority, 0, list_all, span="llm_list_files")
+
+    async def create_response(self, timeout: Optional[float] = None, priority: Priority = Priority.PROCESS, **kwargs):
+        return await self._call(priority, estimate_tokens(kwargs), lambda: self.client.responses.create(
+            timeout=timeout or settings.LLM_TIMEOUT, **kwargs
+        ), model=kwargs.get("model"))
+
+    async def create_chat_completion(self, timeout: Optional[float] = None, priority: Priority = Priority.PROCESS, **kwargs):
+        return await self._call(priority, estimate_tokens(kwargs), lambda: self.client.chat.completions.create(
+            timeout=timeout or settings.LLM_TIMEOUT, **kwargs
+        ), model=kwargs.get("model"))
+
+    async def stream_response(self, timeout: Optional[float] = None, priority: Priority = Priority.PROCESS, **kwargs) -> AsyncIterator[str]:
+        """Yields output text deltas of a streamed Responses API call."""
+        model = kwargs.get("model")
+
+        def extract(event):
+            if event.type == "response.output_text.delta":
+                return event.delta, None
+            if event.type == "response.completed":
+                usage = getattr(event.response, "usage", None)
+                telemetry.record_usage(model, usage)
+                return None, usage
+            if event.type in ("response.failed", "error"):
+                raise RuntimeError(f"LLM stream failed: {getattr(event, 'error', None) or event.type}")
+            return None, None
+
+        async for text in self._stream(priority, estimate_tokens(kwargs), lambda: self.client.responses.create(
+            stream=True, timeout=timeout or settings.LLM_TIMEOUT, **kwargs
+        ), extract):
+            yield text
+
+    async def stream_chat_completion(self, timeout: Optional[float] = None, priority: Priority = Priority.PROCESS, **kwargs) -> AsyncIterator[str]:
+        """Yields content deltas of a streamed chat completion."""
+        # The final chunk then carries token usage (and no choices)
+        kwargs.setdefault("stream_options", {"include_usage": True})
+        model = kwargs.get("model")
+
+        def extract(chunk):
+            if chunk.choices and chunk.choices[0].delta.content:
+                return chunk.choices[0].delta.content, None
+            usage = getattr(chunk, "usage", None)
+            if usage:
+                telemetry.record_usage(model, usage)
+                return None, usage
+            return None, None
+
+        async for text in self._stream(priority, estimate_tokens(kwargs), lambda: self.client.chat.completions.create(
+            stream=True, timeout=timeout or settings.LLM_TIMEOUT, **kwargs
+        ), extract):
+            yield text
+
+
+# Singleton instance
+llm_client = LLMClient()
@@ -0,0 +1,364 @@
+import asyncio
+import json
+import logging
+import random
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from email.utils import parsedate_to_datetime
+from enum import IntEnum
+from typing import Deque, List, Optional
+
+from ..config import settings
+from .shared_state import shared_state
+from .telemetry import telemetry, Counter, Histogram
+
+logger = logging.getLogger(__name__)
+
+
+class Priority(IntEnum):
+    INTERACTIVE = 0  # chat edits the user is waiting on (/modify-resume)
+    PROCESS = 1  # first conversion of an upload (extraction, template fill, structuring)
+    BACKGROUND = 2  # housekeeping such as remote file deletion
+
+
+_current_user: ContextVar[str] = ContextVar("llm_user", default="system")
+
+
+def bind_user(user_id: Optional[str]):
+    """Attributes the LLM calls made by the current request (and tasks it spawns) to `user_id`."""
+    _current_user.set(user_id or "anonymous")
+
+
+def estimate_tokens(kwargs: dict) -> int:
+    """Rough prompt + completion budget of a call (4 chars/token), charged to the TPM bucket up front."""
+    prompt_chars = len(json.dumps(kwargs.get("messages") or kwargs.get("input") or "", default=str))
+    completion = kwargs.get("max_output_tokens") or kwargs.get("max_tokens") or settings.LLM_DEFAULT_COMPLETION_TOKENS
+    return prompt_chars // 4 + completion
+
+
+def retry_after(error: Exception) -> Optional[float]:
+    """Seconds from the Retry-After / retry-after-ms headers of a provider error, if any."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    value = headers.get("retry-after-ms")
+    if value:
+        try:
+            return float(value) / 1000
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+
+def backoff_delay(attempt: int, error: Exception) -> float:
+    """Retry-After (plus up to one base delay of jitter) when given, else full-jitter exponential backoff."""
+    base = settings.LLM_RETRY_BASE_DELAY
+    hinted = retry_after(error)
+    if hinted is not None:
+        return min(hinted, settings.LLM_RETRY_MAX_DELAY) + random.uniform(0, base)
+    return random.uniform(0, min(settings.LLM_RETRY_MAX_DELAY, base * 2 ** (attempt - 1)))
+
+
+class TokenBucket:
+    """Refills `per_minute` units per minute up to a one-minute burst; per_minute=0 disables it."""
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    @property
+    def enabled(self) -> bool:
+        return self.capacity > 0
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, cost: float, now: float) -> float:
+        """Seconds until `cost` units are available (0 when they are now)."""
+        if not self.enabled:
+            return 0.0
+        self._refill(now)
+        # A single call bigger than the whole bucket only has to wait for a full bucket
+        missing = min(cost, self.capacity) - self.tokens
+        return missing / self.rate if missing > 0 else 0.0
+
+    def take(self, cost: float):
+        if self.enabled:
+            self.tokens -= min(cost, self.capacity)
+
+    def adjust(self, delta: float):
+        """Charges (positive) or refunds (negative) the difference between estimate and actual use."""
+        if self.enabled:
+            self.tokens = min(self.capacity, self.tokens - delta)
+
+
+class Grant:
+    __slots__ = ("future", "user", "priority", "cost", "enqueued")
+
+    def __init__(self, user: str, priority: Priority, cost: int):
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+        self.user = user
+        self.priority = priority
+        self.cost = cost
+        self.enqueued = time.perf_counter()
+
+
+class LLMScheduler:
+    """
+    Admission control in front of every OpenAI call.
+    - Strict priority between classes (INTERACTIVE > PROCESS > BACKGROUND).
+    - Within a class, users are served round-robin, so one user's burst queues
+      behind everybody else's next call instead of in front of it.
+    - At most `max_concurrency` calls in flight; requests-per-minute and
+      tokens-per-minute token buckets (tokens are estimated up front and
+      reconciled with the reported usage).
+    - pause() stops all dispatching, e.g. while the provider's Retry-After runs.
+    - With a distributed shared state, admitted calls are also charged against
+      cluster-wide per-minute windows, since the provider limits the whole
+      account, not this process (fails open when Redis errors). A call the
+      cluster window turns away gives its slot back and holds dispatching
+      until the window has room, keeping its place at the head of the queue.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: Optional[int] = None,
+        requests_per_minute: Optional[int] = None,
+        tokens_per_minute: Optional[int] = None,
+    ):
+        self.max_concurrency = max_concurrency or settings.LLM_MAX_CONCURRENCY
+        rpm = requests_per_minute if requests_per_minute is not None else settings.LLM_REQUESTS_PER_MINUTE
+        tpm = tokens_per_minute if tokens_per_minute is not None else settings.LLM_TOKENS_PER_MINUTE
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.requests_per_minute = rpm
+        self.tokens_per_minute = tpm
+
+        self._queues: List["OrderedDict[str, Deque[Grant]]"] = [OrderedDict() for _ in Priority]
+        self._active = 0
+        self._paused_until = 0.0
+        self._cluster_until = 0.0
+        self._wakeup: Optional[asyncio.TimerHandle] = None
+        self._wakeup_at = 0.0
+        self._background: set = set()
+
+        self.wait_seconds = Histogram(
+            "resumegpt_llm_queue_wait_seconds", "Time LLM calls waited for admission.", ("priority",)
+        )
+        self.events = Counter("resumegpt_llm_scheduler_events_total", "LLM retries and rate limits.", ("event",))
+        telemetry.add_collector(self._metric_lines)
+
+    # ---------------------------
+    # Admission
+    # ---------------------------
+    @asynccontextmanager
+    async def slot(self, priority: Priority = Priority.PROCESS, cost: int = 0):
+        """Waits for admission; yields the Grant (pass it to reconcile()) and frees the slot on exit."""
+        grant = Grant(_current_user.get(), priority, cost)
+        self._queues[priority].setdefault(grant.user, deque()).append(grant)
+        self._dispatch()
+        while True:
+            try:
+                await grant.future
+            except asyncio.CancelledError:
+                if grant.future.done() and not grant.future.cancelled():
+                    self._release()  # admitted just before the cancellation landed
+                else:
+                    self._discard(grant)
+                raise
+
+            if not shared_state.distributed:
+                break
+            try:
+                wait = await self._cluster_acquire(grant)
+            except BaseException:
+                self._release()
+                raise
+            if not wait:
+                break
+            self.events.inc(1, "cluster_limited")
+            self._requeue(grant, wait)
+
+        waited = time.perf_counter() - grant.enqueued
+        telemetry.record("llm_queue", waited)
+        if telemetry.metrics_enabled:
+            self.wait_seconds.observe(waited, priority.name.lower())
+        try:
+            yield grant
+        finally:
+            self._release()
+
+    def reconcile(self, grant: Grant, usage):
+        """Corrects the TPM bucket once the response reports its real token usage."""
+        if usage is None:
+            return
+        actual = getattr(usage, "total_tokens", None)
+        if actual is None:
+            actual = (getattr(usage, "input_tokens", None) or getattr(usage, "prompt_tokens", None) or 0) + (
+                getattr(usage, "output_tokens", None) or getattr(usage, "completion_tokens", None) or 0
+            )
+        self.tokens.adjust(actual - grant.cost)
+        if shared_state.distributed and self.tokens_per_minute and actual != grant.cost:
+            task = asyncio.create_task(self._cluster_adjust(actual - grant.cost))
+            self._background.add(task)
+            task.add_done_callback(self._background.discard)
+
+    async def _cluster_acquire(self, grant: Grant) -> float:
+        """Charges the call to the cluster-wide RPM/TPM windows; returns seconds to wait when they are full."""
+        try:
+            wait = 0.0
+            if self.requests_per_minute:
+                wait = await shared_state.window_acquire("llm:rpm", 1, self.requests_per_minute)
+            if not wait and self.tokens_per_minute and grant.cost:
+                wait = await shared_state.window_acquire("llm:tpm", grant.cost, self.tokens_per_minute)
+                if wait and self.requests_per_minute:
+                    await shared_state.window_adjust("llm:rpm", -1)
+            return wait
+        except Exception as e:
+            logger.warning(f"Cluster rate limit unavailable, admitting locally: {e}")
+            return 0.0
+
+    def _requeue(self, grant: Grant, wait: float):
+        """Gives an admitted grant's slot back and puts it first in line once the cluster window has room."""
+        self.requests.adjust(-1)
+        self.tokens.adjust(-grant.cost)
+        grant.future = asyncio.get_running_loop().create_future()
+        queue = self._queues[grant.priority]
+        queue.setdefault(grant.user, deque()).appendleft(grant)
+        queue.move_to_end(grant.user, last=False)
+        self._cluster_until = max(self._cluster_until, time.monotonic() + wait)
+        self._release()
+
+    async def _cluster_adjust(self, delta: int):
+        try:
+            await shared_state.window_adjust("llm:tpm", delta)
+        except Exception as e:
+            logger.debug(f"Cluster TPM adjustment failed: {e}")
+
+    def pause(self, seconds: float):
+        """Holds every queued call for `seconds` (the provider told us to back off)."""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        self.events.inc(1, "rate_limited")
+
+    def note_retry(self):
+        self.events.inc(1, "retry")
+
+    def _release(self):
+        self._active -= 1
+        self._dispatch()
+
+    def _discard(self, grant: Grant):
+        queue = self._queues[grant.priority]
+        waiting = queue.get(grant.user)
+        if waiting is None:
+            return
+        try:
+            waiting.remove(grant)
+        except ValueError:
+            return
+        if not waiting:
+            del queue[grant.user]
+
+    def _next(self) -> Optional[Grant]:
+        for queue in self._queues:
+            for waiting in queue.values():
+                return waiting[0]
+        return None
+
+    def _pop(self, grant: Grant):
+        queue = self._queues[grant.priority]
+        waiting = queue[grant.user]
+        waiting.popleft()
+        if waiting:
+            queue.move_to_end(grant.user)  # round-robin: this user goes behind the others
+        else:
+            del queue[grant.user]
+
+    def _dispatch(self):
+        while self._active < self.max_concurrency:
+            grant = self._next()
+            if grant is None:
+                return
+            if grant.future.done():  # cancelled while queued
+                self._pop(grant)
+                continue
+            now = time.monotonic()
+            delay = max(
+                self._paused_until - now,
+                self._cluster_until - now,
+                self.requests.delay(1, now),
+                self.tokens.delay(grant.cost, now),
+            )
+            if delay > 0:
+                self._schedule_wakeup(delay)
+                return
+            self._pop(grant)
+            self.requests.take(1)
+            self.tokens.take(grant.cost)
+            self._active += 1
+            grant.future.set_result(None)
+
+    def _schedule_wakeup(self, delay: float):
+        at = time.monotonic() + delay
+        if self._wakeup is not None and self._wakeup_at <= at:
+            return
+        if self._wakeup is not None:
+            self._wakeup.cancel()
+        self._wakeup_at = at
+        self._wakeup = asyncio.get_running_loop().call_later(delay, self._on_wakeup)
+
+    def _on_wakeup(self):
+        self._wakeup = None
+        self._dispatch()
+
+    # ---------------------------
+    # Observability
+    # ---------------------------
+    def stats(self) -> dict:
+        now = time.monotonic()
+        return {
+            "active": self._active,
+            "max_concurrency": self.max_concurrency,
+            "queued": {
+                priority.name.lower(): sum(len(waiting) for waiting in self._queues[priority].values())
+                for priority in Priority
+            },
+            "queued_users": {priority.name.lower(): len(self._queues[priority]) for priority in Priority},
+            "paused_for": max(0.0, self._paused_until - now),
+            "cluster_limited_for": max(0.0, self._cluster_until - now),
+            "requests_available": round(self.requests.tokens, 1) if self.requests.enabled else None,
+            "tokens_available": round(self.tokens.tokens) if self.tokens.enabled else None,
+        }
+
+    def _metric_lines(self) -> List[str]:
+        stats = self.stats()
+        lines = [
+            "# HELP resumegpt_llm_queue_depth LLM calls waiting for admission.",
+            "# TYPE resumegpt_llm_queue_depth gauge",
+        ]
+        lines += [f'resumegpt_llm_queue_depth{{priority="{name}"}} {depth}' for name, depth in stats["queued"].items()]
+        lines += [
+            "# HELP resumegpt_llm_active LLM calls in flight.",
+            "# TYPE resumegpt_llm_active gauge",
+            f"resumegpt_llm_active {stats['active']}",
+        ]
+        return lines + self.wait_seconds.render() + self.events.render()
+
+
+# Singleton instance
+llm_scheduler = LLMScheduler()
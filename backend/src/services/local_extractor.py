@@ -0,0 +1,311 @@
+import csv
+import io
+import logging
+import posixpath
+import re
+import zipfile
+import xml.etree.ElementTree as ET
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional
+
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+# OOXML namespaces
+W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+A = "{http://schemas.openxmlformats.org/drawingml/2006/main}"
+S = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+P = "{http://schemas.openxmlformats.org/presentationml/2006/main}"
+R = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+PKG_REL = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+
+# Refuse archives that would inflate beyond this (zip bombs)
+MAX_UNCOMPRESSED_BYTES = 100 * 1024 * 1024
+
+
+class LocalExtractionError(Exception):
+    """Raised when a document cannot be parsed locally."""
+
+
+# ------------------------------------------------------------------
+# Helpers
+# ------------------------------------------------------------------
+def decode_text(data: bytes) -> str:
+    for encoding in ("utf-8-sig", "cp1252"):
+        try:
+            return data.decode(encoding)
+        except UnicodeDecodeError:
+            continue
+    return data.decode("latin-1")
+
+
+def _open_package(file_bytes: bytes) -> zipfile.ZipFile:
+    try:
+        package = zipfile.ZipFile(io.BytesIO(file_bytes))
+    except zipfile.BadZipFile as e:
+        raise LocalExtractionError(f"Not an OOXML package: {e}")
+    if sum(info.file_size for info in package.infolist()) > MAX_UNCOMPRESSED_BYTES:
+        raise LocalExtractionError("Package too large to extract locally")
+    return package
+
+
+def _iter_top_level(stream, container_depth: int) -> Iterator[ET.Element]:
+    """
+    Streams a part and yields each element sitting directly below `container_depth`
+    (e.g. depth 1 = children of <w:body>), clearing it afterwards to keep memory flat.
+    """
+    depth = 0
+    for event, elem in ET.iterparse(stream, events=("start", "end")):
+        if event == "start":
+            depth += 1
+            continue
+        depth -= 1
+        if depth == container_depth + 1:
+            yield elem
+            elem.clear()
+
+
+def _relationships(package: zipfile.ZipFile, rels_path: str, base_dir: str) -> Dict[str, str]:
+    if rels_path not in package.namelist():
+        return {}
+    root = ET.fromstring(package.read(rels_path))
+    return {
+        rel.get("Id"): posixpath.normpath(posixpath.join(base_dir, rel.get("Target", "")))
+        for rel in root.iter(f"{PKG_REL}Relationship")
+    }
+
+
+def _numbered_parts(package: zipfile.ZipFile, pattern: str) -> List[str]:
+    regex = re.compile(pattern)
+    matches = [(int(m.group(1)), name) for name in package.namelist() if (m := regex.fullmatch(name))]
+    return [name for _, name in sorted(matches)]
+
+
+# ------------------------------------------------------------------
+# DOCX
+# ------------------------------------------------------------------
+def _docx_paragraph(paragraph: ET.Element) -> str:
+    parts = []
+    for node in paragraph.iter():
+        if node.tag == f"{W}t" and node.text:
+            parts.append(node.text)
+        elif node.tag == f"{W}tab":
+            parts.append("\t")
+        elif node.tag in (f"{W}br", f"{W}cr"):
+            parts.append("\n")
+    return "".join(parts).strip()
+
+
+def _docx_content(container: ET.Element, tag: str) -> List[ET.Element]:
+    """Children with `tag`, looking through <w:sdt> content controls (Word templates wrap whole sections in them)."""
+    found = []
+    for child in container:
+        if child.tag == tag:
+            found.append(child)
+        elif child.tag == f"{W}sdt":
+            content = child.find(f"{W}sdtContent")
+            if content is not None:
+                found.extend(_docx_content(content, tag))
+    return found
+
+
+def _docx_blocks(container: ET.Element) -> List[str]:
+    """Lines of the paragraphs and tables directly in `container` (body, cell, content control), in order."""
+    lines = []
+    for child in container:
+        if child.tag == f"{W}p":
+            text = _docx_paragraph(child)
+            if text:
+                lines.append(text)
+        elif child.tag == f"{W}tbl":
+            lines.extend(_docx_table(child))
+        elif child.tag == f"{W}sdt":
+            content = child.find(f"{W}sdtContent")
+            if content is not None:
+                lines.extend(_docx_blocks(content))
+    return lines
+
+
+def _docx_table(table: ET.Element) -> List[str]:
+    rows = []
+    # Direct rows and cells only: a nested table is read once, as part of its cell
+    for row in _docx_content(table, f"{W}tr"):
+        cells = [" ".join(_docx_blocks(cell)) for cell in _docx_content(row, f"{W}tc")]
+        if any(cells):
+            rows.append(" | ".join(cells))
+    return rows
+
+
+def _docx_part(package: zipfile.ZipFile, name: str, container_depth: int) -> List[str]:
+    lines = []
+    with package.open(name) as stream:
+        for elem in _iter_top_level(stream, container_depth):
+            if elem.tag in (f"{W}p", f"{W}tbl", f"{W}sdt"):
+                # Wrapped so body-level content controls are read like the body itself
+                lines.extend(_docx_blocks([elem]))
+    return lines
+
+
+def extract_docx(file_bytes: bytes) -> str:
+    with _open_package(file_bytes) as package:
+        if "word/document.xml" not in package.namelist():
+            raise LocalExtractionError("word/document.xml missing")
+        lines = []
+        # Resume templates often keep the name/contact block in the header
+        for header in _numbered_parts(package, r"word/header(\d+)\.xml"):
+            lines.extend(_docx_part(package, header, container_depth=0))
+        lines.extend(_docx_part(package, "word/document.xml", container_depth=1))
+        for footer in _numbered_parts(package, r"word/footer(\d+)\.xml"):
+            lines.extend(_docx_part(package, footer, container_depth=0))
+    return "\n".join(lines)
+
+
+# ------------------------------------------------------------------
+# XLSX
+# ------------------------------------------------------------------
+def _column_index(cell_ref: str) -> int:
+    index = 0
+    for char in cell_ref:
+        if not char.isalpha():
+            break
+        index = index * 26 + (ord(char.upper()) - 64)
+    return index - 1
+
+
+def extract_xlsx(file_bytes: bytes) -> str:
+    with _open_package(file_bytes) as package:
+        names = package.namelist()
+        shared: List[str] = []
+        if "xl/sharedStrings.xml" in names:
+            with package.open("xl/sharedStrings.xml") as stream:
+                for item in _iter_top_level(stream, container_depth=0):
+                    if item.tag == f"{S}si":
+                        shared.append("".join(t.text or "" for t in item.iter(f"{S}t")))
+
+        sheets = []
+        if "xl/workbook.xml" in names:
+            rels = _relationships(package, "xl/_rels/workbook.xml.rels", "xl")
+            workbook = ET.fromstring(package.read("xl/workbook.xml"))
+            for sheet in workbook.iter(f"{S}sheet"):
+                target = rels.get(sheet.get(f"{R}id"))
+                if target in names:
+                    sheets.append((sheet.get("name", ""), target))
+        if not sheets:
+            sheets = [("", name) for name in _numbered_parts(package, r"xl/worksheets/sheet(\d+)\.xml")]
+
+        lines = []
+        for sheet_name, part in sheets:
+            if sheet_name:
+                lines.append(f"# {sheet_name}")
+            with package.open(part) as stream:
+                for _, row in ET.iterparse(stream, events=("end",)):
+                    if row.tag != f"{S}row":
+                        continue
+                    values: Dict[int, str] = {}
+                    for position, cell in enumerate(row.findall(f"{S}c")):
+                        cell_type = cell.get("t")
+                        if cell_type == "inlineStr":
+                            value = "".join(t.text or "" for t in cell.iter(f"{S}t"))
+                        else:
+                            v = cell.find(f"{S}v")
+                            value = v.text if v is not None and v.text else ""
+                            if cell_type == "s" and value.isdigit() and int(value) < len(shared):
+                                value = shared[int(value)]
+                        ref = cell.get("r")
+                        values[_column_index(ref) if ref else position] = value.strip()
+                    row.clear()
+                    if any(values.values()):
+                        width = max(values) + 1
+                        lines.append("\t".join(values.get(i, "") for i in range(width)).rstrip())
+    return "\n".join(lines)
+
+
+# ------------------------------------------------------------------
+# PPTX
+# ------------------------------------------------------------------
+def extract_pptx(file_bytes: bytes) -> str:
+    with _open_package(file_bytes) as package:
+        names = package.namelist()
+        slides = []
+        if "ppt/presentation.xml" in names:
+            rels = _relationships(package, "ppt/_rels/presentation.xml.rels", "ppt")
+            presentation = ET.fromstring(package.read("ppt/presentation.xml"))
+            for slide_id in presentation.iter(f"{P}sldId"):
+                target = rels.get(slide_id.get(f"{R}id"))
+                if target in names:
+                    slides.append(target)
+        if not slides:
+            slides = _numbered_parts(package, r"ppt/slides/slide(\d+)\.xml")
+
+        lines = []
+        for number, part in enumerate(slides, start=1):
+            slide_lines = []
+            with package.open(part) as stream:
+                for _, elem in ET.iterparse(stream, events=("end",)):
+                    if elem.tag == f"{A}p":
+                        text = "".join(t.text or "" for t in elem.iter(f"{A}t")).strip()
+                        if text:
+                            slide_lines.append(text)
+                        elem.clear()
+            if slide_lines:
+                lines.append(f"# Slide {number}")
+                lines.extend(slide_lines)
+    return "\n".join(lines)
+
+
+# ------------------------------------------------------------------
+# CSV / TXT
+# ------------------------------------------------------------------
+def extract_csv(file_bytes: bytes) -> str:
+    text = decode_text(file_bytes)
+    try:
+        dialect = csv.Sniffer().sniff(text[:4096])
+    except csv.Error:
+        dialect = csv.excel
+    rows = csv.reader(io.StringIO(text), dialect)
+    return "\n".join(" | ".join(cell.strip() for cell in row) for row in rows if any(cell.strip() for cell in row))
+
+
+def extract_txt(file_bytes: bytes) -> str:
+    return decode_text(file_bytes).replace("\r\n", "\n").strip()
+
+
+EXTRACTORS: Dict[str, Callable[[bytes], str]] = {
+    ".docx": extract_docx,
+    ".xlsx": extract_xlsx,
+    ".pptx": extract_pptx,
+    ".csv": extract_csv,
+    ".txt": extract_txt,
+}
+
+
+# ------------------------------------------------------------------
+# Quality gate
+# ------------------------------------------------------------------
+def is_usable(text: str) -> bool:
+    """Rejects empty/near-empty output and text that is mostly non-printable garbage."""
+    stripped = text.strip()
+    if len(stripped) < settings.LOCAL_EXTRACTION_MIN_CHARS:
+        return False
+    printable = sum(1 for char in stripped if char.isprintable() or char in "\n\t")
+    return printable / len(stripped) >= 0.95
+
+
+def extract_locally(file_bytes: bytes, filename: str) -> Optional[str]:
+    """
+    Returns the document text if the format is supported locally and the result passes
+    the quality gate, otherwise None (caller falls back to the LLM).
+    """
+    extractor = EXTRACTORS.get(Path(filename).suffix.lower())
+    if extractor is None:
+        return None
+    try:
+        text = extractor(file_bytes)
+    except (LocalExtractionError, ET.ParseError, zipfile.BadZipFile, KeyError) as e:
+        logger.warning(f"Local extraction failed for {filename}: {e}")
+        return None
+    if not is_usable(text):
+        logger.info(f"Local extraction of {filename} rejected by quality gate ({len(text)} chars)")
+        return None
+    return text
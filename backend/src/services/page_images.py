@@ -0,0 +1,133 @@
+import asyncio
+import io
+import logging
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional
+
+from pdf2image import convert_from_bytes, pdfinfo_from_bytes
+
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+IMAGE_MEDIA_TYPES = {"png": "image/png", "webp": "image/webp"}
+
+
+def render_page_image(pdf_bytes: bytes, page: int = 1, dpi: int = 50, fmt: str = "png") -> bytes:
+    """Rasterizes one PDF page (1-based) to PNG or WebP via poppler. Blocking; run it in a thread."""
+    images = convert_from_bytes(pdf_bytes, dpi=dpi, first_page=page, last_page=page, fmt="ppm")
+    if not images:
+        raise ValueError(f"PDF has no page {page}")
+    buffer = io.BytesIO()
+    if fmt == "webp":
+        # Lossless only grows text-heavy pages; q80 keeps glyph edges crisp at preview DPIs
+        images[0].save(buffer, format="WEBP", quality=80, method=4)
+    else:
+        images[0].save(buffer, format="PNG", optimize=True)
+    return buffer.getvalue()
+
+
+def count_pages(pdf_bytes: bytes) -> int:
+    """Page count via pdfinfo. Blocking; run it in a thread."""
+    return int(pdfinfo_from_bytes(pdf_bytes)["Pages"])
+
+
+class PageImageCache:
+    """
+    Rasterized pages keyed by (document hash, page, dpi, format), in an LRU
+    bounded by total bytes, plus the page count of each document seen.
+    Rasterization runs in threads, at most `workers` at a time, and concurrent
+    misses on the same key share one rasterization.
+    """
+
+    def __init__(self, max_bytes: Optional[int] = None, workers: Optional[int] = None):
+        self.max_bytes = max_bytes if max_bytes is not None else settings.PREVIEW_CACHE_MAX_BYTES
+        self._semaphore = asyncio.Semaphore(workers or settings.PREVIEW_RASTER_WORKERS)
+        self._images: "OrderedDict[tuple, bytes]" = OrderedDict()
+        self._bytes = 0
+        self._page_counts: "OrderedDict[str, int]" = OrderedDict()
+        self._inflight: Dict[tuple, asyncio.Future] = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _put(self, key: tuple, data: bytes):
+        if len(data) > self.max_bytes:
+            return
+        if key in self._images:
+            self._bytes -= len(self._images.pop(key))
+        self._images[key] = data
+        self._bytes += len(data)
+        while self._bytes > self.max_bytes:
+            _, evicted = self._images.popitem(last=False)
+            self._bytes -= len(evicted)
+            self.evictions += 1
+
+    async def page_count(self, doc_key: str, load_pdf: Callable[[], Awaitable[bytes]]) -> int:
+        count = self._page_counts.get(doc_key)
+        if count is None:
+            pdf_bytes = await load_pdf()
+            async with self._semaphore:
+                count = await asyncio.to_thread(count_pages, pdf_bytes)
+            self._page_counts[doc_key] = count
+            while len(self._page_counts) > settings.PREVIEW_PAGE_COUNT_ENTRIES:
+                self._page_counts.popitem(last=False)
+        else:
+            self._page_counts.move_to_end(doc_key)
+        return count
+
+    async def get_or_render(
+        self,
+        doc_key: str,
+        page: int,
+        dpi: int,
+        fmt: str,
+        load_pdf: Callable[[], Awaitable[bytes]],
+    ) -> bytes:
+        """The cached raster, else rasterizes `await load_pdf()` (only called on a miss)."""
+        key = (doc_key, page, dpi, fmt)
+        data = self._images.get(key)
+        if data is not None:
+            self._images.move_to_end(key)
+            self.hits += 1
+            return data
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.hits += 1
+            return await asyncio.shield(inflight)
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            pdf_bytes = await load_pdf()
+            async with self._semaphore:
+                data = await asyncio.to_thread(render_page_image, pdf_bytes, page, dpi, fmt)
+            self._put(key, data)
+            future.set_result(data)
+            return data
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self._images),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+        }
+
+
+# Singleton instance
+page_image_cache = PageImageCache()
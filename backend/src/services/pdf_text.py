@@ -0,0 +1,204 @@
+import asyncio
+import logging
+import shutil
+import subprocess
+import tempfile
+import time
+import unicodedata
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+# Plain-text resumes average well above this many characters per page
+EXPECTED_CHARS_PER_PAGE = 500
+# Blocks wider than this fraction of the page (headers, summaries) span every column
+SPANNING_BLOCK_RATIO = 0.6
+# Minimum empty vertical band (pt) between two columns
+MIN_GUTTER = 10.0
+CLEAR_GUTTER = 18.0
+
+
+def _local(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+
+def _block_text(block: ET.Element) -> str:
+    lines = []
+    for line in block:
+        if _local(line.tag) != "line":
+            continue
+        words = [word.text for word in line if _local(word.tag) == "word" and word.text]
+        if words:
+            lines.append(" ".join(words))
+    return "\n".join(lines)
+
+
+def _order_page(blocks: List[dict], page_width: float) -> Tuple[List[str], bool, float]:
+    """
+    Orders the blocks of one page for reading. Returns (texts, is_multi_column, confidence).
+    A two-column layout is detected from the widest empty vertical band among the
+    non-spanning blocks in the middle of the page.
+    """
+    narrow = [b for b in blocks if (b["x1"] - b["x0"]) < page_width * SPANNING_BLOCK_RATIO]
+    if len(narrow) < 2:
+        return [b["text"] for b in blocks], False, 1.0
+
+    # Widest x-interval in the central band not covered by any narrow block
+    intervals = sorted((b["x0"], b["x1"]) for b in narrow)
+    lo_limit, hi_limit = page_width * 0.15, page_width * 0.85
+    best_gap, best_split = 0.0, None
+    covered_to = intervals[0][1]
+    for x0, x1 in intervals[1:]:
+        if x0 > covered_to:
+            gap_lo, gap_hi = max(covered_to, lo_limit), min(x0, hi_limit)
+            if gap_hi - gap_lo > best_gap:
+                best_gap, best_split = gap_hi - gap_lo, (gap_lo + gap_hi) / 2
+        covered_to = max(covered_to, x1)
+
+    if best_split is None or best_gap < 4.0:
+        return [b["text"] for b in blocks], False, 1.0
+
+    left = [b for b in narrow if b["x1"] <= best_split]
+    right = [b for b in narrow if b["x0"] >= best_split]
+    left_chars = sum(len(b["text"]) for b in left)
+    right_chars = sum(len(b["text"]) for b in right)
+    total = left_chars + right_chars
+    balance = min(left_chars, right_chars) / total if total else 0.0
+
+    if best_gap >= CLEAR_GUTTER and balance >= 0.2:
+        is_multi, confidence = True, 1.0
+    elif best_gap >= MIN_GUTTER and balance >= 0.2:
+        is_multi, confidence = True, 0.6
+    else:
+        return [b["text"] for b in blocks], False, 0.6 if best_gap >= MIN_GUTTER else 0.9
+
+    column_top = min(b["y0"] for b in left + right)
+    spanning = sorted((b for b in blocks if b not in left and b not in right), key=lambda b: b["y0"])
+    above = [b for b in spanning if b["y0"] < column_top]
+    below = [b for b in spanning if b["y0"] >= column_top]
+    ordered = above + sorted(left, key=lambda b: b["y0"]) + sorted(right, key=lambda b: b["y0"]) + below
+    return [b["text"] for b in ordered], is_multi, confidence
+
+
+def _garbage_ratio(text: str) -> float:
+    if not text:
+        return 1.0
+    garbage = 0
+    for char in text:
+        if char in "\n\t ":
+            continue
+        if char == "�" or unicodedata.category(char) in ("Co", "Cc", "Cs", "Cn"):
+            garbage += 1
+    return garbage / len(text)
+
+
+def parse_bbox_layout(xhtml: bytes) -> dict:
+    """Turns `pdftotext -bbox-layout` output into ordered text plus quality metrics."""
+    root = ET.fromstring(xhtml)
+    pages_text = []
+    confidences = []
+    multi_column_pages = 0
+    for page in root.iter():
+        if _local(page.tag) != "page":
+            continue
+        page_width = float(page.get("width", 612))
+        blocks = []
+        for block in page.iter():
+            if _local(block.tag) != "block":
+                continue
+            text = _block_text(block)
+            if text:
+                blocks.append({
+                    "x0": float(block.get("xMin", 0)),
+                    "y0": float(block.get("yMin", 0)),
+                    "x1": float(block.get("xMax", 0)),
+                    "text": text,
+                })
+        texts, is_multi, confidence = _order_page(blocks, page_width)
+        pages_text.append("\n\n".join(texts))
+        confidences.append(confidence)
+        multi_column_pages += int(is_multi)
+
+    text = "\n\n".join(t for t in pages_text if t).strip()
+    page_count = max(len(pages_text), 1)
+    coverage = min(1.0, len(text) / (EXPECTED_CHARS_PER_PAGE * page_count))
+    garbage = _garbage_ratio(text)
+    column_confidence = sum(confidences) / len(confidences) if confidences else 0.0
+    score = coverage * max(0.0, 1.0 - garbage * 5) * column_confidence
+
+    return {
+        "text": text,
+        "quality": {
+            "score": round(score, 3),
+            "char_coverage": round(coverage, 3),
+            "garbage_ratio": round(garbage, 4),
+            "multi_column_confidence": round(column_confidence, 3),
+            "multi_column_pages": multi_column_pages,
+            "pages": len(pages_text),
+        },
+    }
+
+
+def _run_pdftotext(file_bytes: bytes, timeout: float) -> bytes:
+    with tempfile.NamedTemporaryFile(suffix=".pdf") as pdf_file:
+        pdf_file.write(file_bytes)
+        pdf_file.flush()
+        completed = subprocess.run(
+            ["pdftotext", "-bbox-layout", "-enc", "UTF-8", pdf_file.name, "-"],
+            capture_output=True,
+            timeout=timeout,
+            check=True,
+        )
+    return completed.stdout
+
+
+class PdfTextExtractor:
+    """
+    Local text-layer extraction for born-digital PDFs via poppler's pdftotext.
+    Work runs on a bounded thread pool (each job drives its own pdftotext process),
+    so the event loop never blocks on it.
+    """
+
+    def __init__(self, workers: Optional[int] = None, timeout: Optional[float] = None):
+        self.workers = workers or settings.PDF_TEXT_WORKERS
+        self.timeout = timeout or settings.PDF_TEXT_TIMEOUT
+        self.available = shutil.which("pdftotext") is not None
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="pdftext")
+        if not self.available:
+            logger.warning("pdftotext not found; PDFs will always use LLM extraction")
+
+    def _extract(self, file_bytes: bytes) -> dict:
+        return parse_bbox_layout(_run_pdftotext(file_bytes, self.timeout))
+
+    async def extract(self, file_bytes: bytes) -> Optional[dict]:
+        """
+        Returns {"text", "quality", "elapsed", "usable"} or None when the PDF has no
+        extractable text layer or poppler is unavailable.
+        """
+        if not self.available:
+            return None
+        start = time.time()
+        loop = asyncio.get_running_loop()
+        try:
+            result = await loop.run_in_executor(self._executor, self._extract, file_bytes)
+        except (subprocess.SubprocessError, ET.ParseError, OSError) as e:
+            logger.warning(f"Local PDF extraction failed: {e}")
+            return None
+        result["elapsed"] = time.time() - start
+        result["usable"] = result["quality"]["score"] >= settings.PDF_TEXT_MIN_QUALITY
+        logger.info(
+            f"📑 Local PDF text layer: score={result['quality']['score']} "
+            f"in {result['elapsed'] * 1000:.1f}ms (usable={result['usable']})"
+        )
+        return result
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+# Singleton instance
+pdf_text_extractor = PdfTextExtractor()
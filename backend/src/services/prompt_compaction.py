@@ -0,0 +1,212 @@
+import logging
+import re
+from typing import Dict, List, Optional
+
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+MARKER = "__ASSET_"
+
+# Added next to compacted code in prompts
+PLACEHOLDER_NOTE = (
+    "NOTE: Tokens like /*__ASSET_0__*/, <!--__ASSET_1__--> or __ASSET_2__ stand for content "
+    "that is not shown (CSS, images, comments). Copy them exactly where they are; never edit or remove them."
+)
+
+# Opaque regions the model never needs to read: comments and <style>/<script> bodies
+_OPAQUE = re.compile(
+    r"<!--.*?-->|(<(style|script)\b[^>]*>)(.*?)(</\2\s*>)",
+    re.IGNORECASE | re.DOTALL,
+)
+# Inline data URIs (base64 images, fonts) in attributes and CSS url()
+_DATA_URI = re.compile(r"data:[\w.+-]+/[\w.+-]+(?:;[\w.+-]+=[\w.+-]+)*(?:;base64)?,[^\"')\s>]+", re.IGNORECASE)
+# SVG geometry
+_SVG_GEOMETRY = re.compile(r"""(\s(?:d|points)\s*=\s*)(?:"([^"]*)"|'([^']*)')""", re.IGNORECASE)
+# Whitespace is significant inside these
+_PRESERVE_SPACE = re.compile(r"(<(pre|textarea)\b.*?</\2\s*>)", re.IGNORECASE | re.DOTALL)
+_WHITESPACE = re.compile(r"\s{2,}")
+
+# Placeholders as the model may echo them: with their comment delimiters, or bare
+_PLACEHOLDER = re.compile(r"(?:/\*|<!--)?\s*__ASSET_(\d+)__\s*(?:\*/|-->)?")
+_PLACEHOLDER_FORMS = (("/*", "*/"), ("<!--", "-->"), ("", ""))
+_HEAD_END = re.compile(r"</head\s*>", re.IGNORECASE)
+
+
+def _minify_whitespace(markup: str) -> str:
+    """Collapses whitespace runs (a newline survives as one newline) outside <pre>/<textarea>."""
+
+    def collapse(match: re.Match) -> str:
+        return "\n" if "\n" in match.group(0) else " "
+
+    parts = _PRESERVE_SPACE.split(markup)
+    # split() with two groups yields [text, block, tag name, text, block, tag name, ...]
+    for index in range(0, len(parts), 3):
+        parts[index] = _WHITESPACE.sub(collapse, parts[index])
+    return "".join(part for index, part in enumerate(parts) if index % 3 != 2)
+
+
+def _is_partial_placeholder(tail: str) -> bool:
+    """True when `tail` could be the beginning of a placeholder still being streamed."""
+    for opener, closer in _PLACEHOLDER_FORMS:
+        if opener.startswith(tail):
+            return True
+        if not tail.startswith(opener):
+            continue
+        rest = tail[len(opener):]
+        if MARKER.startswith(rest):
+            return True
+        if not rest.startswith(MARKER):
+            continue
+        rest = rest[len(MARKER):]
+        digits = len(rest) - len(rest.lstrip("0123456789"))
+        if not digits:
+            continue
+        rest = rest[digits:]
+        if "__".startswith(rest):
+            return True
+        if rest.startswith("__") and closer.startswith(rest[2:]) and rest[2:] != closer:
+            return True
+    return False
+
+
+class CompactedHtml:
+    """
+    HTML with its opaque parts swapped for short placeholders, plus what is needed
+    to put them back. `restore()` is applied to whatever the model returns.
+    """
+
+    def __init__(self, original: str, html: str, blobs: List[str], styles: Dict[int, str]):
+        self.original = original
+        self.html = html
+        self.blobs = blobs
+        # blob index -> full <style> element, re-injected if the model drops it
+        self.styles = styles
+
+    @property
+    def saved_chars(self) -> int:
+        return len(self.original) - len(self.html)
+
+    def _substitute(self, text: str, seen: Optional[set] = None) -> str:
+        if not self.blobs or MARKER not in text:
+            return text
+
+        def replace(match: re.Match) -> str:
+            index = int(match.group(1))
+            if index >= len(self.blobs):
+                return match.group(0)
+            if seen is not None:
+                seen.add(index)
+            return self.blobs[index]
+
+        return _PLACEHOLDER.sub(replace, text)
+
+    def restore_fragment(self, text: str) -> str:
+        """Puts placeholders back in a piece of markup (no <style> re-injection)."""
+        return self._substitute(text)
+
+    def restore(self, text: str) -> str:
+        """Puts every placeholder back verbatim and re-injects <style> blocks the model dropped."""
+        seen = set()
+        restored = self._substitute(text, seen)
+        missing = [element for index, element in self.styles.items() if index not in seen]
+        if missing:
+            logger.warning(f"Model dropped {len(missing)} <style> block(s), re-injecting them")
+            block = "".join(missing)
+            head_end = _HEAD_END.search(restored)
+            if head_end:
+                restored = f"{restored[:head_end.start()]}{block}{restored[head_end.start():]}"
+            else:
+                restored = block + restored
+        return restored
+
+    def stream_restorer(self) -> "IncrementalRestorer":
+        return IncrementalRestorer(self)
+
+    @property
+    def note(self) -> str:
+        """PLACEHOLDER_NOTE when anything was elided, else empty."""
+        return PLACEHOLDER_NOTE if self.blobs else ""
+
+
+class IncrementalRestorer:
+    """
+    Streaming counterpart of CompactedHtml.restore() for live previews: a tail that
+    could be a placeholder split across chunks is held back until it is complete.
+    (Dropped <style> blocks are only re-injected by restore() on the full text.)
+    """
+
+    MAX_HOLDBACK = 24
+
+    def __init__(self, compacted: CompactedHtml):
+        self.compacted = compacted
+        self._pending = ""
+
+    def _holdback(self, text: str) -> int:
+        window_start = max(0, len(text) - 2 * self.MAX_HOLDBACK)
+        matches = [(m.start() + window_start, m.end() + window_start)
+                   for m in _PLACEHOLDER.finditer(text[window_start:])]
+        for size in range(min(len(text), self.MAX_HOLDBACK), 0, -1):
+            split = len(text) - size
+            # "/" also starts a placeholder, but not when it closes the one before it
+            if _is_partial_placeholder(text[split:]) and not any(start < split < end for start, end in matches):
+                return size
+        return 0
+
+    def feed(self, chunk: str) -> str:
+        text = self._pending + chunk
+        keep = self._holdback(text)
+        ready, self._pending = (text[:-keep], text[-keep:]) if keep else (text, "")
+        return self.compacted.restore_fragment(ready)
+
+    def finish(self) -> str:
+        tail, self._pending = self._pending, ""
+        return self.compacted.restore_fragment(tail)
+
+
+def compact_html(html_code: str, keep_css: bool = False, min_blob_chars: Optional[int] = None) -> CompactedHtml:
+    """
+    Prepares HTML for a prompt: comments, <script> bodies, <style> bodies (unless
+    `keep_css`), data URIs and long SVG path data become placeholders such as
+    `/*__ASSET_0__*/`, and whitespace is minified. Returns the input unchanged when
+    compaction is disabled or the document already contains the marker.
+    """
+    if not settings.PROMPT_COMPACTION_ENABLED or MARKER in html_code:
+        return CompactedHtml(html_code, html_code, [], {})
+    min_chars = min_blob_chars if min_blob_chars is not None else settings.PROMPT_COMPACTION_MIN_BLOB_CHARS
+    blobs: List[str] = []
+    styles: Dict[int, str] = {}
+
+    def stash(value: str) -> str:
+        blobs.append(value)
+        return f"{MARKER}{len(blobs) - 1}__"
+
+    def opaque(match: re.Match) -> str:
+        opening, tag, body, closing = match.groups()
+        if tag is None:  # comment
+            return f"<!--{stash(match.group(0))}-->" if len(match.group(0)) >= min_chars else match.group(0)
+        if (tag.lower() == "style" and keep_css) or len(body) < min_chars:
+            return match.group(0)
+        placeholder = f"{opening}/*{stash(body)}*/{closing}"
+        if tag.lower() == "style":
+            styles[len(blobs) - 1] = match.group(0)
+        return placeholder
+
+    def data_uri(match: re.Match) -> str:
+        return stash(match.group(0)) if len(match.group(0)) >= min_chars else match.group(0)
+
+    def geometry(match: re.Match) -> str:
+        value = match.group(2) if match.group(2) is not None else match.group(3)
+        if len(value) < min_chars:
+            return match.group(0)
+        return f'{match.group(1)}"{stash(value)}"'
+
+    compacted = _OPAQUE.sub(opaque, html_code)
+    compacted = _DATA_URI.sub(data_uri, compacted)
+    compacted = _SVG_GEOMETRY.sub(geometry, compacted)
+    compacted = _minify_whitespace(compacted)
+
+    logger.info(
+        f"🗜️ Prompt HTML compacted {len(html_code)} -> {len(compacted)} chars ({len(blobs)} blobs elided)"
+    )
+    return CompactedHtml(html_code, compacted, blobs, styles)
@@ -0,0 +1,465 @@
+import html
+import logging
+import re
+from typing import Callable, Dict, List, Optional, Tuple
+
+from ..config import settings
+from .html_dom import Document, Element, Text, parse_html
+from .telemetry import Counter, telemetry
+
+logger = logging.getLogger(__name__)
+
+# Courtesy words around the actual request
+_LEADING = re.compile(r"^(?:(?:please|pls|kindly|can you|could you|would you|hey|hi)[\s,]+)+", re.IGNORECASE)
+_TRAILING = re.compile(r"(?:[\s,]+(?:please|pls|thanks|thank you))?[\s.!?]*$", re.IGNORECASE)
+_QUOTE_OPEN, _QUOTE_CLOSE = "[\"'“‘]", "[\"'”’]"
+
+_EMAIL = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+")
+_PHONE = re.compile(r"(?<![\w+])\+?(?:\(\d{1,4}\)[\s.-]?)?\d[\d\s().-]{5,}\d(?!\w)")
+_LENGTH = re.compile(r"(?<![\w.-])(\d*\.?\d+)(in|mm|cm|pt|px)\b")
+_FONT_SIZE = re.compile(r"(font-size\s*:\s*)(\d*\.?\d+)(pt|px)\b", re.IGNORECASE)
+_RULE = re.compile(r"([^{}]+)\{([^{}]*)\}")
+_PAGE_SELECTOR = re.compile(r"\.page(?![\w-])|@page\b")
+_MARGIN_DECLARATION = re.compile(
+    r"(?<![\w-])(padding(?:-(?:top|right|bottom|left))?|margin(?:-(?:top|right|bottom|left))?|--margin[\w-]*)"
+    r"(\s*:\s*)([^;}]*)",
+    re.IGNORECASE,
+)
+_ENTRY_CLASS = re.compile(r"(?:^|[-_])(?:entry|item)s?$", re.IGNORECASE)
+_BODY_FONT_SIZE = re.compile(r"(?:^|[}\s,])body\s*\{[^}]*?font-size\s*:\s*(\d*\.?\d+)(pt|px)", re.IGNORECASE)
+
+_EMAIL_FIELD = r"(?:my\s+|the\s+)?e-?mail(?:\s+address|\s+id)?"
+_PHONE_FIELD = r"(?:my\s+|the\s+)?(?:phone|mobile|cell|telephone|contact)(?:\s+(?:number|no\.?|#))?"
+_SET = r"(?:change|update|set|replace|make|use)"
+_TO = r"\s*(?:to|with|as|:|=|->)\s*"
+
+INTENTS: List[Tuple[str, re.Pattern]] = [
+    ("email", re.compile(
+        rf"{_SET}\s+{_EMAIL_FIELD}(?:\s+from\s+(?P<old>\S+@\S+))?{_TO}(?P<new>[^\s@]+@[^\s@]+\.[^\s@]+)", re.IGNORECASE)),
+    ("email", re.compile(r"(?:my\s+)?new\s+e-?mail(?:\s+address)?\s+is\s+(?P<new>[^\s@]+@[^\s@]+\.[^\s@]+)", re.IGNORECASE)),
+    ("phone", re.compile(
+        rf"{_SET}\s+{_PHONE_FIELD}(?:\s+from\s+(?P<old>\+?[\d\s().-]{{7,}}?))?{_TO}(?P<new>\+?[\d\s().-]{{7,}})", re.IGNORECASE)),
+    ("phone", re.compile(r"(?:my\s+)?new\s+(?:phone|mobile)(?:\s+number)?\s+is\s+(?P<new>\+?[\d\s().-]{7,})", re.IGNORECASE)),
+    ("font", re.compile(
+        r"(?:make|set)\s+(?:the\s+|all\s+(?:the\s+)?)?(?:font|text|fonts)(?:\s+size)?\s+"
+        r"(?P<direction>smaller|bigger|larger|tinier)(?:\s+(?:a\s+)?(?:bit|little|slightly))?", re.IGNORECASE)),
+    ("font", re.compile(
+        r"(?P<direction>increase|decrease|reduce|enlarge|shrink)\s+(?:the\s+)?(?:overall\s+)?(?:font|text)(?:\s+size)?"
+        r"(?:\s+(?:a\s+)?(?:bit|little|slightly))?", re.IGNORECASE)),
+    ("font", re.compile(r"(?P<direction>smaller|bigger|larger)\s+(?:font|text)(?:\s+size)?", re.IGNORECASE)),
+    ("font", re.compile(
+        r"(?:change|set|make)\s+(?:the\s+)?(?:font|text)\s+size\s+(?:to\s+)?(?P<size>\d+(?:\.\d+)?)\s*(?P<unit>pt|px)?",
+        re.IGNORECASE)),
+    ("margins", re.compile(
+        r"(?P<direction>increase|decrease|reduce|shrink|widen|narrow|tighten)\s+(?:the\s+)?(?:page\s+)?margins?"
+        r"(?:\s+(?:a\s+)?(?:bit|little|slightly))?", re.IGNORECASE)),
+    ("margins", re.compile(
+        r"make\s+(?:the\s+)?(?:page\s+)?margins?\s+(?P<direction>smaller|bigger|larger|narrower|wider|tighter)"
+        r"(?:\s+(?:a\s+)?(?:bit|little|slightly))?", re.IGNORECASE)),
+    ("margins", re.compile(r"(?P<direction>smaller|bigger|larger|narrower|wider|tighter)\s+(?:page\s+)?margins?", re.IGNORECASE)),
+    ("margins", re.compile(
+        r"(?:set|change|make)\s+(?:the\s+)?(?:page\s+)?margins?\s+(?:to\s+)?(?P<size>\d*\.?\d+)\s*(?P<unit>in|mm|cm|pt|px)",
+        re.IGNORECASE)),
+    ("section_title", re.compile(
+        rf"(?:rename|retitle)\s+(?:the\s+)?(?:section\s+)?{_QUOTE_OPEN}?(?P<old>[^\"'“”‘’]+?){_QUOTE_CLOSE}?"
+        rf"(?:\s+(?:section|heading|title))?\s+(?:to|as|into)\s+{_QUOTE_OPEN}?(?P<new>[^\"'“”‘’]+?){_QUOTE_CLOSE}?",
+        re.IGNORECASE)),
+    ("section_title", re.compile(
+        rf"(?:change|update)\s+(?:the\s+)?(?:section\s+(?:title|heading|name)\s+)?{_QUOTE_OPEN}?(?P<old>[^\"'“”‘’]+?){_QUOTE_CLOSE}?"
+        rf"\s+(?:section(?:\s+(?:title|heading|name))?|heading|title)\s+to\s+{_QUOTE_OPEN}?(?P<new>[^\"'“”‘’]+?){_QUOTE_CLOSE}?",
+        re.IGNORECASE)),
+    ("remove_item", re.compile(
+        r"(?:remove|delete|drop)\s+(?:the\s+)?(?P<kind>bullet\s+point|bullet|item|line|point|entry)\s+"
+        rf"(?:(?:about|mentioning|containing|with|saying|that\s+says|on|for)\s+)?{_QUOTE_OPEN}?(?P<text>.+?){_QUOTE_CLOSE}?",
+        re.IGNORECASE)),
+    ("remove_item", re.compile(
+        rf"(?:remove|delete|drop)\s+(?:the\s+)?{_QUOTE_OPEN}(?P<text>.+?){_QUOTE_CLOSE}"
+        r"(?:\s+(?P<kind>bullet\s+point|bullet|item|line|point|entry))?", re.IGNORECASE)),
+]
+
+# Direction words that mean "less"
+_DECREASE = {"smaller", "tinier", "decrease", "reduce", "shrink", "narrow", "narrower", "tighten", "tighter"}
+FONT_STEP = 1.08  # per "bigger"/"smaller"
+MARGIN_STEP = 1.25
+FONT_BOUNDS_PT = (6.0, 24.0)  # body sizes outside this are left to the LLM
+PX_PER_PT = 4 / 3
+
+
+def classify(prompt: str) -> Optional[Tuple[str, Dict[str, str]]]:
+    """(intent, parameters) when the whole prompt is one simple edit, else None."""
+    request = _TRAILING.sub("", _LEADING.sub("", " ".join(prompt.split())))
+    for intent, pattern in INTENTS:
+        match = pattern.fullmatch(request)
+        if match:
+            return intent, {key: value for key, value in match.groupdict().items() if value is not None}
+    return None
+
+
+# ------------------------------------------------------------------
+# Helpers
+# ------------------------------------------------------------------
+def _normalize(text: str) -> str:
+    return " ".join(text.split()).lower()
+
+
+def _text_nodes(element: Element):
+    """(text node, parent) pairs in document order, outside <style>/<script>."""
+    for child in element.children:
+        if isinstance(child, Text):
+            yield child, element
+        elif isinstance(child, Element) and child.tag not in ("style", "script"):
+            yield from _text_nodes(child)
+
+
+def _styles(document: Document) -> List[Element]:
+    return [el for el in document.iter() if el.tag == "style"]
+
+
+def _set_css(style: Element, css: str):
+    # CSS is raw text: set_text() would escape it
+    style.replace_children([Text(css)])
+
+
+def _format_number(value: float) -> str:
+    return f"{value:.2f}".rstrip("0").rstrip(".") or "0"
+
+
+def _digits(phone: str) -> str:
+    return re.sub(r"\D", "", phone)
+
+
+def _is_phone(candidate: str) -> bool:
+    digits = len(_digits(candidate))
+    # Year ranges ("2019 - 2023") have 8 digits; real numbers 10+, or fewer behind a country code
+    return 10 <= digits <= 15 or (candidate.startswith("+") and 7 <= digits <= 15)
+
+
+# ------------------------------------------------------------------
+# Handlers: edit the document in place and return the reply, or None to escalate
+# ------------------------------------------------------------------
+def _edit_email(document: Document, params: Dict[str, str]) -> Optional[str]:
+    new = params["new"].rstrip(".,;")
+    found = {email.lower() for node, _ in _text_nodes(document) for email in _EMAIL.findall(html.unescape(node.data))}
+    links = [el for el in document.iter() if (el.get("href") or "").lower().startswith("mailto:")]
+    found |= {email.lower() for el in links for email in _EMAIL.findall(el.get("href"))}
+
+    old = params.get("old", "").lower()
+    if old:
+        if old not in found:
+            return None
+    elif len(found) == 1:
+        old = found.pop()
+    else:
+        return None  # no address, or several: which one is meant?
+    if old == new.lower():
+        return None
+
+    pattern = re.compile(re.escape(old), re.IGNORECASE)
+    for node, _ in _text_nodes(document):
+        if old in node.data.lower():
+            node.data = pattern.sub(html.escape(new, quote=False), node.data)
+    for el in links:
+        el.set("href", pattern.sub(new, el.get("href")))
+    return f"I've updated your email address to {new}."
+
+
+def _edit_phone(document: Document, params: Dict[str, str]) -> Optional[str]:
+    new = params["new"].strip(" .,;")
+    if not _is_phone(new):
+        return None
+    occurrences = [
+        (node, match) for node, _ in _text_nodes(document)
+        for match in _PHONE.finditer(node.data) if _is_phone(match.group(0))
+    ]
+    links = [el for el in document.iter() if (el.get("href") or "").lower().startswith("tel:")]
+    found = {_digits(match.group(0)) for _, match in occurrences} | {_digits(el.get("href")) for el in links}
+
+    old = _digits(params.get("old", ""))
+    if old:
+        # "from 98104 37497" may omit the country code
+        candidates = [digits for digits in found if digits.endswith(old)]
+        if len(candidates) != 1:
+            return None
+        old = candidates[0]
+    elif len(found) == 1:
+        old = found.pop()
+    else:
+        return None
+    if old == _digits(new):
+        return None
+
+    # Replace right to left so earlier match offsets stay valid
+    for node, match in reversed(occurrences):
+        if _digits(match.group(0)) == old:
+            node.data = node.data[:match.start()] + html.escape(new, quote=False) + node.data[match.end():]
+    for el in links:
+        if _digits(el.get("href")) == old:
+            el.set("href", "tel:" + re.sub(r"[^\d+]", "", new))
+    return f"I've updated your phone number to {new}."
+
+
+def _is_heading(element: Element) -> bool:
+    if element.tag in ("h1", "h2", "h3", "h4", "h5", "h6"):
+        return True
+    return any(word in name for name in element.classes for word in ("section", "heading", "title"))
+
+
+def _edit_section_title(document: Document, params: Dict[str, str]) -> Optional[str]:
+    old, new = params["old"].strip(), params["new"].strip()
+    target = _normalize(old).rstrip(":")
+    headings = [el for el in document.iter() if _is_heading(el) and _normalize(el.text_content()).rstrip(":") == target]
+    # A heading class on both a wrapper and its title element: keep the innermost
+    headings = [el for el in headings if not any(other is not el and _contains(el, other) for other in headings)]
+    if len(headings) != 1:
+        return None
+
+    nodes = [node for node, _ in _text_nodes(headings[0]) if _normalize(html.unescape(node.data)).rstrip(":") == target]
+    if len(nodes) != 1:
+        return None  # title split across several nodes
+    node = nodes[0]
+    current = html.unescape(node.data).strip()
+    if current.isupper():
+        new = new.upper()
+    leading, trailing = re.match(r"\s*", node.data).group(0), re.search(r"\s*$", node.data).group(0)
+    colon = ":" if current.endswith(":") and not new.endswith(":") else ""
+    node.data = f"{leading}{html.escape(new, quote=False)}{colon}{trailing}"
+    return f'I\'ve renamed the "{current.rstrip(":")}" section to "{new}".'
+
+
+def _contains(ancestor: Element, element: Element) -> bool:
+    node = element.parent
+    while node is not None:
+        if node is ancestor:
+            return True
+        node = node.parent
+    return False
+
+
+def _edit_font(document: Document, params: Dict[str, str]) -> Optional[str]:
+    styles = _styles(document)
+    css = {id(style): style.text_content() for style in styles}
+    base = next((match for style in styles for match in [_BODY_FONT_SIZE.search(css[id(style)])] if match), None)
+
+    if "size" in params:
+        if base is None:
+            return None
+        base_size, base_unit = float(base.group(1)), base.group(2).lower()
+        target = float(params["size"])
+        unit = (params.get("unit") or base_unit).lower()
+        if unit != base_unit:
+            target = target * PX_PER_PT if base_unit == "px" else target / PX_PER_PT
+        factor = target / base_size
+    else:
+        factor = 1 / FONT_STEP if params["direction"].lower() in _DECREASE else FONT_STEP
+
+    if base is not None:
+        base_pt = float(base.group(1)) / (PX_PER_PT if base.group(2).lower() == "px" else 1)
+        if not FONT_BOUNDS_PT[0] <= base_pt * factor <= FONT_BOUNDS_PT[1]:
+            return None
+    if abs(factor - 1) < 0.005:
+        return None
+
+    def scale(match: re.Match) -> str:
+        return f"{match.group(1)}{_format_number(float(match.group(2)) * factor)}{match.group(3)}"
+
+    changed = 0
+    for style in styles:
+        updated, count = _FONT_SIZE.subn(scale, css[id(style)])
+        if count:
+            _set_css(style, updated)
+            changed += count
+    for el in document.iter():
+        style_attr = el.get("style")
+        if style_attr and "font-size" in style_attr.lower():
+            updated, count = _FONT_SIZE.subn(scale, style_attr)
+            if count:
+                el.set("style", updated)
+                changed += count
+    if not changed:
+        return None
+
+    if "size" in params:
+        return f"I've set the base font size to {params['size']}{params.get('unit') or base.group(2)} and scaled the other text sizes to match."
+    return f"I've made the text {'smaller' if factor < 1 else 'larger'} across the resume."
+
+
+def _edit_margins(document: Document, params: Dict[str, str]) -> Optional[str]:
+    if "size" in params:
+        replacement = f"{params['size']}{params['unit'].lower()}"
+
+        def length(match: re.Match) -> str:
+            return replacement if float(match.group(1)) else match.group(0)
+    else:
+        factor = 1 / MARGIN_STEP if params["direction"].lower() in _DECREASE else MARGIN_STEP
+
+        def length(match: re.Match) -> str:
+            return f"{_format_number(float(match.group(1)) * factor)}{match.group(2)}"
+
+    changed = 0
+
+    def rule(match: re.Match) -> str:
+        selector = match.group(1)
+        at_page = "@page" in selector
+        page_rule = bool(_PAGE_SELECTOR.search(selector))
+
+        def declaration(decl: re.Match) -> str:
+            nonlocal changed
+            name = decl.group(1).lower()
+            # Page margins: @page margin, .page padding, --margin-* variables (wherever they are set)
+            relevant = name.startswith("--margin") or (
+                page_rule and name.startswith("margin" if at_page else "padding")
+            )
+            if not relevant:
+                return decl.group(0)
+            value = _LENGTH.sub(length, decl.group(3))
+            if value != decl.group(3):
+                changed += 1
+            return f"{decl.group(1)}{decl.group(2)}{value}"
+
+        return f"{selector}{{{_MARGIN_DECLARATION.sub(declaration, match.group(2))}}}"
+
+    for style in _styles(document):
+        css = style.text_content()
+        updated = _RULE.sub(rule, css)
+        if updated != css:
+            _set_css(style, updated)
+    if not changed:
+        return None
+    if "size" in params:
+        return f"I've set the page margins to {params['size']}{params['unit'].lower()}."
+    return f"I've made the page margins {'narrower' if factor < 1 else 'wider'}."
+
+
+def _is_entry(element: Element) -> bool:
+    """Entry containers: class "entry", "resume-entry", "project-item"... (not "entry-top" parts)."""
+    return element.tag != "li" and any(_ENTRY_CLASS.search(name) for name in element.classes)
+
+
+def _text_without(element: Element, skip: Callable[[Element], bool]) -> str:
+    """Text of `element` leaving out the subtrees `skip` selects."""
+    parts = []
+    for child in element.children:
+        if isinstance(child, Text):
+            parts.append(html.unescape(child.data))
+        elif isinstance(child, Element) and not skip(child):
+            parts.append(_text_without(child, skip))
+    return " ".join(parts)
+
+
+def _edit_remove_item(document: Document, params: Dict[str, str]) -> Optional[str]:
+    phrase = _normalize(params["text"])
+    if len(phrase) < 3:
+        return None
+    kind = _normalize(params.get("kind", "item"))
+
+    def mentions(element: Element, skip: Callable[[Element], bool] = lambda el: False) -> bool:
+        return phrase in _normalize(_text_without(element, skip))
+
+    if kind == "entry":
+        # The phrase must be in the entry's own text (its heading), not only in one of its bullets
+        candidates = [el for el in document.iter() if _is_entry(el) and mentions(el, lambda child: child.tag == "li")]
+        matches = [el for el in candidates if not any(other is not el and _contains(el, other) for other in candidates)]
+    else:
+        lis = [el for el in document.iter() if el.tag == "li" and mentions(el)]
+        entries = [el for el in document.iter() if kind == "item" and _is_entry(el) and mentions(el)]
+        candidates = lis + entries
+        matches = [el for el in candidates if not any(other is not el and _contains(el, other) for other in candidates)]
+    if len(matches) != 1:
+        return None
+    element = matches[0]
+
+    # "Google" in both an entry's heading and one of its bullets: the bullet or the whole entry?
+    ancestor = element.parent
+    while ancestor is not None and not isinstance(ancestor, Document):
+        if _is_entry(ancestor) and mentions(ancestor, lambda child: child is element):
+            return None
+        ancestor = ancestor.parent
+
+    siblings = element.parent.children
+    index = siblings.index(element)
+    del siblings[index]
+    if index and isinstance(siblings[index - 1], Text) and not siblings[index - 1].data.strip():
+        del siblings[index - 1]  # the indentation before it
+    snippet = " ".join(element.text_content().split())
+    return f'I\'ve removed "{snippet[:80]}{"…" if len(snippet) > 80 else ""}".'
+
+
+HANDLERS: Dict[str, Callable[[Document, Dict[str, str]], Optional[str]]] = {
+    "email": _edit_email,
+    "phone": _edit_phone,
+    "section_title": _edit_section_title,
+    "font": _edit_font,
+    "margins": _edit_margins,
+    "remove_item": _edit_remove_item,
+}
+
+
+class QuickEditor:
+    """
+    Deterministic fast path for /modify-resume: prompts that are one simple edit
+    (contact fields, section titles, font size, page margins, removing an item)
+    are applied to the DOM locally in milliseconds. Anything the classifier does
+    not recognise, or that is ambiguous in the document (two email addresses,
+    a phrase in several bullets), returns None and goes to the LLM.
+    """
+
+    def __init__(self, enabled: Optional[bool] = None):
+        self.enabled = settings.MODIFY_FAST_PATH_ENABLED if enabled is None else enabled
+        self.outcomes = Counter(
+            "resumegpt_modify_fast_path_total", "Modify requests by fast-path intent and outcome.", ("intent", "outcome")
+        )
+        self.hits = 0
+        self.escalated = 0
+        telemetry.add_collector(self._metric_lines)
+
+    def apply(self, html_code: str, prompt: str) -> Optional[dict]:
+        """The modify_html() result for a simple edit, or None to escalate."""
+        if not self.enabled:
+            return None
+        classified = classify(prompt)
+        if classified is None:
+            self._count("none", "escalated")
+            return None
+        intent, params = classified
+
+        try:
+            document = parse_html(html_code)
+            reply = HANDLERS[intent](document, params)
+            modified_html = document.serialize() if reply else None
+        except Exception as e:
+            logger.warning(f"Fast-path {intent} edit failed ({e}), escalating to the LLM")
+            reply = modified_html = None
+        if reply is None or modified_html == html_code:
+            self._count(intent, "declined")
+            return None
+
+        self._count(intent, "hit")
+        logger.info(f"⚡ Fast-path {intent} edit applied locally")
+        return {"success": True, "modified_html": modified_html, "reply_text": reply}
+
+    def _count(self, intent: str, outcome: str):
+        if outcome == "hit":
+            self.hits += 1
+        else:
+            self.escalated += 1
+        self.outcomes.inc(1, intent, outcome)
+
+    def stats(self) -> dict:
+        total = self.hits + self.escalated
+        return {
+            "enabled": self.enabled,
+            "hits": self.hits,
+            "escalated": self.escalated,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
+
+    def _metric_lines(self) -> List[str]:
+        return self.outcomes.render() + [
+            "# HELP resumegpt_modify_fast_path_hit_ratio Share of modify requests resolved without an LLM call.",
+            "# TYPE resumegpt_modify_fast_path_hit_ratio gauge",
+            f"resumegpt_modify_fast_path_hit_ratio {self.stats()['hit_rate']}",
+        ]
+
+
+# Singleton instance
+quick_editor = QuickEditor()
@@ -0,0 +1,268 @@
+import asyncio
+import hashlib
+import logging
+import os
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, Optional
+
+from ..config import settings
+from .shared_state import shared_state
+
+logger = logging.getLogger(__name__)
+
+
+def render_key(processed_html: str, options: str = "") -> str:
+    """Content address of a render: hash of the preprocessed HTML + render options."""
+    digest = hashlib.sha256()
+    digest.update(options.encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(processed_html.encode("utf-8"))
+    return digest.hexdigest()
+
+
+class PdfRenderCache:
+    """
+    Two-tier cache for rendered PDFs.
+    - Memory: LRU bounded by total bytes.
+    - Disk (optional): one file per key; the mtime is the last use. A background
+      sweeper deletes entries idle for longer than `ttl`, then the least recently
+      used ones while the directory is over `disk_max_bytes`.
+    - Shared: when the shared state is distributed (Redis), renders are also
+      stored there for `ttl`, so other workers and nodes skip the render.
+    Concurrent misses on the same key share a single render.
+    """
+
+    def __init__(
+        self,
+        max_bytes: Optional[int] = None,
+        disk_dir: Optional[str] = None,
+        ttl: Optional[int] = None,
+        disk_max_bytes: Optional[int] = None,
+        sweep_interval: Optional[float] = None,
+    ):
+        self.max_bytes = max_bytes if max_bytes is not None else settings.PDF_CACHE_MAX_BYTES
+        disk_dir = disk_dir if disk_dir is not None else settings.PDF_CACHE_DIR
+        self.disk_dir = Path(disk_dir) if disk_dir else None
+        self.ttl = ttl if ttl is not None else settings.PDF_CACHE_TTL
+        self.disk_max_bytes = disk_max_bytes or settings.PDF_CACHE_DISK_MAX_BYTES
+        self.sweep_interval = sweep_interval or settings.PDF_CACHE_SWEEP_INTERVAL
+
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._memory_bytes = 0
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._disk_bytes = 0  # estimate between sweeps
+        self._sweep_task: Optional[asyncio.Task] = None
+        self._sweeping: Optional[asyncio.Task] = None
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.disk_evictions = 0
+
+        if self.disk_dir:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+
+    # ---------------------------
+    # Memory tier
+    # ---------------------------
+    def _memory_get(self, key: str) -> Optional[bytes]:
+        data = self._memory.get(key)
+        if data is not None:
+            self._memory.move_to_end(key)
+        return data
+
+    def _memory_put(self, key: str, data: bytes):
+        if len(data) > self.max_bytes:
+            return
+        if key in self._memory:
+            self._memory_bytes -= len(self._memory.pop(key))
+        self._memory[key] = data
+        self._memory_bytes += len(data)
+        while self._memory_bytes > self.max_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+            self.evictions += 1
+
+    # ---------------------------
+    # Disk tier (blocking, run via asyncio.to_thread)
+    # ---------------------------
+    def _disk_path(self, key: str) -> Path:
+        return self.disk_dir / f"{key}.pdf"
+
+    def _disk_get(self, key: str) -> Optional[bytes]:
+        path = self._disk_path(key)
+        try:
+            if time.time() - path.stat().st_mtime > self.ttl:
+                return None  # the sweeper removes it
+            data = path.read_bytes()
+            os.utime(path)
+            return data
+        except FileNotFoundError:
+            return None
+
+    def _disk_put(self, key: str, data: bytes):
+        path = self._disk_path(key)
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        tmp_path.write_bytes(data)
+        tmp_path.replace(path)
+
+    def sweep(self) -> int:
+        """Deletes idle disk entries, then LRU ones over the quota. Returns the number removed."""
+        if not self.disk_dir:
+            return 0
+        now = time.time()
+        for tmp_path in self.disk_dir.glob("*.tmp"):
+            # Left behind by a worker that died mid-write
+            try:
+                if tmp_path.stat().st_mtime < now - 3600:
+                    tmp_path.unlink()
+            except FileNotFoundError:
+                pass
+        files = []
+        for path in self.disk_dir.glob("*.pdf"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+        files.sort()
+        total = sum(size for _, size, _ in files)
+        cutoff = now - self.ttl
+        removed = 0
+        for mtime, size, path in files:
+            if mtime >= cutoff and total <= self.disk_max_bytes:
+                break
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            total -= size
+            removed += 1
+        self._disk_bytes = total
+        self.disk_evictions += removed
+        if removed:
+            logger.info(f"🧹 Removed {removed} cached PDFs ({total / 1024 / 1024:.1f} MiB kept)")
+        return removed
+
+    async def _sweep_loop(self):
+        while True:
+            try:
+                await asyncio.to_thread(self.sweep)
+            except Exception as e:
+                logger.warning(f"PDF cache sweep failed: {e}")
+            await asyncio.sleep(self.sweep_interval)
+
+    def start(self):
+        if not self.disk_dir or self._sweep_task is not None:
+            return
+        self._sweep_task = asyncio.create_task(self._sweep_loop())
+
+    async def stop(self):
+        for task in (self._sweep_task, self._sweeping):
+            if task is not None:
+                task.cancel()
+        self._sweep_task = None
+        self._sweeping = None
+
+    # ---------------------------
+    # Shared tier (best effort)
+    # ---------------------------
+    async def _shared_get(self, key: str) -> Optional[bytes]:
+        try:
+            return await shared_state.get(f"pdf:{key}")
+        except Exception as e:
+            logger.warning(f"Shared PDF cache read failed: {e}")
+            return None
+
+    async def _shared_put(self, key: str, data: bytes):
+        try:
+            await shared_state.set(f"pdf:{key}", data, ttl=self.ttl)
+        except Exception as e:
+            logger.warning(f"Shared PDF cache write failed: {e}")
+
+    # ---------------------------
+    # Public API
+    # ---------------------------
+    async def get(self, key: str) -> Optional[bytes]:
+        data = self._memory_get(key)
+        if data is not None:
+            self.hits += 1
+            return data
+        if self.disk_dir:
+            data = await asyncio.to_thread(self._disk_get, key)
+            if data is not None:
+                self.disk_hits += 1
+                self._memory_put(key, data)
+                return data
+        if shared_state.distributed:
+            data = await self._shared_get(key)
+            if data is not None:
+                self.shared_hits += 1
+                self._memory_put(key, data)
+                return data
+        return None
+
+    async def put(self, key: str, data: bytes):
+        self._memory_put(key, data)
+        if self.disk_dir:
+            await asyncio.to_thread(self._disk_put, key, data)
+            self._disk_bytes += len(data)
+            if self._disk_bytes > self.disk_max_bytes and (self._sweeping is None or self._sweeping.done()):
+                # Over quota: sweep now instead of waiting for the next interval
+                self._sweeping = asyncio.create_task(asyncio.to_thread(self.sweep))
+        if shared_state.distributed:
+            await self._shared_put(key, data)
+
+    async def get_or_render(self, key: str, render: Callable[[], Awaitable[bytes]]) -> bytes:
+        data = await self.get(key)
+        if data is not None:
+            return data
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.hits += 1
+            return await asyncio.shield(inflight)
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            data = await render()
+            await self.put(key, data)
+            future.set_result(data)
+            return data
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Nobody else may be awaiting it; mark the exception retrieved
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "shared_hits": self.shared_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "disk_evictions": self.disk_evictions,
+            "memory_entries": len(self._memory),
+            "memory_bytes": self._memory_bytes,
+            "memory_max_bytes": self.max_bytes,
+            "disk_enabled": self.disk_dir is not None,
+            "disk_bytes": self._disk_bytes,
+            "disk_max_bytes": self.disk_max_bytes,
+            "shared_enabled": shared_state.distributed,
+        }
+
+
+# Singleton instance
+render_cache = PdfRenderCache()
@@ -0,0 +1,161 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional, Tuple
+
+from ..config import settings
+from .telemetry import telemetry
+
+logger = logging.getLogger(__name__)
+
+
+class RenderError(Exception):
+    """Raised when a worker fails to produce a PDF."""
+
+
+class RenderQueueFull(RenderError):
+    """Raised when the pool already holds the maximum number of pending renders."""
+
+    def __init__(self, retry_after: int):
+        super().__init__("PDF render queue is full")
+        self.retry_after = retry_after
+
+
+class RenderTimeout(RenderError):
+    """Raised when a single render exceeds PDF_RENDER_TIMEOUT."""
+
+
+# ------------------------------------------------------------------
+# Worker side (runs inside the child processes)
+# ------------------------------------------------------------------
+_worker_font_config = None
+
+
+def _init_worker():
+    """Import WeasyPrint and build the font configuration once per worker."""
+    global _worker_font_config
+    from weasyprint import HTML  # noqa: F401  (warm the import)
+    from weasyprint.text.fonts import FontConfiguration
+
+    _worker_font_config = FontConfiguration()
+    # Render a trivial document so fontconfig/pango caches are hot
+    HTML(string="<p>warmup</p>").write_pdf(font_config=_worker_font_config)
+
+
+def _render_pdf(html_content: str) -> Tuple[bytes, float, float]:
+    """Returns (pdf, layout seconds, write seconds): the split is what telemetry reports."""
+    from weasyprint import HTML
+
+    start = time.perf_counter()
+    document = HTML(string=html_content).render(font_config=_worker_font_config)
+    laid_out = time.perf_counter()
+    pdf_bytes = document.write_pdf()
+    return pdf_bytes, laid_out - start, time.perf_counter() - laid_out
+
+
+# ------------------------------------------------------------------
+# Engine (runs in the API process)
+# ------------------------------------------------------------------
+class PdfRenderEngine:
+    """
+    Bounded pool of WeasyPrint worker processes.
+    Routes `await render(html)` instead of calling write_pdf() on the event loop.
+    - At most `workers + max_queue` renders may be pending; beyond that
+      RenderQueueFull is raised so the API can answer 503 + Retry-After.
+    - Renders wait for a free worker here, not inside the pool, so `timeout`
+      only covers execution: a long queue never times out healthy documents.
+    - A render that exceeds `timeout` gets its pool torn down (workers are
+      killed) and a fresh pool is spawned; renders that were running next to
+      it are retried once on the new pool.
+    """
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        max_queue: Optional[int] = None,
+        timeout: Optional[float] = None,
+    ):
+        self.workers = workers or settings.PDF_RENDER_WORKERS or os.cpu_count() or 1
+        self.max_queue = max_queue if max_queue is not None else settings.PDF_RENDER_MAX_QUEUE
+        self.timeout = timeout or settings.PDF_RENDER_TIMEOUT
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._slots = asyncio.Semaphore(self.workers)
+        self._pending = 0
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def start(self):
+        if self._executor is not None:
+            return
+        logger.info(f"🖨️ Starting PDF render pool with {self.workers} workers")
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+        )
+
+    def shutdown(self):
+        if self._executor is None:
+            return
+        logger.info("🛑 Shutting down PDF render pool")
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._executor = None
+
+    def _recycle(self, executor: ProcessPoolExecutor):
+        """Kill every worker of `executor` and start a new pool, unless it was already replaced."""
+        if executor is not self._executor:
+            return
+        self._executor = None
+        for process in list(getattr(executor, "_processes", {}).values()):
+            if process.is_alive():
+                process.kill()
+        executor.shutdown(wait=False, cancel_futures=True)
+        self.start()
+
+    async def render(self, html_content: str) -> bytes:
+        if self._pending >= self.workers + self.max_queue:
+            raise RenderQueueFull(retry_after=max(1, int(self.timeout // 4)))
+
+        self._pending += 1
+        try:
+            start = time.perf_counter()
+            async with self._slots:
+                for attempt in range(2):
+                    if self._executor is None:
+                        self.start()
+                    executor = self._executor
+                    future = executor.submit(_render_pdf, html_content)
+                    try:
+                        pdf_bytes, layout, write = await asyncio.wait_for(asyncio.wrap_future(future), timeout=self.timeout)
+                    except asyncio.TimeoutError:
+                        logger.error(f"⏱️ PDF render exceeded {self.timeout}s, recycling worker pool")
+                        self._recycle(executor)
+                        raise RenderTimeout(f"PDF render exceeded {self.timeout} seconds")
+                    except (BrokenProcessPool, asyncio.CancelledError) as e:
+                        if isinstance(e, asyncio.CancelledError) and asyncio.current_task().cancelling():
+                            raise  # the request itself was cancelled
+                        if executor is not self._executor and attempt == 0:
+                            # Another render's timeout or crash took this pool down: not this document's fault
+                            logger.info("PDF render interrupted by a pool recycle, retrying on the new pool")
+                            continue
+                        logger.error(f"PDF render worker died: {e!r}")
+                        self._recycle(executor)
+                        raise RenderError("PDF render worker crashed")
+
+                    telemetry.record("pdf_layout", layout)
+                    telemetry.record("pdf_write", write)
+                    # Queueing for a free worker plus pickling the HTML/PDF across processes
+                    telemetry.record("pdf_wait", max(0.0, time.perf_counter() - start - layout - write))
+                    return pdf_bytes
+        finally:
+            self._pending -= 1
+
+
+# Singleton instance
+render_engine = PdfRenderEngine()
@@ -0,0 +1,81 @@
+from typing import List, Optional
+
+from pydantic import BaseModel, Field
+
+# Bump when fields are added/renamed; stored documents carry the version they were made with
+SCHEMA_VERSION = 1
+
+
+class Contact(BaseModel):
+    name: str = ""
+    headline: Optional[str] = None
+    email: Optional[str] = None
+    phone: Optional[str] = None
+    location: Optional[str] = None
+    website: Optional[str] = None
+    linkedin: Optional[str] = None
+    github: Optional[str] = None
+    address_lines: List[str] = Field(default_factory=list)
+
+
+class ExperienceItem(BaseModel):
+    organization: str = ""
+    title: str = ""
+    location: Optional[str] = None
+    start: Optional[str] = None
+    end: Optional[str] = None
+    bullets: List[str] = Field(default_factory=list)
+
+
+class EducationItem(BaseModel):
+    institution: str = ""
+    degree: str = ""
+    location: Optional[str] = None
+    start: Optional[str] = None
+    end: Optional[str] = None
+    score: Optional[str] = None
+    details: List[str] = Field(default_factory=list)
+
+
+class ProjectItem(BaseModel):
+    name: str = ""
+    subtitle: Optional[str] = None
+    date: Optional[str] = None
+    link: Optional[str] = None
+    bullets: List[str] = Field(default_factory=list)
+
+
+class SkillGroup(BaseModel):
+    category: str = ""
+    items: List[str] = Field(default_factory=list)
+
+
+class SimpleEntry(BaseModel):
+    """Positions, achievements and certifications: one line each."""
+    title: str = ""
+    subtitle: Optional[str] = None
+    date: Optional[str] = None
+    description: Optional[str] = None
+
+
+class ExtraSection(BaseModel):
+    """Anything that does not fit the fixed sections, rendered as a titled list."""
+    title: str = ""
+    items: List[str] = Field(default_factory=list)
+
+
+class Resume(BaseModel):
+    schema_version: int = SCHEMA_VERSION
+    contact: Contact = Field(default_factory=Contact)
+    summary: Optional[str] = None
+    experience: List[ExperienceItem] = Field(default_factory=list)
+    education: List[EducationItem] = Field(default_factory=list)
+    projects: List[ProjectItem] = Field(default_factory=list)
+    skills: List[SkillGroup] = Field(default_factory=list)
+    positions: List[SimpleEntry] = Field(default_factory=list)
+    achievements: List[SimpleEntry] = Field(default_factory=list)
+    certifications: List[SimpleEntry] = Field(default_factory=list)
+    publications: List[str] = Field(default_factory=list)
+    languages: List[str] = Field(default_factory=list)
+    interests: List[str] = Field(default_factory=list)
+    extra_sections: List[ExtraSection] = Field(default_factory=list)
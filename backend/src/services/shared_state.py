@@ -0,0 +1,406 @@
+import asyncio
+import logging
+import math
+import time
+from collections import OrderedDict, deque
+from typing import Deque, Dict, Iterable, List, Mapping, Optional, Tuple, Union
+
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+Value = Union[bytes, str]
+
+# Namespaces holding recomputable cache entries; the in-process backend may evict them early
+CACHE_NAMESPACES = ("extract:", "pdf:")
+
+
+def _encode(value: Value) -> bytes:
+    return value.encode("utf-8") if isinstance(value, str) else value
+
+
+class _Table:
+    """One LRU-bounded key space of the in-process backend."""
+
+    __slots__ = ("data", "bytes", "max_entries", "max_bytes")
+
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.data: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (expires_at or None, value)
+        self.bytes = 0
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+    def over(self) -> bool:
+        return len(self.data) > self.max_entries or self.bytes > self.max_bytes
+
+
+class MemoryStateBackend:
+    """
+    In-process stand-in for Redis: TTL'd keys, counters and FIFO queues. Used when
+    Redis is absent, and behaves the same for a single worker.
+    - Keys under `cache_prefixes` are LRU-bounded by count and bytes.
+    - Every other key (jobs, edit sessions, locks, counters) lives in a separate,
+      larger budget, so a burst of cache writes cannot evict state that has no
+      other copy; those keys normally leave by TTL or explicit delete.
+    """
+
+    name = "memory"
+
+    def __init__(
+        self,
+        max_entries: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        cache_prefixes: Tuple[str, ...] = (),
+    ):
+        self.cache_prefixes = cache_prefixes
+        self._cache = _Table(
+            max_entries or settings.SHARED_STATE_MEMORY_MAX_ENTRIES,
+            max_bytes or settings.SHARED_STATE_MEMORY_MAX_BYTES,
+        )
+        self._durable = _Table(
+            settings.SHARED_STATE_MEMORY_DURABLE_MAX_ENTRIES,
+            settings.SHARED_STATE_MEMORY_DURABLE_MAX_BYTES,
+        )
+        self._queues: Dict[str, Deque[bytes]] = {}
+        self._signals: Dict[str, asyncio.Event] = {}
+
+    def _table(self, key: str) -> _Table:
+        return self._cache if key.startswith(self.cache_prefixes) else self._durable
+
+    def _live(self, key: str) -> Optional[tuple]:
+        table = self._table(key)
+        entry = table.data.get(key)
+        if entry is None:
+            return None
+        if entry[0] is not None and entry[0] <= time.monotonic():
+            self._remove(key)
+            return None
+        table.data.move_to_end(key)
+        return entry
+
+    def _remove(self, key: str):
+        table = self._table(key)
+        entry = table.data.pop(key, None)
+        if entry is not None:
+            table.bytes -= len(entry[1])
+
+    def _store(self, key: str, value, ttl: Optional[float], keep_ttl: bool = False):
+        table = self._table(key)
+        expires_at = time.monotonic() + ttl if ttl else None
+        if keep_ttl and key in table.data:
+            expires_at = table.data[key][0]
+        self._remove(key)
+        table.data[key] = (expires_at, value)
+        table.bytes += len(value)
+        if table.over():
+            now = time.monotonic()
+            for stale in [k for k, (exp, _) in table.data.items() if exp is not None and exp <= now]:
+                self._remove(stale)
+            while table.over():
+                victim = next(iter(table.data))
+                if table is self._durable:
+                    logger.warning(f"⚠️ In-process shared state full, evicting {victim}")
+                self._remove(victim)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        entry = self._live(key)
+        return None if entry is None else entry[1]
+
+    async def get_many(self, keys: Iterable[str]) -> List[Optional[bytes]]:
+        return [await self.get(key) for key in keys]
+
+    async def set(self, key: str, value: Value, ttl: Optional[float] = None):
+        self._store(key, _encode(value), ttl)
+
+    async def set_many(self, mapping: Mapping[str, Value], ttl: Optional[float] = None):
+        for key, value in mapping.items():
+            self._store(key, _encode(value), ttl)
+
+    async def set_nx(self, key: str, value: Value, ttl: Optional[float] = None) -> bool:
+        if self._live(key) is not None:
+            return False
+        self._store(key, _encode(value), ttl)
+        return True
+
+    async def delete(self, *keys: str):
+        for key in keys:
+            self._remove(key)
+
+    async def delete_if(self, key: str, value: Value) -> bool:
+        entry = self._live(key)
+        if entry is None or entry[1] != _encode(value):
+            return False
+        self._remove(key)
+        return True
+
+    async def expire_if(self, key: str, value: Value, ttl: float) -> bool:
+        entry = self._live(key)
+        if entry is None or entry[1] != _encode(value):
+            return False
+        self._table(key).data[key] = (time.monotonic() + ttl, entry[1])
+        return True
+
+    async def incr(self, key: str, amount: int = 1, ttl: Optional[float] = None) -> int:
+        entry = self._live(key)
+        value = (int(entry[1]) if entry else 0) + amount
+        # Like SET NX PX + INCRBY: the TTL is set when the counter is created
+        self._store(key, str(value).encode(), ttl, keep_ttl=entry is not None)
+        return value
+
+    async def push(self, queue: str, value: Value):
+        self._queues.setdefault(queue, deque()).append(_encode(value))
+        await self.notify(f"queue:{queue}")
+
+    async def pop(self, queue: str, timeout: float) -> Optional[bytes]:
+        deadline = time.monotonic() + timeout
+        while True:
+            items = self._queues.get(queue)
+            if items:
+                return items.popleft()
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not await self.wait(f"queue:{queue}", remaining):
+                return None
+
+    async def queue_length(self, queue: str) -> int:
+        return len(self._queues.get(queue, ()))
+
+    async def notify(self, channel: str):
+        event = self._signals.pop(channel, None)
+        if event is not None:
+            event.set()
+
+    async def wait(self, channel: str, timeout: float) -> bool:
+        """Waits for notify(channel); False on timeout."""
+        event = self._signals.setdefault(channel, asyncio.Event())
+        try:
+            await asyncio.wait_for(event.wait(), timeout=timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    async def ping(self) -> bool:
+        return True
+
+    async def close(self):
+        pass
+
+
+class RedisStateBackend:
+    """
+    Redis implementation over one pooled client (binary-safe, shared by every
+    consumer in the process). Multi-key writes and counters go out as single
+    pipelined round trips.
+    """
+
+    name = "redis"
+
+    def __init__(self, url: str, poll_interval: float = 0.5):
+        import redis.asyncio as redis
+
+        self.poll_interval = poll_interval
+        self.pool = redis.ConnectionPool.from_url(
+            url,
+            max_connections=settings.REDIS_MAX_CONNECTIONS,
+            socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+            socket_connect_timeout=settings.REDIS_SOCKET_TIMEOUT,
+            health_check_interval=30,
+        )
+        self.redis = redis.Redis(connection_pool=self.pool)
+        # Compare-and-delete / compare-and-expire, atomic on the server
+        self._delete_if = self.redis.register_script(
+            "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) end return 0"
+        )
+        self._expire_if = self.redis.register_script(
+            "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('pexpire', KEYS[1], ARGV[2]) end return 0"
+        )
+
+    @staticmethod
+    def _px(ttl: Optional[float]) -> Optional[int]:
+        return max(1, int(ttl * 1000)) if ttl else None
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self.redis.get(key)
+
+    async def get_many(self, keys: Iterable[str]) -> List[Optional[bytes]]:
+        keys = list(keys)
+        return await self.redis.mget(keys) if keys else []
+
+    async def set(self, key: str, value: Value, ttl: Optional[float] = None):
+        await self.redis.set(key, value, px=self._px(ttl))
+
+    async def set_many(self, mapping: Mapping[str, Value], ttl: Optional[float] = None):
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for key, value in mapping.items():
+                pipe.set(key, value, px=self._px(ttl))
+            await pipe.execute()
+
+    async def set_nx(self, key: str, value: Value, ttl: Optional[float] = None) -> bool:
+        return bool(await self.redis.set(key, value, px=self._px(ttl), nx=True))
+
+    async def delete(self, *keys: str):
+        if keys:
+            await self.redis.delete(*keys)
+
+    async def delete_if(self, key: str, value: Value) -> bool:
+        return bool(await self._delete_if(keys=[key], args=[value]))
+
+    async def expire_if(self, key: str, value: Value, ttl: float) -> bool:
+        return bool(await self._expire_if(keys=[key], args=[value, self._px(ttl)]))
+
+    async def incr(self, key: str, amount: int = 1, ttl: Optional[float] = None) -> int:
+        async with self.redis.pipeline(transaction=True) as pipe:
+            if ttl:
+                pipe.set(key, 0, px=self._px(ttl), nx=True)
+            pipe.incrby(key, amount)
+            results = await pipe.execute()
+        return int(results[-1])
+
+    async def push(self, queue: str, value: Value):
+        await self.redis.rpush(queue, value)
+
+    async def pop(self, queue: str, timeout: float) -> Optional[bytes]:
+        # Stay under the socket timeout: BLPOP holds the pooled connection meanwhile
+        timeout = max(1, min(math.ceil(timeout), int(settings.REDIS_SOCKET_TIMEOUT) - 1))
+        item = await self.redis.blpop([queue], timeout=timeout)
+        return item[1] if item else None
+
+    async def queue_length(self, queue: str) -> int:
+        return await self.redis.llen(queue)
+
+    async def notify(self, channel: str):
+        pass  # waiters poll
+
+    async def wait(self, channel: str, timeout: float) -> bool:
+        await asyncio.sleep(min(timeout, self.poll_interval))
+        return False
+
+    async def ping(self) -> bool:
+        return bool(await self.redis.ping())
+
+    async def close(self):
+        await self.redis.aclose()
+        await self.pool.aclose()
+
+
+class SharedState:
+    """
+    Key/value, counter and queue store shared by every worker and container.
+    - SHARED_STATE_BACKEND=redis uses REDIS_URL; `auto` uses it only when it answers
+      a ping at startup; otherwise (and before start()) an in-process backend.
+    - `distributed` tells consumers whether other processes see the same data.
+    - Keys are namespaced with SHARED_STATE_PREFIX.
+    """
+
+    def __init__(self, prefix: Optional[str] = None):
+        self.prefix = prefix if prefix is not None else settings.SHARED_STATE_PREFIX
+        self.backend: Union[MemoryStateBackend, RedisStateBackend] = self._memory_backend()
+
+    def _memory_backend(self) -> MemoryStateBackend:
+        return MemoryStateBackend(cache_prefixes=tuple(self.key(namespace) for namespace in CACHE_NAMESPACES))
+
+    @property
+    def distributed(self) -> bool:
+        return self.backend.name == "redis"
+
+    @property
+    def backend_name(self) -> str:
+        return self.backend.name
+
+    async def start(self):
+        kind = settings.SHARED_STATE_BACKEND.lower()
+        if kind not in ("auto", "redis", "memory"):
+            logger.warning(f"Unknown SHARED_STATE_BACKEND '{kind}', falling back to memory")
+            kind = "memory"
+        if kind == "memory" or self.distributed:
+            return
+        try:
+            backend = RedisStateBackend(settings.REDIS_URL)
+            await asyncio.wait_for(backend.ping(), timeout=settings.REDIS_SOCKET_TIMEOUT)
+        except Exception as e:
+            if kind == "redis":
+                logger.error(f"❌ Redis unreachable at startup ({e}); shared state is in-process only")
+            else:
+                logger.info(f"Redis not available ({type(e).__name__}), using in-process shared state")
+            return
+        self.backend = backend
+        logger.info("🔗 Shared state on Redis")
+
+    async def close(self):
+        await self.backend.close()
+        self.backend = self._memory_backend()
+
+    def key(self, name: str) -> str:
+        return f"{self.prefix}{name}"
+
+    # ---------------------------
+    # Delegation (names are unprefixed)
+    # ---------------------------
+    async def get(self, name: str) -> Optional[bytes]:
+        return await self.backend.get(self.key(name))
+
+    async def get_many(self, names: Iterable[str]) -> List[Optional[bytes]]:
+        return await self.backend.get_many([self.key(name) for name in names])
+
+    async def set(self, name: str, value: Value, ttl: Optional[float] = None):
+        await self.backend.set(self.key(name), value, ttl)
+
+    async def set_many(self, mapping: Mapping[str, Value], ttl: Optional[float] = None):
+        await self.backend.set_many({self.key(name): value for name, value in mapping.items()}, ttl)
+
+    async def set_nx(self, name: str, value: Value, ttl: Optional[float] = None) -> bool:
+        return await self.backend.set_nx(self.key(name), value, ttl)
+
+    async def delete(self, *names: str):
+        await self.backend.delete(*(self.key(name) for name in names))
+
+    async def delete_if(self, name: str, value: Value) -> bool:
+        """Deletes `name` only while it still holds `value` (releasing a lock we own)."""
+        return await self.backend.delete_if(self.key(name), value)
+
+    async def expire_if(self, name: str, value: Value, ttl: float) -> bool:
+        """Resets the TTL of `name` only while it still holds `value` (renewing a lock we own)."""
+        return await self.backend.expire_if(self.key(name), value, ttl)
+
+    async def incr(self, name: str, amount: int = 1, ttl: Optional[float] = None) -> int:
+        return await self.backend.incr(self.key(name), amount, ttl)
+
+    async def push(self, queue: str, value: Value):
+        await self.backend.push(self.key(queue), value)
+
+    async def pop(self, queue: str, timeout: float) -> Optional[bytes]:
+        return await self.backend.pop(self.key(queue), timeout)
+
+    async def queue_length(self, queue: str) -> int:
+        return await self.backend.queue_length(self.key(queue))
+
+    async def notify(self, channel: str):
+        await self.backend.notify(self.key(channel))
+
+    async def wait(self, channel: str, timeout: float) -> bool:
+        return await self.backend.wait(self.key(channel), timeout)
+
+    # ---------------------------
+    # Fixed-window rate limiting
+    # ---------------------------
+    async def window_acquire(self, name: str, cost: int, limit: int, window: float = 60.0) -> float:
+        """
+        Charges `cost` against `limit` per `window` seconds, cluster-wide.
+        Returns 0 when admitted, else the seconds until the next window (nothing charged).
+        """
+        now = time.time()
+        counter = f"rl:{name}:{int(now // window)}"
+        used = await self.incr(counter, cost, ttl=window * 2)
+        # A single call larger than the whole limit is admitted into an empty window
+        if used <= limit or used == cost:
+            return 0.0
+        await self.incr(counter, -cost)
+        return window - (now % window)
+
+    async def window_adjust(self, name: str, delta: int, window: float = 60.0):
+        """Corrects the current window once the real cost is known."""
+        if delta:
+            await self.incr(f"rl:{name}:{int(time.time() // window)}", delta, ttl=window * 2)
+
+
+# Singleton instance
+shared_state = SharedState()
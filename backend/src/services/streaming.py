@@ -0,0 +1,71 @@
+import json
+from typing import AsyncIterator, Tuple
+
+from fastapi.responses import StreamingResponse
+
+FENCES = ("```html", "```")
+
+
+def sse_event(event: str, data) -> str:
+    """Formats one Server-Sent Event; `data` is JSON encoded on a single line."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def sse_response(events: AsyncIterator[Tuple[str, dict]]) -> StreamingResponse:
+    """Wraps an async iterator of (event, data) tuples into a text/event-stream response."""
+
+    async def body():
+        async for event, data in events:
+            yield sse_event(event, data)
+
+    return StreamingResponse(
+        body(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            # Stop nginx/Render proxies from buffering the stream
+            "X-Accel-Buffering": "no",
+        },
+    )
+
+
+class IncrementalHtmlSanitizer:
+    """
+    Streaming counterpart of the fence/newline cleanup applied to LLM HTML output.
+    Chunks may split a "```html" fence or a "\\r\\n" pair, so any tail that could be
+    the start of one is held back until the next chunk (or finish()) decides it.
+    """
+
+    def __init__(self):
+        self._pending = ""
+        self._parts = []
+
+    @staticmethod
+    def _holdback(text: str) -> int:
+        longest = 0
+        for fence in FENCES + ("\r\n",):
+            for size in range(1, len(fence)):
+                if text.endswith(fence[:size]):
+                    longest = max(longest, size)
+        return longest
+
+    @staticmethod
+    def _clean(text: str) -> str:
+        for fence in FENCES:
+            text = text.replace(fence, "")
+        return text.replace("\r\n", "\n")
+
+    def feed(self, chunk: str) -> str:
+        """Adds a raw chunk; returns the part that is now safe to emit."""
+        text = self._pending + chunk
+        keep = self._holdback(text)
+        ready, self._pending = (text[:-keep], text[-keep:]) if keep else (text, "")
+        cleaned = self._clean(ready)
+        self._parts.append(cleaned)
+        return cleaned
+
+    def finish(self) -> str:
+        """Flushes the held-back tail and returns the full sanitized document."""
+        self._parts.append(self._clean(self._pending))
+        self._pending = ""
+        return "".join(self._parts).strip()
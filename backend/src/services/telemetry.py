@@ -0,0 +1,238 @@
+import threading
+import time
+from contextlib import nullcontext
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional, Tuple
+
+from ..config import settings
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Histogram:
+    """Prometheus histogram with a fixed label set (cumulative buckets are built at render time)."""
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...], buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        self._series: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labelvalues: str):
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = i
+                break
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                # per-bucket counts (last slot is +Inf), sum, count
+                series = self._series[labelvalues] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = [(labels, list(counts), total, count) for labels, (counts, total, count) in self._series.items()]
+        for labelvalues, counts, total, count in sorted(snapshot):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                bucket_labels = _labels(self.labelnames, labelvalues, f'le="{le}"')
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labelvalues)} {total}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labelvalues)} {count}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...]):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float, *labelvalues: str):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            snapshot = sorted(self._values.items())
+        for labelvalues, value in snapshot:
+            lines.append(f"{self.name}{_labels(self.labelnames, labelvalues)} {value}")
+        return lines
+
+
+class RequestTrace:
+    """Stage durations collected while one request is handled (summed per stage name)."""
+
+    __slots__ = ("start", "stages", "prompt_tokens", "completion_tokens")
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+    def add(self, name: str, seconds: float):
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def server_timing(self) -> str:
+        entries = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in self.stages.items()]
+        if self.prompt_tokens or self.completion_tokens:
+            entries.append(f'tokens;desc="prompt={self.prompt_tokens} completion={self.completion_tokens}"')
+        entries.append(f"total;dur={(time.perf_counter() - self.start) * 1000:.1f}")
+        return ", ".join(entries)
+
+
+_current_trace: ContextVar[Optional[RequestTrace]] = ContextVar("request_trace", default=None)
+_NULL_SPAN = nullcontext()
+
+
+class _Span:
+    __slots__ = ("telemetry", "name", "start")
+
+    def __init__(self, telemetry: "Telemetry", name: str):
+        self.telemetry = telemetry
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.telemetry.record(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class Telemetry:
+    """
+    Per-stage latency spans for the request pipeline.
+    - `with telemetry.span("sanitize"):` or `telemetry.record(name, seconds)` from code
+      that measures itself (LLM time-to-first-token, worker-side PDF layout/write).
+    - Stages land in a Prometheus histogram (/metrics) and in the current request's
+      Server-Timing header (set by TelemetryMiddleware).
+    - With both METRICS_ENABLED and SERVER_TIMING_ENABLED off, span() returns a shared
+      no-op context manager and record() returns immediately.
+    """
+
+    def __init__(self, metrics_enabled: Optional[bool] = None, server_timing: Optional[bool] = None):
+        self.metrics_enabled = settings.METRICS_ENABLED if metrics_enabled is None else metrics_enabled
+        self.server_timing = settings.SERVER_TIMING_ENABLED if server_timing is None else server_timing
+
+        self.stage_seconds = Histogram(
+            "resumegpt_stage_duration_seconds", "Time spent per pipeline stage.", ("stage",)
+        )
+        self.request_seconds = Histogram(
+            "resumegpt_http_request_duration_seconds", "HTTP request latency by route.", ("method", "route", "status")
+        )
+        self.llm_tokens = Counter(
+            "resumegpt_llm_tokens_total", "Tokens reported by LLM responses.", ("model", "kind")
+        )
+        self._collectors: List[Callable[[], List[str]]] = []
+
+    @property
+    def enabled(self) -> bool:
+        return self.metrics_enabled or self.server_timing
+
+    def span(self, name: str):
+        if not self.metrics_enabled and _current_trace.get() is None:
+            return _NULL_SPAN
+        return _Span(self, name)
+
+    def record(self, name: str, seconds: float):
+        if self.metrics_enabled:
+            self.stage_seconds.observe(seconds, name)
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.add(name, seconds)
+
+    def record_usage(self, model: Optional[str], usage):
+        """Counts tokens from a Responses (input/output_tokens) or chat (prompt/completion_tokens) usage object."""
+        if usage is None:
+            return
+        prompt = getattr(usage, "input_tokens", None) or getattr(usage, "prompt_tokens", None) or 0
+        completion = getattr(usage, "output_tokens", None) or getattr(usage, "completion_tokens", None) or 0
+        if self.metrics_enabled:
+            self.llm_tokens.inc(prompt, model or "unknown", "prompt")
+            self.llm_tokens.inc(completion, model or "unknown", "completion")
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.prompt_tokens += prompt
+            trace.completion_tokens += completion
+
+    def add_collector(self, collector: Callable[[], List[str]]):
+        """Registers a callable returning extra exposition lines (gauges owned by other services)."""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines = self.stage_seconds.render() + self.request_seconds.render() + self.llm_tokens.render()
+        for collector in self._collectors:
+            lines += collector()
+        return "\n".join(lines) + "\n"
+
+
+class TelemetryMiddleware:
+    """
+    Pure ASGI middleware (streaming responses pass through untouched).
+    Opens a RequestTrace per HTTP request, adds the Server-Timing header when the
+    response starts, and observes the request duration under the matched route
+    template (never the raw path, to keep label cardinality bounded).
+    """
+
+    def __init__(self, app, telemetry: "Telemetry"):
+        self.app = app
+        self.telemetry = telemetry
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.telemetry.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        trace = RequestTrace()
+        token = _current_trace.set(trace)
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if self.telemetry.server_timing:
+                    headers = list(message.get("headers", []))
+                    headers.append((b"server-timing", trace.server_timing().encode("latin-1")))
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current_trace.reset(token)
+            if self.telemetry.metrics_enabled:
+                route = getattr(scope.get("route"), "path", "unmatched")
+                self.telemetry.request_seconds.observe(
+                    time.perf_counter() - trace.start, scope["method"], route, str(status)
+                )
+
+
+# Singleton instance
+telemetry = Telemetry()
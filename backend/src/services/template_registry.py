@@ -0,0 +1,161 @@
+import asyncio
+import gzip
+import hashlib
+import json
+import logging
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from ..config import settings
+
+try:
+    import brotli
+except ImportError:  # optional: without it only gzip variants are built
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+
+class CachedBody:
+    """A response body kept in memory together with its compressed variants and ETags."""
+
+    def __init__(self, content: bytes):
+        digest = hashlib.sha256(content).hexdigest()[:32]
+        self.variants: Dict[str, bytes] = {"identity": content}
+        # gzip mtime=0 keeps the variant (and its ETag) stable across restarts
+        self.variants["gzip"] = gzip.compress(content, compresslevel=9, mtime=0)
+        if brotli is not None:
+            self.variants["br"] = brotli.compress(content, quality=11)
+        # Each encoding is a different representation, so each gets its own strong ETag
+        self.etags = {
+            encoding: f'"{digest}"' if encoding == "identity" else f'"{digest}-{encoding}"'
+            for encoding in self.variants
+        }
+
+    def select(self, accept_encoding: Optional[str]) -> Tuple[str, bytes, str]:
+        """Returns (encoding, body, etag) for the best variant the client accepts."""
+        accepted = set()
+        for token in (accept_encoding or "").split(","):
+            name, *params = token.strip().split(";")
+            quality = 1.0
+            for param in params:
+                key, _, value = param.strip().partition("=")
+                if key == "q":
+                    try:
+                        quality = float(value)
+                    except ValueError:
+                        quality = 0.0
+            if quality > 0:
+                accepted.add(name.strip().lower())
+        for encoding in ("br", "gzip"):
+            if encoding in self.variants and (encoding in accepted or "*" in accepted):
+                return encoding, self.variants[encoding], self.etags[encoding]
+        return "identity", self.variants["identity"], self.etags["identity"]
+
+
+class TemplateEntry:
+    def __init__(self, path: Path, content: bytes, mtime_ns: int, size: int):
+        self.id = path.stem
+        self.name = path.stem.replace("_", " ").title()
+        self.filename = path.name
+        self.mtime_ns = mtime_ns
+        self.size = size
+        self.text = content.decode("utf-8")
+        self.body = CachedBody(content)
+
+    def metadata(self) -> dict:
+        return {
+            "id": self.id,
+            "name": self.name,
+            "filename": self.filename,
+            "thumbnail_url": f"/templates/{self.id}/thumbnail",
+        }
+
+
+class TemplateRegistry:
+    """
+    In-memory copy of every `*.html` template, loaded at startup.
+    A background loop re-stats the directory every TEMPLATE_WATCH_INTERVAL seconds and
+    reloads files whose mtime/size changed, so edits and new templates show up without
+    a restart. Routes and agents read templates from here instead of the filesystem.
+    """
+
+    def __init__(self, templates_dir: Path, interval: Optional[float] = None):
+        self.templates_dir = templates_dir
+        self.interval = interval or settings.TEMPLATE_WATCH_INTERVAL
+        self._entries: Dict[str, TemplateEntry] = {}
+        self._listing = CachedBody(b'{"templates": []}')
+        self._watch_task: Optional[asyncio.Task] = None
+
+    # ---------------------------
+    # Loading
+    # ---------------------------
+    def reload(self) -> bool:
+        """Re-scans the directory (blocking). Returns True when anything changed."""
+        entries: Dict[str, TemplateEntry] = {}
+        changed = False
+        for path in sorted(self.templates_dir.glob("*.html")):
+            try:
+                stat = path.stat()
+                current = self._entries.get(path.stem)
+                if current is not None and (current.mtime_ns, current.size) == (stat.st_mtime_ns, stat.st_size):
+                    entries[path.stem] = current
+                    continue
+                entries[path.stem] = TemplateEntry(path, path.read_bytes(), stat.st_mtime_ns, stat.st_size)
+                changed = True
+                logger.info(f"📄 Template {path.name} {'reloaded' if current else 'loaded'}")
+            except (OSError, UnicodeDecodeError) as e:
+                logger.error(f"❌ Could not load template {path.name}: {e}")
+        if set(entries) != set(self._entries):
+            changed = True
+
+        if changed:
+            listing = {"templates": [entry.metadata() for entry in entries.values()]}
+            self._listing = CachedBody(json.dumps(listing).encode("utf-8"))
+            # Swap in one assignment so readers never see a half-built registry
+            self._entries = entries
+        return changed
+
+    async def _watch_loop(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await asyncio.to_thread(self.reload)
+            except Exception as e:
+                logger.error(f"❌ Template reload failed: {e}")
+
+    async def start(self):
+        await asyncio.to_thread(self.reload)
+        logger.info(f"📚 Template registry ready ({len(self._entries)} templates)")
+        if self._watch_task is None:
+            self._watch_task = asyncio.create_task(self._watch_loop())
+
+    async def stop(self):
+        if self._watch_task is not None:
+            self._watch_task.cancel()
+            try:
+                await self._watch_task
+            except asyncio.CancelledError:
+                pass
+            self._watch_task = None
+
+    # ---------------------------
+    # Lookup
+    # ---------------------------
+    def get(self, template_id: str) -> Optional[TemplateEntry]:
+        """Looks up by id ("classic") or filename ("classic.html")."""
+        entry = self._entries.get(template_id)
+        if entry is None and template_id.endswith(".html"):
+            entry = self._entries.get(template_id[: -len(".html")])
+        return entry
+
+    def ids(self) -> List[str]:
+        return list(self._entries)
+
+    @property
+    def listing(self) -> CachedBody:
+        """JSON body of GET /templates."""
+        return self._listing
+
+# Singleton instance
+template_registry = TemplateRegistry(Path("templates"))
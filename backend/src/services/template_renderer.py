@@ -0,0 +1,74 @@
+import logging
+import re
+from pathlib import Path
+from typing import Dict, List, Tuple, Union
+
+from jinja2 import Environment, FileSystemLoader, TemplateNotFound, select_autoescape
+from markupsafe import Markup
+
+from .resume_schema import Resume
+from .template_registry import template_registry
+
+logger = logging.getLogger(__name__)
+
+_HEAD_RE = re.compile(r"<head\b.*?</head>", re.IGNORECASE | re.DOTALL)
+
+
+class TemplateRenderer:
+    """
+    Renders a structured `Resume` into any of the HTML templates without an LLM.
+    Each `templates/<id>.html` has a Jinja body in `templates/jinja/<id>.html.j2`;
+    the <head> (CSS, fonts) is taken from the original template in the registry so
+    styles are not duplicated. Compiled templates are cached by the Environment (no auto reload).
+    """
+
+    def __init__(self, templates_dir: Path):
+        self.templates_dir = templates_dir
+        self.env = Environment(
+            loader=FileSystemLoader(str(templates_dir / "jinja")),
+            autoescape=select_autoescape(["html", "j2"]),
+            auto_reload=False,
+            cache_size=64,
+            trim_blocks=True,
+            lstrip_blocks=True,
+            # Optional schema fields are None; print them as nothing
+            finalize=lambda value: "" if value is None else value,
+        )
+        self._heads: Dict[str, Tuple[str, Markup]] = {}
+
+    def available(self) -> List[str]:
+        return sorted(
+            name[: -len(".html.j2")]
+            for name in self.env.list_templates(extensions=["j2"])
+            if not name.startswith("_")
+        )
+
+    def supports(self, template_id: str) -> bool:
+        return template_id in self.available()
+
+    def _head(self, template_id: str) -> Markup:
+        entry = template_registry.get(template_id)
+        if entry is None:
+            raise FileNotFoundError(template_id)
+        cached = self._heads.get(template_id)
+        if cached is not None and cached[0] == entry.body.etags["identity"]:
+            return cached[1]
+        match = _HEAD_RE.search(entry.text)
+        head = Markup(match.group(0) if match else "<head><meta charset=\"UTF-8\"></head>")
+        self._heads[template_id] = (entry.body.etags["identity"], head)
+        return head
+
+    def render(self, template_id: str, resume: Union[Resume, dict]) -> str:
+        """Returns the filled HTML; raises KeyError for unknown templates."""
+        template_id = Path(template_id).stem
+        if isinstance(resume, dict):
+            resume = Resume.model_validate(resume)
+        try:
+            template = self.env.get_template(f"{template_id}.html.j2")
+            head = self._head(template_id)
+        except (TemplateNotFound, FileNotFoundError):
+            raise KeyError(f"Template {template_id} has no local renderer")
+        return template.render(resume=resume, head=head)
+
+# Singleton instance
+template_renderer = TemplateRenderer(Path("templates"))